@@ -1,6 +1,71 @@
-from .domain import *
-from .obstacles import *
-from .boundaries import *
-from .schemes import *
-from .conv_operators import *
-from .operations import *
\ No newline at end of file
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+# The submodules are imported on the first access of one of their names, e.g., `ConvDO.ConvGrad` only imports the operators and their dependencies.
+# `from ConvDO import *` still imports every submodule.
+import importlib
+
+_SUBMODULES = {
+    "helpers": ["exists", "default", "torch", "nn", "F"],
+    "meta_type": ["CommutativeValue", "VectorValue", "TensorValue"],
+    "faces": ["DirichletFace", "NeumannFace", "UnConstrainedFace"],
+    "domain": ["Domain", "UnconstrainedDomain", "PeriodicDomain"],
+    "obstacles": ["is_shape_equal", "generate_circle_2D", "Obstacle", "DirichletObstacle", "NeumannObstacle", "UnConstrainedObstacle"],
+    "boundaries": ["Boundary", "DirichletBoundary", "NeumannBoundary", "UnConstrainedBoundary", "PeriodicBoundary"],
+    "coefficients": ["CENTRAL_INTERPOLATION_WEIGHTS", "CENTRAL_LAPLACIAN_WEIGHTS"],
+    "schemes": ["FDScheme", "CENTRAL_INTERPOLATION_SCHEMES", "CENTRAL_LAPLACIAN_SCHEMES"],
+    "geometry": ["grid_2D", "circle_sdf", "ellipse_sdf", "rectangle_sdf", "polygon_sdf", "union", "intersection", "difference", "shape_field_from_sdf"],
+    "sparse": ["SparseOperator", "assemble", "assemble_diagonal"],
+    "plans": ["domain_signature", "PlanCache", "plan_cache"],
+    "cache": ["ArtifactCache", "artifact_key", "artifact_cache", "enable_cache"],
+    "autotune": ["STENCIL_BACKENDS", "Autotuner", "autotuner", "enable_autotune"],
+    "profiling": ["Profiler", "profiler", "region"],
+    "memory": ["MemoryTracer"],
+    "conv_operators": ["ScalarField", "ConvOperator", "ConvGrad", "ConvGrad2", "ConvNabla", "ConvLaplacian", "ComposedOperator", "ConvMixedGrad", "ConvBiharmonic"],
+    "frozen": ["FrozenConvOperator", "FrozenTransientNS", "FrozenPoissonDivergence", "count_graph_breaks"],
+    "export": ["export_torchscript", "load_torchscript", "export_onnx"],
+    "registry": ["OperatorRegistry", "operator_registry"],
+    "operations": ["FieldOperations", "TransientNSWithForce", "TransientNS", "PoissonDivergenceWithForce", "PoissonDivergence"],
+    "solvers": ["bicgstab", "gmres", "PoissonSolver"],
+    "multigrid": ["coarsen_domain", "Multigrid"],
+    "implicit": ["NewtonKrylovStepper"],
+    "integrators": ["RK_TABLEAUS", "RungeKuttaIntegrator", "IMEXIntegrator"],
+    "evaluation": ["ResidualEvaluator"],
+    "streaming": ["load_trajectory", "TrajectoryStream"],
+    "numpy_backend": ["NumpyScalarField", "NumpyConvOperator", "NumpyConvGrad", "NumpyConvGrad2", "NumpyConvNabla", "NumpyConvLaplacian",
+                      "NumpyObstacle", "NumpyDirichletObstacle", "NumpyNeumannObstacle", "NumpyUnConstrainedObstacle"],
+}
+
+# the names which `from ConvDO import *` bound before the submodules were imported lazily, kept for compatibility.
+_LEGACY_SUBMODULES = ["helpers", "meta_type", "faces", "domain", "obstacles", "boundaries", "schemes", "sparse", "plans", "autotune", "profiling", "memory",
+                      "conv_operators", "frozen", "export", "operations", "solvers", "multigrid", "implicit", "integrators", "evaluation", "streaming"]
+_LEGACY_NAMES = {
+    "helpers": ["Sequence", "isfunction", "os"],
+    "domain": ["warnings"],
+    "sparse": ["Optional", "json"],
+    "plans": ["threading"],
+    "profiling": ["contextlib", "functools"],
+    "memory": ["TorchDispatchMode", "tree_flatten", "weakref"],
+    "conv_operators": ["collections", "math", "numbers", "statistics", "time"],
+    "operations": ["List"],
+    "solvers": ["Callable"],
+    "evaluation": ["Iterable", "Iterator", "concurrent"],
+    "streaming": ["Union", "np", "queue"],
+}
+
+_NAMES = {name: submodule for submodule, names in list(_SUBMODULES.items())+list(_LEGACY_NAMES.items()) for name in names}
+
+__all__ = list(_NAMES.keys())+_LEGACY_SUBMODULES
+
+def __getattr__(name):
+    if name in _NAMES:
+        value = getattr(importlib.import_module("."+_NAMES[name], __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module("."+name, __name__)
+    else:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    # cached, so the next access does not call `__getattr__`.
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals().keys()) | set(_NAMES.keys()) | set(_SUBMODULES.keys()))
@@ -1,13 +1,14 @@
 #usr/bin/python3
 # -*- coding: UTF-8 -*-
 import torch
+import warnings
 from . import *
 from .domain import *
 from .obstacles import *
 from .boundaries import *
 from typing import Optional
 
-print("Warning: This is an old version of operator which will be deprecated soon. Please use 'operator_HO' instead.")
+warnings.warn("This is an old version of operator which will be deprecated soon. Please use 'operator_HO' instead.", DeprecationWarning)
 
 class ScalarField(CommutativeValue):
     
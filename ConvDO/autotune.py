@@ -0,0 +1,218 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+import json
+import os
+import statistics
+import threading
+import time
+import warnings
+from typing import Optional
+
+# the ways to apply the stencil of a frozen operator, see `FrozenConvOperator.evaluate`.
+STENCIL_BACKENDS = ["conv2d", "conv1d", "shift", "unfold", "fft"]
+
+def _default_cache_path():
+    return os.environ.get("CONVDO_AUTOTUNE_CACHE",
+                          os.path.join(os.path.expanduser("~"), ".cache", "convdo", "autotune.json"))
+
+def _batch_bucket(batch: int) -> int:
+    # the timings change smoothly with the batch size, so the batch sizes are tuned by powers of two.
+    bucket = 1
+    while bucket < batch:
+        bucket *= 2
+    return bucket
+
+def _synchronize(value: torch.Tensor):
+    if value.is_cuda:
+        torch.cuda.synchronize(value.device)
+
+class Autotuner():
+    r"""
+    Select the fastest stencil backend of the operator plans.
+
+    The first time a signature (grid size, batch size, stencil width, direction, boundary type, dtype, device) is seen,
+    every candidate backend of `STENCIL_BACKENDS` is benchmarked on the field and the fastest one is kept.
+    Candidates which fail or do not reproduce the result of "conv2d" are discarded.
+    The choices are stored in a JSON file, so later processes start tuned.
+    The autotuner is used by the operator plans, see `PlanCache`, and has no effect if the plan cache is disabled.
+
+    Examples:
+        ```python
+        enable_autotune() # or set the environment variable CONVDO_AUTOTUNE=1
+        grad_x = ConvGrad(order=2, direction="x")
+        grad_x*ScalarField(torch.rand(64,1,128,128)) # benchmarked once, then the fastest backend is used.
+        ```
+
+    Args:
+        cache_path (str, optional): The JSON file of the choices. Defaults to the environment variable CONVDO_AUTOTUNE_CACHE or "~/.cache/convdo/autotune.json".
+        enabled (bool, optional): Whether the plans use the autotuner. Defaults to False.
+        repeats (int, optional): The number of timed runs of every candidate. Defaults to 10.
+        warmup (int, optional): The number of untimed runs of every candidate. Defaults to 2.
+        rtol (float, optional): The relative tolerance of the check against "conv2d". Defaults to 1e-4.
+    """
+
+    def __init__(self,
+                 cache_path: Optional[str]=None,
+                 enabled: bool=False,
+                 repeats: int=10,
+                 warmup: int=2,
+                 rtol: float=1e-4) -> None:
+        self.cache_path = default(cache_path, _default_cache_path())
+        self.enabled = enabled
+        self.repeats = repeats
+        self.warmup = warmup
+        self.rtol = rtol
+        self._choices = None
+        self._lock = threading.RLock()
+        self._write_failed = False
+
+    def _key(self, module, value: torch.Tensor) -> str:
+        return "|".join([
+            "torch={}".format(torch.__version__),
+            "threads={}".format(torch.get_num_threads() if value.device.type == "cpu" else 0),
+            "device={}".format(value.device.type),
+            "dtype={}".format(str(value.dtype).replace("torch.", "")),
+            "shape={}x{}".format(value.shape[-2], value.shape[-1]),
+            "batch={}".format(_batch_bucket(value.shape[0])),
+            "width={}".format(module.weight.shape[-1]),
+            "direction={}".format("y" if module.transpose else "x"),
+            "boundary={}".format("periodic" if module.periodic else "non-periodic"),
+            "obstacles={}".format(int(module.has_obstacles)),
+        ])
+
+    def _read(self) -> dict:
+        try:
+            with open(self.cache_path, "r") as file:
+                content = json.load(file)
+            return dict(content.get("choices", {}))
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self):
+        # merged with the file, which may have been updated by other processes, and replaced atomically.
+        try:
+            choices = self._read()
+            choices.update(self._choices)
+            directory = os.path.dirname(self.cache_path)
+            if directory != "":
+                os.makedirs(directory, exist_ok=True)
+            temporary = "{}.{}.tmp".format(self.cache_path, os.getpid())
+            with open(temporary, "w") as file:
+                json.dump({"version": 1, "choices": choices}, file, indent=1, sort_keys=True)
+            os.replace(temporary, self.cache_path)
+        except OSError as error:
+            if not self._write_failed:
+                warnings.warn("The autotune cache can not be written to '{}': {}".format(self.cache_path, error))
+                self._write_failed = True
+
+    def choices(self) -> dict:
+        r"""
+        Returns:
+            choices (dict): The choices by signature, with the keys "backend" and "times" (seconds of every candidate).
+        """
+        with self._lock:
+            if self._choices is None:
+                self._choices = self._read()
+            return dict(self._choices)
+
+    def candidates(self, module) -> list:
+        r"""
+        The backends which apply to a frozen operator: "fft" requires a periodic direction without obstacles.
+
+        Args:
+            module (FrozenConvOperator): The frozen operator.
+
+        Returns:
+            candidates (list): The names of the backends.
+        """
+        return [backend for backend in STENCIL_BACKENDS
+                if backend != "fft" or (module.periodic and not module.has_obstacles)]
+
+    def benchmark(self, module, value: torch.Tensor) -> dict:
+        r"""
+        Time every candidate backend of a frozen operator on a field.
+
+        Args:
+            module (FrozenConvOperator): The frozen operator.
+            value (torch.Tensor): The field with shape (B,1,H,W).
+
+        Returns:
+            times (dict): The median time in seconds of every valid candidate.
+        """
+        times = {}
+        with torch.no_grad():
+            reference = module.evaluate(value, "conv2d")
+            tolerance = self.rtol*(1+reference.abs().max().item())
+            for backend in self.candidates(module):
+                try:
+                    result = module.evaluate(value, backend)
+                except RuntimeError:
+                    continue
+                if result.shape != reference.shape or not bool(((result-reference).abs() <= tolerance).all()):
+                    continue
+                for _ in range(self.warmup):
+                    module.evaluate(value, backend)
+                _synchronize(value)
+                runs = []
+                for _ in range(self.repeats):
+                    start = time.perf_counter()
+                    module.evaluate(value, backend)
+                    _synchronize(value)
+                    runs.append(time.perf_counter()-start)
+                times[backend] = statistics.median(runs)
+        return times
+
+    def select(self, module, value: torch.Tensor) -> str:
+        r"""
+        Get the fastest backend of a frozen operator for a field, benchmarking the candidates on the first call.
+
+        Args:
+            module (FrozenConvOperator): The frozen operator.
+            value (torch.Tensor): The field with shape (B,1,H,W).
+
+        Returns:
+            backend (str): The name of the backend.
+        """
+        key = self._key(module, value)
+        with self._lock:
+            if self._choices is None:
+                self._choices = self._read()
+            choice = self._choices.get(key)
+            if choice is not None and choice["backend"] in self.candidates(module):
+                return choice["backend"]
+            # the lock is held while benchmarking so that concurrent calls do not disturb the timings.
+            times = self.benchmark(module, value)
+            backend = min(times, key=times.get) if len(times) > 0 else "conv2d"
+            self._choices[key] = {"backend": backend, "times": times}
+            self._write()
+        return backend
+
+    def clear(self, remove_file: bool=False):
+        r"""
+        Forget the choices.
+
+        Args:
+            remove_file (bool, optional): Whether to remove the JSON file as well. Defaults to False.
+        """
+        with self._lock:
+            self._choices = {}
+            if remove_file and os.path.exists(self.cache_path):
+                os.remove(self.cache_path)
+
+# the autotuner used by the operator plans.
+autotuner = Autotuner(enabled=os.environ.get("CONVDO_AUTOTUNE", "0") not in ["", "0", "false", "False"])
+
+def enable_autotune(enabled: bool=True, cache_path: Optional[str]=None):
+    r"""
+    Enable or disable the autotuning of the stencil backends, see `Autotuner`.
+
+    Args:
+        enabled (bool, optional): Whether to autotune. Defaults to True.
+        cache_path (str, optional): The JSON file of the choices. Defaults to None, i.e., the current file.
+    """
+    with autotuner._lock:
+        autotuner.enabled = enabled
+        if cache_path is not None and cache_path != autotuner.cache_path:
+            autotuner.cache_path = cache_path
+            autotuner._choices = None
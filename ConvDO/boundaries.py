@@ -1,8 +1,8 @@
 #usr/bin/python3
 # -*- coding: UTF-8 -*-
-from .helpers import *
 from .faces import *
 from .meta_type import *
+import warnings
 
 class Boundary(CommutativeValue):
     
@@ -227,22 +227,22 @@ class PeriodicBoundary(Boundary):
         super().__init__()
     
     def correct_top(self,padded_face,ori_field,delta):
-        print("Warning: correct only works for 2nd scheme, if you are using higher order, please directly pad the field with 'circular' model")
+        warnings.warn("correct only works for 2nd scheme, if you are using higher order, please directly pad the field with 'circular' model")
         padded_face[...,0,:]=(ori_field[...,0,:]+ori_field[...,-1,:])/2
         return padded_face
 
     def correct_right(self,padded_face,ori_field,delta):
-        print("Warning: correct only works for 2nd scheme, if you are using higher order, please directly pad the field with 'circular' model")
+        warnings.warn("correct only works for 2nd scheme, if you are using higher order, please directly pad the field with 'circular' model")
         padded_face[...,:,-1]=(ori_field[...,:,0]+ori_field[...,:,-1])/2
         return padded_face
 
     def correct_bottom(self,padded_face,ori_field,delta):
-        print("Warning: correct only works for 2nd scheme, if you are using higher order, please directly pad the field with 'circular' model")
+        warnings.warn("correct only works for 2nd scheme, if you are using higher order, please directly pad the field with 'circular' model")
         padded_face[...,-1,:]=(ori_field[...,0,:]+ori_field[...,-1,:])/2
         return padded_face
         
     def correct_left(self,padded_face,ori_field,delta):
-        print("Warning: correct only works for 2nd scheme, if you are using higher order, please directly pad the field with 'circular' model")
+        warnings.warn("correct only works for 2nd scheme, if you are using higher order, please directly pad the field with 'circular' model")
         padded_face[...,:,0]=(ori_field[...,:,0]+ori_field[...,:,-1])/2
         return padded_face    
 
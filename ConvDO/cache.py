@@ -0,0 +1,264 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+from .domain import *
+from .plans import _face_signature, _Unplannable
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+import warnings
+from torch.utils.weak import WeakIdKeyDictionary
+from typing import Optional
+
+# increased when the stored artifacts change, so older entries are not loaded.
+_FORMAT_VERSION = 1
+
+def _default_directory():
+    return os.environ.get("CONVDO_CACHE_DIR",
+                          os.path.join(os.path.expanduser("~"), ".cache", "convdo", "artifacts"))
+
+# the content addresses of the tensors returned by the cache with their version counter,
+# so they are not hashed again unless they are modified in place, e.g., a cached shape field used by an obstacle.
+_tensor_digests = WeakIdKeyDictionary()
+
+def _update_digest(hasher, item):
+    if isinstance(item, torch.Tensor) and item in _tensor_digests and _tensor_digests[item][1] == item._version:
+        hasher.update("cached:{}:".format(_tensor_digests[item][0]).encode())
+    elif isinstance(item, torch.Tensor):
+        value = item.detach().cpu().contiguous().reshape(-1)
+        hasher.update("tensor{}{}:".format(tuple(item.shape), str(item.dtype)).encode())
+        # the raw bytes, bfloat16 has no NumPy type.
+        hasher.update(value.view(torch.uint8).numpy() if value.numel() > 0 else b"")
+    elif isinstance(item, Domain):
+        hasher.update(b"domain:")
+        _update_digest(hasher, [[type(boundary).__name__, _face_signature(getattr(boundary, "boundary_face", None))]
+                                for boundary in [item.left_boundary, item.right_boundary, item.top_boundary, item.bottom_boundary]])
+        _update_digest(hasher, [float(item.delta_x), float(item.delta_y)])
+        for obstacle in item.obstacles:
+            _update_digest(hasher, [type(obstacle).__name__, _face_signature(getattr(obstacle, "boundary_face", None)), obstacle.shape_field.value])
+    elif isinstance(item, (list, tuple)):
+        hasher.update("list{}:".format(len(item)).encode())
+        for element in item:
+            _update_digest(hasher, element)
+    elif isinstance(item, dict):
+        _update_digest(hasher, sorted(item.items(), key=lambda pair: str(pair[0])))
+    else:
+        hasher.update("{}={!r};".format(type(item).__name__, item).encode())
+
+def artifact_key(kind: str, *items) -> Optional[str]:
+    r"""
+    The content address of an artifact: a hash of its kind and of the items it is derived from,
+    e.g., the values of a shape field, the boundaries, spacing and obstacles of a domain, the weights of an operator and the grid size.
+
+    Args:
+        kind (str): The kind of the artifact, e.g., "obstacle_masks".
+        *items: The tensors, domains, numbers, strings, lists and dicts the artifact is derived from.
+
+    Returns:
+        key (Optional[str]): The key, or None if the artifact can not be cached, e.g., if a boundary value is a tensor.
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    try:
+        _update_digest(hasher, [_FORMAT_VERSION, kind, list(items)])
+    except _Unplannable:
+        return None
+    return "{}-{}".format(kind, hasher.hexdigest())
+
+class ArtifactCache():
+    r"""
+    A content-addressed disk cache of the tensors derived from a geometry,
+    e.g., the shape fields of `generate_circle_2D`, the edge masks of the obstacles and the sparse matrices and biases of `assemble`.
+
+    Every artifact is a directory named by its key (see `artifact_key`) with one `.npy` file per tensor,
+    loaded as memory-mapped arrays so a warm start only reads the pages which are used.
+    When the cache grows over `max_bytes`, the least recently used artifacts are removed.
+    The entries are written to a temporary directory and renamed, so concurrent processes can share a cache.
+
+    Examples:
+        ```python
+        enable_cache() # or set the environment variable CONVDO_CACHE=1
+        shape_field = generate_circle_2D(0.5, 0.5, 0.1, 4096, 4096, 1/4096, 1/4096) # computed once, then loaded
+        obstacle = DirichletObstacle(shape_field, 0.0) # the edge masks are loaded as well
+        ```
+
+    Args:
+        directory (str, optional): The directory of the cache. Defaults to the environment variable CONVDO_CACHE_DIR or "~/.cache/convdo/artifacts".
+        enabled (bool, optional): Whether the artifacts are cached. Defaults to False.
+        max_bytes (int, optional): The maximum size of the cache in bytes. Defaults to 2 GiB.
+    """
+
+    def __init__(self,
+                 directory: Optional[str]=None,
+                 enabled: bool=False,
+                 max_bytes: int=2*1024**3) -> None:
+        self.directory = default(directory, _default_directory())
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._write_failed = False
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: Optional[str]) -> Optional[dict]:
+        r"""
+        Load an artifact.
+
+        Args:
+            key (Optional[str]): The key of the artifact.
+
+        Returns:
+            tensors (Optional[dict]): The CPU tensors of the artifact by name, backed by copy-on-write memory maps, or None if the artifact is not cached.
+        """
+        if not self.enabled or key is None:
+            return None
+        # imported here, so `import ConvDO` does not load NumPy.
+        import numpy as np
+        path = self._path(key)
+        try:
+            with open(os.path.join(path, "meta.json"), "r") as file:
+                meta = json.load(file)
+            tensors = {}
+            for name, dtype in meta["tensors"].items():
+                array = np.load(os.path.join(path, name+".npy"), mmap_mode="c")
+                tensor = torch.from_numpy(array)
+                if dtype == str(torch.bfloat16):
+                    tensor = tensor.view(torch.bfloat16)
+                tensors[name] = tensor
+            # the access time used by the eviction.
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return tensors
+
+    def put(self, key: Optional[str], tensors: dict):
+        r"""
+        Store an artifact, then evict the least recently used artifacts if the cache is too large.
+
+        Args:
+            key (Optional[str]): The key of the artifact.
+            tensors (dict): The tensors of the artifact by name.
+        """
+        if not self.enabled or key is None:
+            return
+        import numpy as np
+        with self._lock:
+            temporary = self._path("{}.{}.tmp".format(key, uuid.uuid4().hex))
+            try:
+                os.makedirs(temporary)
+                for name, tensor in tensors.items():
+                    value = tensor.detach().cpu().contiguous()
+                    if value.dtype == torch.bfloat16:
+                        value = value.view(torch.int16)
+                    np.save(os.path.join(temporary, name+".npy"), value.numpy())
+                with open(os.path.join(temporary, "meta.json"), "w") as file:
+                    json.dump({"version": _FORMAT_VERSION, "tensors": {name: str(tensor.dtype) for name, tensor in tensors.items()}}, file)
+                try:
+                    os.rename(temporary, self._path(key))
+                except OSError:
+                    # stored by another process in the meantime.
+                    shutil.rmtree(temporary, ignore_errors=True)
+            except OSError as error:
+                shutil.rmtree(temporary, ignore_errors=True)
+                if not self._write_failed:
+                    warnings.warn("The artifact cache can not be written to '{}': {}".format(self.directory, error))
+                    self._write_failed = True
+                return
+            self.evict()
+
+    def entries(self) -> list:
+        r"""
+        Returns:
+            entries (list): The (key, size in bytes, last access time) of every artifact, from the least to the most recently used.
+        """
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            path = self._path(name)
+            if name.endswith(".tmp") or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                entries.append((name, size, os.stat(path).st_mtime))
+            except OSError:
+                continue
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self) -> int:
+        r"""
+        Returns:
+            size (int): The size of the cache in bytes.
+        """
+        return sum(entry[1] for entry in self.entries())
+
+    def evict(self, max_bytes: Optional[int]=None):
+        r"""
+        Remove the least recently used artifacts until the cache is not larger than `max_bytes`.
+
+        Args:
+            max_bytes (int, optional): The maximum size in bytes. Defaults to None, i.e., `self.max_bytes`.
+        """
+        max_bytes = default(max_bytes, self.max_bytes)
+        with self._lock:
+            entries = self.entries()
+            total = sum(entry[1] for entry in entries)
+            for key, size, _ in entries:
+                if total <= max_bytes:
+                    break
+                shutil.rmtree(self._path(key), ignore_errors=True)
+                total -= size
+
+    def clear(self):
+        r"""
+        Remove every artifact.
+        """
+        self.evict(0)
+
+    def cached(self, key: Optional[str], compute, device=None) -> dict:
+        r"""
+        Load an artifact, or compute and store it.
+
+        Args:
+            key (Optional[str]): The key of the artifact.
+            compute (Callable): A function without arguments returning the tensors of the artifact by name.
+            device (str, optional): The device of the loaded tensors. Defaults to None, i.e., the CPU.
+
+        Returns:
+            tensors (dict): The tensors of the artifact by name.
+        """
+        tensors = self.get(key)
+        if tensors is None:
+            tensors = compute()
+            self.put(key, tensors)
+        elif device is not None:
+            tensors = {name: tensor.to(device) for name, tensor in tensors.items()}
+        if key is not None:
+            for name, tensor in tensors.items():
+                _tensor_digests[tensor] = ("{}/{}".format(key, name), tensor._version)
+        return tensors
+
+# the cache used by `generate_circle_2D`, the obstacles and `assemble`.
+artifact_cache = ArtifactCache(enabled=os.environ.get("CONVDO_CACHE", "0") not in ["", "0", "false", "False"])
+
+def enable_cache(enabled: bool=True, directory: Optional[str]=None, max_bytes: Optional[int]=None):
+    r"""
+    Enable or disable the disk cache of the geometry artifacts, see `ArtifactCache`.
+
+    Args:
+        enabled (bool, optional): Whether to cache. Defaults to True.
+        directory (str, optional): The directory of the cache. Defaults to None, i.e., the directory is not changed,
+            which is the environment variable CONVDO_CACHE_DIR or "~/.cache/convdo/artifacts" unless it was set before.
+        max_bytes (int, optional): The maximum size of the cache in bytes. Defaults to None, i.e., the current size limit.
+    """
+    with artifact_cache._lock:
+        artifact_cache.enabled = enabled
+        if directory is not None:
+            artifact_cache.directory = directory
+        if max_bytes is not None:
+            artifact_cache.max_bytes = max_bytes
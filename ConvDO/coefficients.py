@@ -0,0 +1,17 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+# the weights of the central finite difference stencils by order of accuracy.
+
+CENTRAL_INTERPOLATION_WEIGHTS = {
+    2: [-1/2, 0, 1/2],
+    4: [1/12, -2/3, 0, 2/3, -1/12],
+    6: [-1/60, 3/20, -3/4, 0, 3/4, -3/20, 1/60],
+    8: [1/280, -4/105, 1/5, -4/5, 0, 4/5, -1/5, 4/105, -1/280],
+}
+
+CENTRAL_LAPLACIAN_WEIGHTS = {
+    2: [1, -2, 1],
+    4: [-1/12, 4/3, -5/2, 4/3, -1/12],
+    6: [1/90, -3/20, 3/2, -49/18, 3/2, -3/20, 1/90],
+    8: [-1/560, 8/315, -1/5, 8/5, -205/72, 8/5, -1/5, 8/315, -1/560],
+}
@@ -2,9 +2,57 @@ from .helpers import *
 from .boundaries import *
 from .domain import *
 from .schemes import *
+from .sparse import *
+from .plans import *
+from .autotune import *
 import math
+import numbers
 from typing import Optional
 
+# the data types of the fields evaluated in mixed precision, see `ConvOperator`.
+_LOW_PRECISION_DTYPES = (torch.float16, torch.bfloat16)
+
+def _low_precision_ghosts(domain, direction: str, paded: torch.Tensor, scalar_field: torch.Tensor, delta: float, dtype) -> torch.Tensor:
+    # the boundaries only read the three cells next to them: the ghost cells are computed in `dtype` on strips of these cells
+    # and written into the padded field, which stays in the precision of the field.
+    dim = -1 if direction == "x" else -2
+    length = scalar_field.shape[dim]
+    edges = scalar_field if length <= 6 else torch.cat([scalar_field.narrow(dim, 0, 3), scalar_field.narrow(dim, length-3, 3)], dim=dim)
+    edges = edges.to(dtype)
+    if direction == "x":
+        ghosts = F.pad(edges, (1, 1, 0, 0), mode="constant", value=0)
+        ghosts = domain.left_boundary.correct_left(ghosts, edges, delta)
+        ghosts = domain.right_boundary.correct_right(ghosts, edges, delta)
+    else:
+        ghosts = F.pad(edges, (0, 0, 1, 1), mode="constant", value=0)
+        ghosts = domain.top_boundary.correct_top(ghosts, edges, delta)
+        ghosts = domain.bottom_boundary.correct_bottom(ghosts, edges, delta)
+    paded.narrow(dim, 0, 1).copy_(ghosts.narrow(dim, 0, 1))
+    paded.narrow(dim, paded.shape[dim]-1, 1).copy_(ghosts.narrow(dim, ghosts.shape[dim]-1, 1))
+    return paded
+
+def _low_precision_obstacles(domain, direction: str, paded: torch.Tensor, scalar_field: torch.Tensor, delta: float, dtype) -> torch.Tensor:
+    # only the padded cells next to the obstacles are corrected, in `dtype`, with the sampled corrections of the obstacles (see `Obstacle.sample_left`).
+    mask = None
+    for obstacle in domain.obstacles:
+        if direction == "x":
+            edges = (obstacle.x_left > 0.5) | (obstacle.x_right > 0.5)
+        else:
+            edges = (obstacle.y_top > 0.5) | (obstacle.y_bottom > 0.5)
+        edges = edges.reshape(-1, *edges.shape[-2:]).any(dim=0)
+        mask = edges if mask is None else mask | edges
+    rows, cols = torch.nonzero(mask, as_tuple=True)
+    values = paded[..., rows, cols].to(dtype)
+    for obstacle in domain.obstacles:
+        if direction == "x":
+            values = obstacle.sample_left(values, scalar_field, rows, cols, delta)
+            values = obstacle.sample_right(values, scalar_field, rows, cols, delta)
+        else:
+            values = obstacle.sample_top(values, scalar_field, rows, cols, delta)
+            values = obstacle.sample_bottom(values, scalar_field, rows, cols, delta)
+    paded[..., rows, cols] = values.to(paded.dtype)
+    return paded
+
 class ScalarField(CommutativeValue):
     r"""ScalarField is a class for scalar fields.
 
@@ -65,8 +113,34 @@ class ScalarField(CommutativeValue):
                 return ScalarField(other/self.value,other/self.domain)
             except:
                 return NotImplemented
+
+    def sample(self,index):
+        r"""Get the values of the scalar field at the given cells.
+
+        Args:
+            index (Sequence[torch.Tensor]): The row and column indices `(rows, cols)` of the cells, two integer tensors of shape (N,).
+
+        Returns:
+            values (torch.Tensor): The values with shape (B,C,N).
+        """
+        return self.value[...,index[0],index[1]]
         
 class ConvOperator():
+    r"""
+    Convolutional finite difference operator for a scalar field, usually created with `ConvGrad` or `ConvGrad2`.
+
+    Fields in float16 or bfloat16 are evaluated in mixed precision if the operator has a higher precision:
+    the padded field, the stencil and the result are stored in the precision of the field,
+    while the ghost cells, the obstacle corrections and the scaling by the grid spacing are computed in the precision of the operator.
+    The scaled stencil, e.g., $1/\Delta x^2$ for $\Delta x=1/1024$, would overflow in float16, so the unscaled stencil is applied and the result is scaled afterwards.
+
+    Args:
+        scheme (FDScheme): The finite difference scheme.
+        direction (str, optional): The direction of the derivative, "x" or "y". Defaults to "x".
+        derivative (int, optional): The order of the derivative. Defaults to 1.
+        device (str, optional): The device of the kernel. Defaults to "cpu".
+        dtype (torch.dtype, optional): The data type of the kernel. Defaults to torch.float32.
+    """
     def __init__(self, scheme, direction="x", derivative=1, device="cpu", dtype=torch.float32) -> None:
         self.direction = direction
         if direction == "x":
@@ -90,9 +164,16 @@ class ConvOperator():
 
     def __mul__(self, other):
         if isinstance(other, ScalarField):
+            if plan_cache.enabled:
+                # the plan is computed once for the field shape and the domain signature, see `PlanCache`.
+                plan = plan_cache.get(self, other.domain, other.value)
+                if plan is not None:
+                    backend = autotuner.select(plan.module, other.value) if autotuner.enabled else plan.module.backend
+                    return ScalarField(plan.module.evaluate(other.value, backend), plan.output_domain)
             if (not self.high_order) or (self.high_order and self.allow_highorder(other.domain)):
                 domain = other.domain
                 scalar_field = other.value
+                low_precision = scalar_field.dtype in _LOW_PRECISION_DTYPES and scalar_field.dtype != self.kernel.dtype
                 if self.direction == "x":
                     delta = math.pow(other.domain.delta_x, self.derivative)
                 else:
@@ -106,8 +187,11 @@ class ConvOperator():
                     if self.direction == "x":
                         paded = F.pad(scalar_field, (self.pad, self.pad,
                                 0,0), mode="constant", value=0)
-                        paded=other.domain.left_boundary.correct_left(paded,scalar_field,delta)
-                        paded=other.domain.right_boundary.correct_right(paded,scalar_field,delta)
+                        if low_precision:
+                            paded = _low_precision_ghosts(domain, "x", paded, scalar_field, delta, self.kernel.dtype)
+                        else:
+                            paded=other.domain.left_boundary.correct_left(paded,scalar_field,delta)
+                            paded=other.domain.right_boundary.correct_right(paded,scalar_field,delta)
                         # the following pad is due to the shape issue if Neumann boundary. 
                         # TODO: modify neumann boundary to avoid this padding
                         paded = F.pad(paded, (0, 0,
@@ -115,18 +199,30 @@ class ConvOperator():
                     else:
                         paded = F.pad(scalar_field, (0, 0,
                                 self.pad,self.pad), mode="constant", value=0)
-                        paded=other.domain.top_boundary.correct_top(paded,scalar_field,delta)
-                        paded=other.domain.bottom_boundary.correct_bottom(paded,scalar_field,delta)
+                        if low_precision:
+                            paded = _low_precision_ghosts(domain, "y", paded, scalar_field, delta, self.kernel.dtype)
+                        else:
+                            paded=other.domain.top_boundary.correct_top(paded,scalar_field,delta)
+                            paded=other.domain.bottom_boundary.correct_bottom(paded,scalar_field,delta)
                         paded = F.pad(paded, (self.pad, self.pad,
                                 0,0), mode="constant", value=0)
-                for obstacle in domain.obstacles:
-                    if self.direction == "x":
-                        paded = obstacle.correct_left(paded, scalar_field, delta)
-                        paded = obstacle.correct_right(paded, scalar_field, delta)
-                    else:
-                        paded = obstacle.correct_top(paded, scalar_field, delta)
-                        paded = obstacle.correct_bottom(paded, scalar_field, delta)
-                operated = F.conv2d(paded, self.kernel/delta, padding=0)
+                if low_precision:
+                    if len(domain.obstacles) > 0:
+                        paded = _low_precision_obstacles(domain, self.direction, paded, scalar_field, delta, self.kernel.dtype)
+                else:
+                    for obstacle in domain.obstacles:
+                        if self.direction == "x":
+                            paded = obstacle.correct_left(paded, scalar_field, delta)
+                            paded = obstacle.correct_right(paded, scalar_field, delta)
+                        else:
+                            paded = obstacle.correct_top(paded, scalar_field, delta)
+                            paded = obstacle.correct_bottom(paded, scalar_field, delta)
+                if low_precision:
+                    # the unscaled stencil, then the scaling in place: elementwise operations on half precision tensors are computed in float32
+                    # and rounded once, so the scaled stencil, which would overflow in float16, is never stored.
+                    operated = F.conv2d(paded, self.kernel.to(scalar_field.dtype), padding=0).mul_(1/delta)
+                else:
+                    operated = F.conv2d(paded, self.kernel/delta, padding=0)
                 if not self.high_order:
                     for obstacle in domain.obstacles:
                         operated = obstacle.fill_internal_field(operated)
@@ -145,9 +241,130 @@ class ConvOperator():
             else:
                 raise ValueError(
                     "High order gradient only support PeriodicBoundary with no obstacles inside.")
+        elif _operator_terms(other) is not None:
+            # composition, e.g., grad_x*grad_y, see `ComposedOperator`.
+            return ComposedOperator(_operator_terms(self))*other
+        elif isinstance(other, numbers.Number):
+            return ComposedOperator(_operator_terms(self))*other
         else:
             raise NotImplementedError("Operation not supported")
 
+    def __rmul__(self, other):
+        if isinstance(other, numbers.Number):
+            return other*ComposedOperator(_operator_terms(self))
+        return NotImplemented
+
+    def __matmul__(self, other):
+        if _operator_terms(other) is not None:
+            return ComposedOperator(_operator_terms(self))*other
+        return NotImplemented
+
+    def __add__(self, other):
+        if _operator_terms(other) is not None:
+            return ComposedOperator(_operator_terms(self))+other
+        return NotImplemented
+
+    def __sub__(self, other):
+        if _operator_terms(other) is not None:
+            return ComposedOperator(_operator_terms(self))-other
+        return NotImplemented
+
+    def __neg__(self):
+        return -ComposedOperator(_operator_terms(self))
+
+    def sample(self, other, index):
+        r"""
+        Evaluate the operator only at the given cells.
+        Only the stencil values of the sampled cells are gathered, including the boundary and obstacle corrections,
+        so the cost scales with the number of sampled cells instead of the size of the field.
+        The result equals `(self*other).value[...,rows,cols]`.
+
+        Args:
+            other (ScalarField): The scalar field.
+            index (Sequence[torch.Tensor]): The row and column indices `(rows, cols)` of the cells, two integer tensors of shape (N,).
+
+        Returns:
+            values (torch.Tensor): The values of the derivative with shape (B,C,N).
+        """
+        if not isinstance(other, ScalarField):
+            raise NotImplementedError("Operation not supported")
+        domain = other.domain
+        if self.high_order and not self.allow_highorder(domain):
+            raise ValueError(
+                "High order gradient only support PeriodicBoundary with no obstacles inside.")
+        scalar_field = other.value
+        rows = torch.as_tensor(index[0], device=scalar_field.device, dtype=torch.long)
+        cols = torch.as_tensor(index[1], device=scalar_field.device, dtype=torch.long)
+        if self.direction == "x":
+            delta = math.pow(domain.delta_x, self.derivative)
+            periodic = isinstance(domain.left_boundary, PeriodicBoundary)
+            weights = self.kernel[0, 0, self.pad, :]/delta
+            positions = cols
+            length = scalar_field.shape[-1]
+        else:
+            delta = math.pow(domain.delta_y, self.derivative)
+            periodic = isinstance(domain.top_boundary, PeriodicBoundary)
+            weights = self.kernel[0, 0, :, self.pad]/delta
+            positions = rows
+            length = scalar_field.shape[-2]
+        if len(domain.obstacles) > 0 and self.pad != 1:
+            raise ValueError("Obstacles only support schemes with a three point stencil.")
+        if not periodic:
+            # ghost values of the sampled rows/columns, computed by the boundaries themselves on the three boundary cells.
+            n_cells = min(3, length)
+            if self.direction == "x":
+                start_cells = scalar_field[..., rows[:, None], torch.arange(n_cells, device=rows.device)]
+                end_cells = scalar_field[..., rows[:, None], torch.arange(length-n_cells, length, device=rows.device)]
+                ghost_start = domain.left_boundary.correct_left(torch.zeros_like(start_cells), start_cells, delta)[..., 0]
+                ghost_end = domain.right_boundary.correct_right(torch.zeros_like(end_cells), end_cells, delta)[..., -1]
+            else:
+                start_cells = scalar_field[..., torch.arange(n_cells, device=cols.device)[:, None], cols]
+                end_cells = scalar_field[..., torch.arange(length-n_cells, length, device=cols.device)[:, None], cols]
+                ghost_start = domain.top_boundary.correct_top(torch.zeros_like(start_cells), start_cells, delta)[..., 0, :]
+                ghost_end = domain.bottom_boundary.correct_bottom(torch.zeros_like(end_cells), end_cells, delta)[..., -1, :]
+        operated = 0
+        for i_weight, weight in enumerate(weights.tolist()):
+            if weight == 0:
+                continue
+            # the padded position is taken before wrapping, the obstacle masks are not periodic.
+            shifted = positions+i_weight-self.pad
+            neighbours = torch.remainder(shifted, length) if periodic else shifted
+            if self.direction == "x":
+                padded_rows, padded_cols = rows+1, shifted+1
+                values = scalar_field[..., rows, neighbours.clamp(0, length-1)]
+            else:
+                padded_rows, padded_cols = shifted+1, cols+1
+                values = scalar_field[..., neighbours.clamp(0, length-1), cols]
+            if not periodic:
+                values = torch.where(neighbours < 0, ghost_start, values)
+                values = torch.where(neighbours >= length, ghost_end, values)
+            for obstacle in domain.obstacles:
+                if self.direction == "x":
+                    values = obstacle.sample_left(values, scalar_field, padded_rows, padded_cols, delta)
+                    values = obstacle.sample_right(values, scalar_field, padded_rows, padded_cols, delta)
+                else:
+                    values = obstacle.sample_top(values, scalar_field, padded_rows, padded_cols, delta)
+                    values = obstacle.sample_bottom(values, scalar_field, padded_rows, padded_cols, delta)
+            operated = operated+weight*values
+        if not self.high_order:
+            for obstacle in domain.obstacles:
+                operated = obstacle.sample_internal_field(operated, rows, cols)
+        return operated
+
+    def to_sparse(self, domain: Domain, shape, layout: str="csr"):
+        r"""
+        Assemble the operator as a sparse matrix with an affine bias, see `assemble`.
+
+        Args:
+            domain (Domain): The domain of the field.
+            shape (Sequence[int]): The shape (H,W) of the field.
+            layout (str, optional): The layout of the sparse matrix, "csr" or "coo". Defaults to "csr".
+
+        Returns:
+            SparseOperator (SparseOperator): The assembled operator.
+        """
+        return assemble(self, domain, shape, layout=layout)
+
 
 def ConvGrad(order: int=2, direction: str="x", device="cpu", dtype=torch.float32):
     r"""
@@ -276,4 +493,277 @@ class ConvLaplacian():
             return VectorValue(
                 self.op_x*other.ux+self.op_y*other.ux,
                 self.op_x*other.uy+self.op_y*other.uy
-            )
\ No newline at end of file
+            )
+        elif _operator_terms(other) is not None:
+            # composition, e.g., the biharmonic operator nabla2*nabla2, see `ComposedOperator`.
+            return ComposedOperator(_operator_terms(self))*other
+        elif isinstance(other, numbers.Number):
+            return ComposedOperator(_operator_terms(self))*other
+        else:
+            raise NotImplementedError("Operation not supported")
+
+    def __rmul__(self, other):
+        if isinstance(other, numbers.Number):
+            return other*ComposedOperator(_operator_terms(self))
+        return NotImplemented
+
+    def __matmul__(self, other):
+        if _operator_terms(other) is not None:
+            return ComposedOperator(_operator_terms(self))*other
+        return NotImplemented
+
+    def __add__(self, other):
+        if _operator_terms(other) is not None:
+            return ComposedOperator(_operator_terms(self))+other
+        return NotImplemented
+
+    def __sub__(self, other):
+        if _operator_terms(other) is not None:
+            return ComposedOperator(_operator_terms(self))-other
+        return NotImplemented
+
+    def __neg__(self):
+        return -ComposedOperator(_operator_terms(self))
+
+    def sample(self, other, index):
+        r"""
+        Evaluate the Laplacian only at the given cells, see `ConvOperator.sample`.
+
+        Args:
+            other (Union[ScalarField,VectorValue]): The scalar field or the vector field.
+            index (Sequence[torch.Tensor]): The row and column indices `(rows, cols)` of the cells, two integer tensors of shape (N,).
+
+        Returns:
+            values (Union[torch.Tensor,VectorValue]): The values with shape (B,C,N), or a `VectorValue` of them for a vector field.
+        """
+        if isinstance(other, ScalarField):
+            return self.op_x.sample(other, index)+self.op_y.sample(other, index)
+        elif isinstance(other, VectorValue):
+            return VectorValue(
+                self.op_x.sample(other.ux, index)+self.op_y.sample(other.ux, index),
+                self.op_x.sample(other.uy, index)+self.op_y.sample(other.uy, index)
+            )
+
+    def to_sparse(self, domain: Domain, shape, layout: str="csr"):
+        r"""
+        Assemble the Laplacian of a scalar field as a sparse matrix with an affine bias, see `assemble`.
+
+        Args:
+            domain (Domain): The domain of the field.
+            shape (Sequence[int]): The shape (H,W) of the field.
+            layout (str, optional): The layout of the sparse matrix, "csr" or "coo". Defaults to "csr".
+
+        Returns:
+            SparseOperator (SparseOperator): The assembled operator.
+        """
+        return assemble(self, domain, shape, layout=layout)
+
+def _operator_terms(operator) -> list:
+    # the operator as a sum of products of `ConvOperator`s: a list of (coefficient, operators), the operators are written from left to right.
+    if isinstance(operator, ConvOperator):
+        return [(1.0, (operator,))]
+    if isinstance(operator, ConvLaplacian):
+        return [(1.0, (operator.op_x,)), (1.0, (operator.op_y,))]
+    if isinstance(operator, ComposedOperator):
+        return list(operator.terms)
+    return None
+
+def _compose_kernels(first: torch.Tensor, second: torch.Tensor) -> torch.Tensor:
+    # the kernel of applying `first` then `second`: the full convolution of the (1,1,K,K) kernels, as `F.conv2d` is a cross-correlation.
+    pad = second.shape[-1]-1
+    return F.conv2d(F.pad(first, (pad, pad, pad, pad)), torch.flip(second, dims=(-2, -1)))
+
+def _center_pad(kernel: torch.Tensor, size: int) -> torch.Tensor:
+    pad = (size-kernel.shape[-1])//2
+    return F.pad(kernel, (pad, pad, pad, pad))
+
+class ComposedOperator():
+    r"""
+    A sum of products of `ConvOperator`s, e.g., a mixed derivative, a Laplacian or a biharmonic operator,
+    created by multiplying (`*` or `@`), adding or scaling `ConvOperator`s, `ConvLaplacian`s and `ComposedOperator`s.
+
+    The stencils are precomposed: if every direction of the operator is periodic and the domain has no obstacles,
+    the operator is applied as a single convolution with the composed stencil, without intermediate fields.
+    Otherwise, the operators are applied one after another, where every operator treats the boundaries of its intermediate result as `UnConstrainedBoundary`,
+    so the result always equals the chained application, e.g., `grad_x*(grad_y*p)`.
+    The composed stencil is applied in the data type of the operators.
+
+    Examples:
+        ```python
+        grad_x = ConvGrad(order=2, direction="x")
+        grad_y = ConvGrad(order=2, direction="y")
+        mixed = grad_x*grad_y # or ConvMixedGrad(order=2)
+        mixed*p # equals grad_x*(grad_y*p) with a single convolution for periodic domains
+        nabla2 = ConvLaplacian(order=2)
+        biharmonic = nabla2*nabla2 # or ConvBiharmonic(order=2)
+        ```
+
+    Args:
+        terms (Sequence): The terms as (coefficient, operators) pairs, where the operators of a term are applied from the last to the first.
+    """
+
+    def __init__(self, terms) -> None:
+        self.terms = [(float(coefficient), tuple(operators)) for coefficient, operators in terms]
+        if len(self.terms) == 0:
+            raise ValueError("ComposedOperator needs at least one term")
+        reference = self.terms[0][1][0].kernel
+        size = 1
+        self._kernels = []
+        for coefficient, operators in self.terms:
+            kernel = operators[-1].kernel.to(device=reference.device, dtype=reference.dtype)
+            for operator in reversed(operators[:-1]):
+                kernel = _compose_kernels(kernel, operator.kernel.to(device=reference.device, dtype=reference.dtype))
+            size = max(size, kernel.shape[-1])
+            # the grid spacing is applied on the call: delta_x**x_order*delta_y**y_order.
+            x_order = sum(operator.derivative for operator in operators if operator.direction == "x")
+            y_order = sum(operator.derivative for operator in operators if operator.direction == "y")
+            self._kernels.append((coefficient, kernel, x_order, y_order))
+        self._kernels = [(coefficient, _center_pad(kernel, size), x_order, y_order) for coefficient, kernel, x_order, y_order in self._kernels]
+        self.pad = (size-1)//2
+        self.directions = set(operator.direction for _, operators in self.terms for operator in operators)
+        self._scaled_kernels = {}
+
+    def kernel(self, delta_x: float, delta_y: float) -> torch.Tensor:
+        r"""
+        The composed stencil for a grid spacing.
+
+        Args:
+            delta_x (float): The grid spacing in x direction.
+            delta_y (float): The grid spacing in y direction.
+
+        Returns:
+            kernel (torch.Tensor): The kernel with shape (1,1,2*pad+1,2*pad+1).
+        """
+        key = (float(delta_x), float(delta_y))
+        if key not in self._scaled_kernels:
+            self._scaled_kernels[key] = sum(kernel*(coefficient/(math.pow(delta_x, x_order)*math.pow(delta_y, y_order)))
+                                            for coefficient, kernel, x_order, y_order in self._kernels)
+        return self._scaled_kernels[key]
+
+    def allow_precomposed(self, domain: Domain) -> bool:
+        r"""
+        Whether the operator is applied with the composed stencil on a domain:
+        every direction of the operator is periodic and the domain has no obstacles.
+
+        Args:
+            domain (Domain): The domain of the field.
+        """
+        if len(domain.obstacles) > 0:
+            return False
+        if "x" in self.directions and not isinstance(domain.left_boundary, PeriodicBoundary):
+            return False
+        if "y" in self.directions and not isinstance(domain.top_boundary, PeriodicBoundary):
+            return False
+        return True
+
+    def _apply(self, other: ScalarField) -> ScalarField:
+        domain = other.domain
+        if not self.allow_precomposed(domain):
+            result = None
+            for coefficient, operators in self.terms:
+                value = other
+                for operator in reversed(operators):
+                    value = operator*value
+                value = value*coefficient if coefficient != 1.0 else value
+                result = value if result is None else result+value
+            return result
+        kernel = self.kernel(domain.delta_x, domain.delta_y)
+        scalar_field = other.value
+        paded = F.pad(scalar_field.to(kernel.dtype), (self.pad, self.pad, self.pad, self.pad), mode="circular")
+        operated = F.conv2d(paded, kernel, padding=0)
+        return ScalarField(
+            operated,
+            Domain(
+                boundaries=[
+                    PeriodicBoundary() if isinstance(boundary, PeriodicBoundary) else UnConstrainedBoundary() for boundary in [domain.left_boundary,
+                                                                                                                               domain.right_boundary,
+                                                                                                                               domain.top_boundary,
+                                                                                                                               domain.bottom_boundary]
+                ],
+                delta_x=domain.delta_x, delta_y=domain.delta_y,
+                obstacles=[])
+        )
+
+    def __mul__(self, other):
+        if isinstance(other, ScalarField):
+            return self._apply(other)
+        elif isinstance(other, VectorValue):
+            return VectorValue(self._apply(other.ux), self._apply(other.uy))
+        terms = _operator_terms(other)
+        if terms is not None:
+            return ComposedOperator([(coefficient*other_coefficient, operators+other_operators)
+                                     for coefficient, operators in self.terms for other_coefficient, other_operators in terms])
+        try:
+            return ComposedOperator([(coefficient*other, operators) for coefficient, operators in self.terms])
+        except Exception:
+            return NotImplemented
+
+    def __rmul__(self, other):
+        try:
+            return ComposedOperator([(other*coefficient, operators) for coefficient, operators in self.terms])
+        except Exception:
+            return NotImplemented
+
+    def __matmul__(self, other):
+        return self*other
+
+    def __add__(self, other):
+        terms = _operator_terms(other)
+        if terms is None:
+            return NotImplemented
+        return ComposedOperator(self.terms+terms)
+
+    def __radd__(self, other):
+        terms = _operator_terms(other)
+        if terms is None:
+            return NotImplemented
+        return ComposedOperator(terms+self.terms)
+
+    def __sub__(self, other):
+        terms = _operator_terms(other)
+        if terms is None:
+            return NotImplemented
+        return ComposedOperator(self.terms+[(-coefficient, operators) for coefficient, operators in terms])
+
+    def __neg__(self):
+        return ComposedOperator([(-coefficient, operators) for coefficient, operators in self.terms])
+
+def ConvMixedGrad(order: int=2, device="cpu", dtype=torch.float32):
+    r"""
+    Mixed derivative operator $\partial^2 / \partial x \partial y$ for a scalar, see `ComposedOperator`.
+    The single precomposed stencil is only used if the domain is periodic in both directions and has no obstacles.
+    On any other domain, the derivatives are applied one after another, i.e., `grad_x*(grad_y*p)`, with one convolution and intermediate field per derivative.
+
+    Examples:
+        ```python
+        p=ScalarField(torch.rand(1,1,10,10))
+        grad_xy = ConvMixedGrad(order=2, device="cpu", dtype=torch.float32)
+        grad_xy*p # $\partial^2 p / \partial x \partial y$
+        ```
+
+    Args:
+        order (int): The order of the central interpolation scheme (default is 2).
+        device (str, optional): The device to use for computation (default is "cpu").
+        dtype (torch.dtype, optional): The data type to use for computation (default is torch.float32).
+
+    Returns:
+        ComposedOperator (ComposedOperator): The mixed derivative operator.
+    """
+    return ComposedOperator([(1.0, (ConvGrad(order, "x", device=device, dtype=dtype), ConvGrad(order, "y", device=device, dtype=dtype)))])
+
+def ConvBiharmonic(order: int=2, device="cpu", dtype=torch.float32):
+    r"""
+    Biharmonic operator $\nabla^4 = \partial^4 / \partial x^4 + 2\partial^4 / \partial x^2 \partial y^2 + \partial^4 / \partial y^4$ for a scalar, see `ComposedOperator`.
+    The single precomposed stencil is only used if the domain is periodic in both directions and has no obstacles.
+    On any other domain, the Laplacians are applied one after another, i.e., `nabla2*(nabla2*p)`, where the inner result has `UnConstrainedBoundary` conditions.
+
+    Args:
+        order (int): The order of the central Laplacian scheme (default is 2).
+        device (str, optional): The device to use for computation (default is "cpu").
+        dtype (torch.dtype, optional): The data type to use for computation (default is torch.float32).
+
+    Returns:
+        ComposedOperator (ComposedOperator): The biharmonic operator.
+    """
+    nabla2 = ConvLaplacian(order, device=device, dtype=dtype)
+    return nabla2*nabla2
@@ -1,6 +1,5 @@
 #usr/bin/python3
 # -*- coding: UTF-8 -*-
-from .helpers import *
 from .meta_type import *
 from .boundaries import *
 from typing import Sequence
@@ -0,0 +1,141 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+import os
+import threading
+import concurrent.futures
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+# each worker (thread or process) keeps its own operation instance here.
+_worker_state = threading.local()
+
+def _init_worker(operation_factory, num_threads):
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    _worker_state.operation = operation_factory()
+
+def _as_snapshots(field):
+    field = torch.as_tensor(field)
+    if len(field.shape) == 3:
+        field = field.unsqueeze(1)
+    return field
+
+def _evaluate_chunk(fields, ord):
+    with torch.no_grad():
+        residual = _worker_state.operation(*[_as_snapshots(field) for field in fields])
+        return torch.linalg.vector_norm(residual.flatten(-2), ord=ord, dim=-1)
+
+class ResidualEvaluator():
+    r"""
+    Evaluate a residual operation over a large set of snapshots with a pool of workers.
+
+    The snapshots are split into chunks of `batch_size` and each chunk is evaluated by one worker.
+    Every worker builds its operation once by calling `operation_factory`, as the process workers can not use the operation of the parent process.
+    The residual operations are stateless, so the thread workers would give the same results with a single shared operation.
+    The result is the norm of the residual of every snapshot and every residual channel.
+
+    Examples:
+        ```python
+        def build_operation():
+            domain = PeriodicDomain(delta_x=2*3.14/64, delta_y=2*3.14/64)
+            return PoissonDivergence(domain, domain, domain, order=2)
+
+        with ResidualEvaluator(build_operation, num_workers=4) as evaluator:
+            norms = evaluator.evaluate(u, v, p) # u,v,p: (N,H,W) tensors, norms: (N,2)
+        ```
+
+    Args:
+        operation_factory (Callable): A callable without arguments returning the residual operation, e.g., a `PoissonDivergence` or a `TransientNS`.
+            For the process backend, it must be picklable, e.g., a module-level function or a `functools.partial` of one.
+        num_workers (int, optional): The number of workers. Defaults to `os.cpu_count()`.
+        backend (str, optional): The pool type, "thread" or "process". Defaults to "thread".
+        threads_per_worker (int, optional): The number of intra-op threads (`torch.set_num_threads`) of each process worker.
+            Defaults to `os.cpu_count()//num_workers` (at least 1). The thread backend ignores it,
+            as the intra-op thread number is a process-wide setting which would also change the threads of the caller.
+        batch_size (int, optional): The number of snapshots evaluated by a worker in one call. Defaults to 16.
+        ord (float, optional): The order of the norm computed over every residual channel. Defaults to 2.
+    """
+
+    def __init__(self,
+                 operation_factory: Callable,
+                 num_workers: Optional[int]=None,
+                 backend: str="thread",
+                 threads_per_worker: Optional[int]=None,
+                 batch_size: int=16,
+                 ord: float=2) -> None:
+        cpu_count = os.cpu_count() or 1
+        self.num_workers = default(num_workers, cpu_count)
+        self.threads_per_worker = default(threads_per_worker, max(1, cpu_count//self.num_workers))
+        self.batch_size = batch_size
+        self.ord = ord
+        self.backend = backend
+        if backend == "thread":
+            self.executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.num_workers,
+                initializer=_init_worker,
+                initargs=(operation_factory, None))
+        elif backend == "process":
+            # forked workers may deadlock in the OpenMP runtime of the parent, so the workers are spawned.
+            import torch.multiprocessing as mp
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=mp.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(operation_factory, self.threads_per_worker))
+        else:
+            raise ValueError("backend must be 'thread' or 'process', got '{}'".format(backend))
+
+    def _chunks(self, fields: Sequence):
+        num_snapshots = fields[0].shape[0]
+        for field in fields:
+            if field.shape[0] != num_snapshots:
+                raise ValueError("All the fields need to have the same number of snapshots.")
+        for start in range(0, num_snapshots, self.batch_size):
+            yield [field[start:start+self.batch_size] for field in fields]
+
+    def evaluate(self, *fields) -> torch.Tensor:
+        r"""
+        Evaluate the residual norms of all snapshots.
+
+        Args:
+            *fields (torch.Tensor): The input fields of the operation in the order of its `__call__` arguments.
+                The shape of every field should be (N,H,W) or (N,1,H,W).
+                Numpy arrays (including memory-mapped arrays) are also accepted.
+
+        Returns:
+            norms (torch.Tensor): The residual norms with shape (N,C), where C is the number of residual channels.
+        """
+        fields = [torch.as_tensor(field) for field in fields]
+        futures = [self.executor.submit(_evaluate_chunk, chunk, self.ord) for chunk in self._chunks(fields)]
+        return torch.cat([future.result() for future in futures], dim=0)
+
+    def evaluate_batches(self, batches: Iterable[Sequence]) -> Iterator[torch.Tensor]:
+        r"""
+        Evaluate the residual norms of a stream of batches.
+        At most `2*num_workers` batches are in flight, so the memory use does not grow with the length of the stream.
+
+        Args:
+            batches (Iterable[Sequence]): An iterable of field tuples, each tuple is the input of the operation for one batch.
+
+        Yields:
+            norms (torch.Tensor): The residual norms of each batch with shape (B,C), in the order of the input batches.
+        """
+        pending = []
+        for batch in batches:
+            pending.append(self.executor.submit(_evaluate_chunk, list(batch), self.ord))
+            if len(pending) >= 2*self.num_workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+    def close(self):
+        r"""
+        Shut down the worker pool.
+        """
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,74 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+from .frozen import *
+from typing import Optional, Sequence
+
+def _example_inputs(module: nn.Module, shape: Sequence[int], batch_size: int):
+    dtype = next(module.buffers()).dtype
+    device = next(module.buffers()).device
+    num_inputs = 6 if isinstance(module, FrozenTransientNS) else 3
+    return tuple(torch.rand(batch_size, 1, *shape, dtype=dtype, device=device) for _ in range(num_inputs))
+
+def export_torchscript(operation, shape: Sequence[int], path: Optional[str]=None):
+    r"""
+    Export a residual operation (e.g., `TransientNS` or `PoissonDivergence`) as a standalone TorchScript module.
+    The operation is frozen for the field shape, so the kernels, the boundary biases and the obstacle masks are buffers of the module
+    and the module can be loaded with `torch.jit.load` (or `load_torchscript`) without importing ConvDO.
+
+    Args:
+        operation (FieldOperations): The residual operation with a `freeze` method.
+        shape (Sequence[int]): The shape (H,W) of the fields.
+        path (str, optional): If given, the scripted module is saved to this path. Defaults to None.
+
+    Returns:
+        module (torch.jit.ScriptModule): The scripted module.
+    """
+    module = torch.jit.script(operation.freeze(shape).eval())
+    if path is not None:
+        torch.jit.save(module, path)
+    return module
+
+def load_torchscript(path: str, map_location=None):
+    r"""
+    Load a module exported by `export_torchscript`.
+
+    Args:
+        path (str): The path of the saved module.
+        map_location (str, optional): The device to load the module on. Defaults to None.
+
+    Returns:
+        module (torch.jit.ScriptModule): The module.
+    """
+    return torch.jit.load(path, map_location=map_location)
+
+def export_onnx(operation, shape: Sequence[int], path: str, batch_size: int=1, dynamic_batch: bool=True, opset_version: int=17):
+    r"""
+    Export a residual operation (e.g., `TransientNS` or `PoissonDivergence`) as an ONNX model.
+    The inputs are named after the arguments of the operation and the output is named "residual".
+
+    Args:
+        operation (FieldOperations): The residual operation with a `freeze` method.
+        shape (Sequence[int]): The shape (H,W) of the fields.
+        path (str): The path of the ONNX file.
+        batch_size (int, optional): The batch size of the example inputs used for the export. Defaults to 1.
+        dynamic_batch (bool, optional): Whether the exported model accepts any batch size. Defaults to True.
+        opset_version (int, optional): The ONNX opset version. Defaults to 17.
+
+    Returns:
+        module (nn.Module): The frozen module that was exported.
+    """
+    module = operation.freeze(shape).eval()
+    inputs = _example_inputs(module, shape, batch_size)
+    if len(inputs) == 6:
+        input_names = ["u_0", "v_0", "p_0", "u_1", "v_1", "p_1"]
+    else:
+        input_names = ["u", "v", "p"]
+    dynamic_axes = {name: {0: "batch"} for name in input_names+["residual"]} if dynamic_batch else None
+    with torch.no_grad():
+        torch.onnx.export(module, inputs, path,
+                          input_names=input_names,
+                          output_names=["residual"],
+                          dynamic_axes=dynamic_axes,
+                          opset_version=opset_version)
+    return module
@@ -1,6 +1,5 @@
 #usr/bin/python3
 # -*- coding: UTF-8 -*-
-from .helpers import *
 
 class DirichletFace():
     
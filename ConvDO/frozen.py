@@ -0,0 +1,390 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+from .boundaries import *
+from .domain import *
+from .conv_operators import *
+from .autotune import STENCIL_BACKENDS
+import math
+from typing import List, Sequence
+
+# obstacle corrections read at most three cells on each side along the derivative direction.
+_OBSTACLE_REACH = 3
+
+def _probe_ghosts(operator: ConvOperator, domain: Domain, delta: float):
+    # the ghost cells of the boundaries are affine in the three cells next to the boundary:
+    # ghost = bias + sum(coefficients*cells), probed with the zero field and the three unit fields.
+    dtype, device = operator.kernel.dtype, operator.kernel.device
+    basis = torch.cat([torch.zeros(1, 3, dtype=dtype, device=device), torch.eye(3, dtype=dtype, device=device)], dim=0)
+    if operator.direction == "x":
+        ori = basis.reshape(4, 1, 1, 3)
+        padded = F.pad(ori, (1, 1, 0, 0), mode="constant", value=0)
+        padded = domain.left_boundary.correct_left(padded, ori, delta)
+        padded = domain.right_boundary.correct_right(padded, ori, delta)
+        start, end = padded[:, 0, 0, 0], padded[:, 0, 0, -1]
+    else:
+        ori = basis.reshape(4, 1, 3, 1)
+        padded = F.pad(ori, (0, 0, 1, 1), mode="constant", value=0)
+        padded = domain.top_boundary.correct_top(padded, ori, delta)
+        padded = domain.bottom_boundary.correct_bottom(padded, ori, delta)
+        start, end = padded[:, 0, 0, 0], padded[:, 0, -1, 0]
+    # [bias, coefficient of the first cell, second cell, third cell]; for the end, the cells are the last three cells in order.
+    return torch.cat([start[:1], start[1:]-start[0]]), torch.cat([end[:1], end[1:]-end[0]])
+
+def _apply_obstacles(operator: ConvOperator, domain: Domain, padded: torch.Tensor, ori: torch.Tensor, delta: float):
+    for obstacle in domain.obstacles:
+        if operator.direction == "x":
+            padded = obstacle.correct_left(padded, ori, delta)
+            padded = obstacle.correct_right(padded, ori, delta)
+        else:
+            padded = obstacle.correct_top(padded, ori, delta)
+            padded = obstacle.correct_bottom(padded, ori, delta)
+    return padded
+
+def _probe_obstacles(operator: ConvOperator, domain: Domain, shape: Sequence[int], delta: float):
+    # the corrected padded values are affine in the cells within _OBSTACLE_REACH along the derivative direction.
+    # returns the mask, the bias and the coefficients of every offset in the "derivative direction last" layout, cropped to the rows used by the convolution.
+    dtype, device = operator.kernel.dtype, operator.kernel.device
+    height, width = shape
+    def corrected(ori):
+        return _apply_obstacles(operator, domain, F.pad(ori, (1, 1, 1, 1), mode="constant", value=0), ori, delta)
+    def direction_last(value):
+        value = value.transpose(-1, -2) if operator.direction == "y" else value
+        return value[..., 1:-1, :]
+    # a local generator, so the probe does not advance the global random stream of the user.
+    generator = torch.Generator(device=device).manual_seed(0)
+    random = torch.rand(1, 1, height, width, dtype=dtype, device=device, generator=generator)
+    mask = corrected(random) != F.pad(random, (1, 1, 1, 1), mode="constant", value=0)
+    if not mask.any():
+        return None
+    mask = direction_last(mask)
+    if mask[..., 0].any() or mask[..., -1].any():
+        raise ValueError("Obstacles touching the boundary of the domain can not be frozen.")
+    bias = direction_last(corrected(torch.zeros(1, 1, height, width, dtype=dtype, device=device)))
+    length = width if operator.direction == "x" else height
+    n_colors = min(2*_OBSTACLE_REACH+1, length)
+    positions = torch.arange(length, device=device)
+    colors = torch.arange(n_colors, device=device)
+    combs = (positions[None, :] % n_colors == colors[:, None]).to(dtype)
+    if operator.direction == "x":
+        combs = combs[:, None, None, :].expand(n_colors, 1, height, width)
+    else:
+        combs = combs[:, None, :, None].expand(n_colors, 1, height, width)
+    responses = direction_last(corrected(combs))-bias
+    cells = torch.arange(-1, length+1, device=device).expand_as(responses[0, 0])
+    coefficients = torch.zeros(2*_OBSTACLE_REACH+1, *responses.shape[-2:], dtype=dtype, device=device)
+    for color in range(n_colors):
+        if n_colors == length:
+            neighbours = torch.full_like(cells, color)
+        else:
+            neighbours = cells+torch.remainder(color-cells+_OBSTACLE_REACH, n_colors)-_OBSTACLE_REACH
+        offsets = neighbours-cells
+        valid = mask[0, 0] & (offsets.abs() <= _OBSTACLE_REACH) & (neighbours >= 0) & (neighbours < length)
+        values = torch.where(valid, responses[color, 0], torch.zeros_like(responses[color, 0]))
+        coefficients.scatter_add_(0, (offsets.clamp(-_OBSTACLE_REACH, _OBSTACLE_REACH)+_OBSTACLE_REACH)[None], values[None])
+    return mask, bias, coefficients
+
+class FrozenConvOperator(nn.Module):
+    r"""
+    A `ConvOperator` frozen for one domain and one field shape.
+
+    The boundary conditions and the obstacles are converted into constant tensors ahead of time:
+    the ghost cells of the boundaries become affine combinations of the boundary cells,
+    the obstacle corrections become masked affine combinations of the neighbouring cells and the obstacle shape fields become one fill mask.
+    The forward pass is then a fixed sequence of tensor operations without Python objects or branches depending on the domain,
+    so it can be compiled with `torch.compile` without graph breaks and scripted with `torch.jit.script`.
+    The result equals `(operator*ScalarField(value,domain)).value`.
+
+    The stencil is applied with one of the backends of `STENCIL_BACKENDS`:
+    "conv2d" and "conv1d" convolve with the one-dimensional stencil, "shift" sums the shifted fields, "unfold" multiplies the unfolded windows with the stencil,
+    and "fft" multiplies the spectrum of the field with the one of the stencil (periodic directions without obstacles only, the other backends are used otherwise).
+
+    Args:
+        operator (ConvOperator): The operator.
+        domain (Domain): The domain of the input field. The shape fields of the obstacles should not be batched.
+        shape (Sequence[int]): The shape (H,W) of the input field.
+        backend (str, optional): The stencil backend of the forward pass. Defaults to "conv2d".
+    """
+
+    # declared on the class: TorchScript ignores the annotations in `__init__` and can not infer the type of an empty list.
+    taps: List[int]
+    offsets: List[int]
+
+    def __init__(self, operator: ConvOperator, domain: Domain, shape: Sequence[int], backend: str="conv2d") -> None:
+        super().__init__()
+        if backend not in STENCIL_BACKENDS:
+            raise ValueError("backend need to be one of {}, got '{}'".format(STENCIL_BACKENDS, backend))
+        self.backend = backend
+        height, width = shape
+        dtype, device = operator.kernel.dtype, operator.kernel.device
+        self.transpose = operator.direction == "y"
+        self.pad = operator.pad
+        if operator.direction == "x":
+            delta = math.pow(domain.delta_x, operator.derivative)
+            line = operator.kernel[0, 0, operator.pad, :]
+            self.periodic = isinstance(domain.left_boundary, PeriodicBoundary)
+            length = width
+        else:
+            delta = math.pow(domain.delta_y, operator.derivative)
+            line = operator.kernel[0, 0, :, operator.pad]
+            self.periodic = isinstance(domain.top_boundary, PeriodicBoundary)
+            length = height
+        if operator.high_order and not self.periodic:
+            raise ValueError("High order gradient only support PeriodicBoundary with no obstacles inside.")
+        for obstacle in domain.obstacles:
+            if obstacle.shape_field.value.shape[0] != 1:
+                raise ValueError("Batched obstacles can not be frozen.")
+        if len(domain.obstacles) > 0 and self.pad != 1:
+            raise ValueError("Obstacles are only supported by the 2nd order schemes.")
+        self.register_buffer("weight", (line/delta).reshape(1, 1, 1, -1).clone())
+        # the unscaled stencil of the low precision fields, see `evaluate`.
+        self.register_buffer("stencil", line.reshape(1, 1, 1, -1).clone())
+        self.scale = 1/delta
+        self.taps = [i for i, weight in enumerate(line.tolist()) if weight != 0]
+        if self.periodic:
+            ghost_start = torch.zeros(4, dtype=dtype, device=device)
+            ghost_end = torch.zeros(4, dtype=dtype, device=device)
+        else:
+            if length < 3:
+                raise ValueError("At least three cells are needed in every non-periodic direction.")
+            with torch.no_grad():
+                ghost_start, ghost_end = _probe_ghosts(operator, domain, delta)
+        self.register_buffer("ghost_start", ghost_start)
+        self.register_buffer("ghost_end", ghost_end)
+        with torch.no_grad():
+            obstacles = _probe_obstacles(operator, domain, shape, delta) if len(domain.obstacles) > 0 else None
+        self.has_obstacles = obstacles is not None
+        self.offsets = []
+        if obstacles is not None:
+            mask, bias, coefficients = obstacles
+            # only the offsets used by the obstacles are applied.
+            self.offsets = [i for i in range(coefficients.shape[0]) if bool(coefficients[i].abs().sum() > 0)]
+            # the corrected cells as flat indices of the padded field, and for every offset the flat indices of the cells they read in the input field,
+            # clamped where the coefficient is zero.
+            rows, cols = torch.nonzero(mask[0, 0], as_tuple=True)
+            sources = torch.stack([(cols-1+offset-_OBSTACLE_REACH).clamp(0, length-1) for offset in self.offsets]) if len(self.offsets) > 0 else cols.new_zeros(0, cols.shape[0])
+            sources = sources*width+rows if self.transpose else rows*width+sources
+            self.register_buffer("obstacle_index", rows*mask.shape[-1]+cols)
+            self.register_buffer("obstacle_sources", sources)
+            self.register_buffer("obstacle_bias", bias[0, 0, rows, cols])
+            self.register_buffer("obstacle_coefficients", coefficients[self.offsets][:, rows, cols])
+        else:
+            self.register_buffer("obstacle_index", torch.zeros(0, dtype=torch.long, device=device))
+            self.register_buffer("obstacle_sources", torch.zeros(0, 0, dtype=torch.long, device=device))
+            self.register_buffer("obstacle_bias", torch.zeros(0, dtype=dtype, device=device))
+            self.register_buffer("obstacle_coefficients", torch.zeros(0, 0, dtype=dtype, device=device))
+        self.has_fill = (not operator.high_order) and len(domain.obstacles) > 0
+        fill = torch.ones(1, 1, height, width, dtype=dtype, device=device)
+        for obstacle in domain.obstacles:
+            fill = fill*obstacle.shape_field.value.to(dtype=dtype, device=device)
+        self.register_buffer("fill", fill if self.has_fill else torch.zeros(0, dtype=dtype, device=device))
+
+    def forward(self, value: torch.Tensor) -> torch.Tensor:
+        r"""
+        Args:
+            value (torch.Tensor): The field with shape (B,1,H,W).
+
+        Returns:
+            operated (torch.Tensor): The operated field with shape (B,1,H,W).
+        """
+        return self.evaluate(value, self.backend)
+
+    def _stencil(self, padded: torch.Tensor, weight: torch.Tensor, backend: str) -> torch.Tensor:
+        width = weight.shape[-1]
+        if backend == "conv1d":
+            batch, channels, height = padded.shape[0], padded.shape[1], padded.shape[2]
+            operated = F.conv1d(padded.reshape(-1, 1, padded.shape[-1]), weight[0])
+            return operated.reshape(batch, channels, height, -1)
+        if backend == "shift":
+            length = padded.shape[-1]-width+1
+            operated = torch.zeros_like(padded[..., :length])
+            for tap in self.taps:
+                operated = operated+weight[0, 0, 0, tap]*padded[..., tap:tap+length]
+            return operated
+        if backend == "unfold":
+            return torch.matmul(padded.unfold(-1, width, 1), weight.reshape(width, 1)).squeeze(-1)
+        return F.conv2d(padded, weight)
+
+    def evaluate(self, value: torch.Tensor, backend: str) -> torch.Tensor:
+        r"""
+        The forward pass with a given stencil backend, see `Autotuner`.
+
+        A float16 or bfloat16 field with an operator of higher precision is evaluated in mixed precision:
+        the ghost cells and the obstacle corrections are computed with the coefficients of the operator and stored in the precision of the field,
+        the stencil is applied in the precision of the field without the grid spacing, and the result, in the precision of the field, is scaled in place,
+        which is computed in float32 for every element. The scaled stencil, e.g., $1/\Delta x^2$ for $\Delta x=1/1024$, would overflow in float16.
+
+        Args:
+            value (torch.Tensor): The field with shape (B,1,H,W).
+            backend (str): The stencil backend, one of `STENCIL_BACKENDS`.
+
+        Returns:
+            operated (torch.Tensor): The operated field with shape (B,1,H,W).
+        """
+        source = value
+        if self.transpose:
+            value = value.transpose(-1, -2)
+        low_precision = (value.dtype == torch.float16 or value.dtype == torch.bfloat16) and value.dtype != self.weight.dtype
+        if backend == "fft" and self.periodic and (not self.has_obstacles) and value.shape[-1] >= self.weight.shape[-1]:
+            # circular cross-correlation: the spectrum of the field times the conjugate spectrum of the wrapped stencil.
+            length = value.shape[-1]
+            kernel = torch.roll(F.pad(self.weight[0, 0, 0], (0, length-self.weight.shape[-1])), -self.pad)
+            spectrum = torch.fft.rfft(value.to(self.weight.dtype), dim=-1)*torch.conj(torch.fft.rfft(kernel))
+            operated = torch.fft.irfft(spectrum, n=length, dim=-1).to(value.dtype)
+            if self.transpose:
+                operated = operated.transpose(-1, -2)
+            return operated
+        if self.periodic:
+            # wrapped with slices rather than the circular padding, which is not supported by all ONNX opsets.
+            padded = torch.cat([value[..., value.shape[-1]-self.pad:], value, value[..., :self.pad]], dim=-1)
+        else:
+            start = (value[..., 0:3]*self.ghost_start[1:]).sum(dim=-1, keepdim=True)+self.ghost_start[0]
+            end = (value[..., -3:]*self.ghost_end[1:]).sum(dim=-1, keepdim=True)+self.ghost_end[0]
+            padded = torch.cat([start.to(value.dtype), value, end.to(value.dtype)], dim=-1)
+        if self.has_obstacles:
+            # only the cells next to the obstacles are gathered and corrected, in the precision of the operator.
+            flat = source.flatten(-2)
+            corrected = self.obstacle_bias
+            for i in range(len(self.offsets)):
+                corrected = corrected+self.obstacle_coefficients[i]*flat.index_select(-1, self.obstacle_sources[i])
+            padded.flatten(-2).index_copy_(-1, self.obstacle_index, corrected.to(padded.dtype).expand(padded.shape[0], padded.shape[1], -1))
+        if low_precision:
+            # scaled in place: elementwise operations on half precision tensors are computed in float32 and rounded once.
+            operated = self._stencil(padded, self.stencil.to(value.dtype), backend).mul_(self.scale)
+        else:
+            operated = self._stencil(padded, self.weight, backend)
+        if self.transpose:
+            operated = operated.transpose(-1, -2)
+        if self.has_fill:
+            operated = operated*self.fill.to(operated.dtype)
+        return operated
+
+class FrozenTransientNS(nn.Module):
+    r"""
+    `TransientNS` or `TransientNSWithForce` frozen for one field shape, see `FrozenConvOperator`.
+    The forward pass compiles to a single graph with `torch.compile` and can be scripted with `torch.jit.script`.
+    As the operators are affine, the derivatives of the averaged fields are computed with the domains of the fields.
+
+    Args:
+        operation (Union[TransientNS,TransientNSWithForce]): The operation.
+        shape (Sequence[int]): The shape (H,W) of the fields.
+    """
+
+    def __init__(self, operation, shape: Sequence[int]) -> None:
+        super().__init__()
+        domain_u = operation.domain_u
+        domain_v = operation.domain_v
+        domain_p = operation.domain_p
+        self.dt = float(operation.dt)
+        self.viscosity = float(operation.viscosity)
+        self.grad_x_u = FrozenConvOperator(operation.grad_x, domain_u, shape)
+        self.grad_y_u = FrozenConvOperator(operation.grad_y, domain_u, shape)
+        self.grad_x_v = FrozenConvOperator(operation.grad_x, domain_v, shape)
+        self.grad_y_v = FrozenConvOperator(operation.grad_y, domain_v, shape)
+        self.grad_x_p = FrozenConvOperator(operation.grad_x, domain_p, shape)
+        self.grad_y_p = FrozenConvOperator(operation.grad_y, domain_p, shape)
+        self.laplacian_x_u = FrozenConvOperator(operation.nabla2.op_x, domain_u, shape)
+        self.laplacian_y_u = FrozenConvOperator(operation.nabla2.op_y, domain_u, shape)
+        self.laplacian_x_v = FrozenConvOperator(operation.nabla2.op_x, domain_v, shape)
+        self.laplacian_y_v = FrozenConvOperator(operation.nabla2.op_y, domain_v, shape)
+        force = getattr(operation, "force", None)
+        self.has_force = force is not None
+        if force is not None:
+            self.register_buffer("force_x", force.ux.value.clone())
+            self.register_buffer("force_y", force.uy.value.clone())
+        else:
+            self.register_buffer("force_x", torch.zeros(0))
+            self.register_buffer("force_y", torch.zeros(0))
+
+    def forward(self, u_0: torch.Tensor, v_0: torch.Tensor, p_0: torch.Tensor,
+                u_1: torch.Tensor, v_1: torch.Tensor, p_1: torch.Tensor) -> torch.Tensor:
+        r"""
+        Args:
+            u_0 (torch.Tensor): The x-velocity component at time step t with shape (B,1,H,W).
+            v_0 (torch.Tensor): The y-velocity component at time step t with shape (B,1,H,W).
+            p_0 (torch.Tensor): The pressure component at time step t with shape (B,1,H,W).
+            u_1 (torch.Tensor): The x-velocity component at time step t+1 with shape (B,1,H,W).
+            v_1 (torch.Tensor): The y-velocity component at time step t+1 with shape (B,1,H,W).
+            p_1 (torch.Tensor): The pressure component at time step t+1 with shape (B,1,H,W).
+
+        Returns:
+            residual (torch.Tensor): The residual with shape (B,3,H,W), equal to the result of the operation.
+        """
+        u_inter = (u_0+u_1)*0.5
+        v_inter = (v_0+v_1)*0.5
+        p_inter = (p_0+p_1)*0.5
+        du_dx = self.grad_x_u(u_inter)
+        du_dy = self.grad_y_u(u_inter)
+        dv_dx = self.grad_x_v(v_inter)
+        dv_dy = self.grad_y_v(v_inter)
+        ns_res_x = (u_1-u_0)/self.dt+u_inter*du_dx+v_inter*du_dy+self.grad_x_p(p_inter)-self.viscosity*(self.laplacian_x_u(u_inter)+self.laplacian_y_u(u_inter))
+        ns_res_y = (v_1-v_0)/self.dt+u_inter*dv_dx+v_inter*dv_dy+self.grad_y_p(p_inter)-self.viscosity*(self.laplacian_x_v(v_inter)+self.laplacian_y_v(v_inter))
+        if self.has_force:
+            ns_res_x = ns_res_x-self.force_x
+            ns_res_y = ns_res_y-self.force_y
+        divergence = ((du_dx+dv_dy)+(self.grad_x_u(u_1)+self.grad_y_v(v_1)))*0.5
+        return torch.cat([ns_res_x, ns_res_y, divergence], dim=1)
+
+class FrozenPoissonDivergence(nn.Module):
+    r"""
+    `PoissonDivergence` or `PoissonDivergenceWithForce` frozen for one field shape, see `FrozenConvOperator`.
+    The divergence of the force is constant and is computed once.
+
+    Args:
+        operation (Union[PoissonDivergence,PoissonDivergenceWithForce]): The operation.
+        shape (Sequence[int]): The shape (H,W) of the fields.
+    """
+
+    def __init__(self, operation, shape: Sequence[int]) -> None:
+        super().__init__()
+        domain_u = operation.domain_u
+        domain_v = operation.domain_v
+        domain_p = operation.domain_p
+        self.grad_x_u = FrozenConvOperator(operation.grad_x, domain_u, shape)
+        self.grad_y_u = FrozenConvOperator(operation.grad_y, domain_u, shape)
+        self.grad_x_v = FrozenConvOperator(operation.grad_x, domain_v, shape)
+        self.grad_y_v = FrozenConvOperator(operation.grad_y, domain_v, shape)
+        self.laplacian_x_p = FrozenConvOperator(operation.nabla2.op_x, domain_p, shape)
+        self.laplacian_y_p = FrozenConvOperator(operation.nabla2.op_y, domain_p, shape)
+        force = getattr(operation, "force", None)
+        self.has_force = force is not None
+        if force is not None:
+            with torch.no_grad():
+                self.register_buffer("force_divergence", (operation.nabla@force).value.clone())
+        else:
+            self.register_buffer("force_divergence", torch.zeros(0))
+
+    def forward(self, u: torch.Tensor, v: torch.Tensor, p: torch.Tensor) -> torch.Tensor:
+        r"""
+        Args:
+            u (torch.Tensor): The x-velocity component with shape (B,1,H,W).
+            v (torch.Tensor): The y-velocity component with shape (B,1,H,W).
+            p (torch.Tensor): The pressure component with shape (B,1,H,W).
+
+        Returns:
+            residual (torch.Tensor): The residual with shape (B,2,H,W), equal to the result of the operation.
+        """
+        du_dx = self.grad_x_u(u)
+        du_dy = self.grad_y_u(u)
+        dv_dx = self.grad_x_v(v)
+        dv_dy = self.grad_y_v(v)
+        poisson = self.laplacian_x_p(p)+self.laplacian_y_p(p)+du_dx**2+2*du_dy*dv_dx+dv_dy**2
+        if self.has_force:
+            poisson = poisson-self.force_divergence
+        return torch.cat([poisson, du_dx+dv_dy], dim=1)
+
+def count_graph_breaks(function, *args, **kwargs) -> int:
+    r"""
+    Count the graph breaks of `torch.compile` when calling `function(*args, **kwargs)`, e.g., to check that a frozen operation compiles to a single graph.
+
+    Args:
+        function (Callable): The function or module.
+        *args: The positional arguments of the call.
+        **kwargs: The keyword arguments of the call.
+
+    Returns:
+        count (int): The number of graph breaks.
+    """
+    import torch._dynamo
+    torch._dynamo.reset()
+    return torch._dynamo.explain(function)(*args, **kwargs).graph_break_count
@@ -0,0 +1,214 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+from typing import Optional
+
+# The signed distance functions (SDF) are negative inside the bodies and evaluated on the cell centers of the grid of `grid_2D`.
+# The parameters of the primitives are numbers or tensors of any batch shape, e.g., (B,) for one body per geometry or (B,K) for K bodies,
+# and the SDFs have the batch shape followed by the grid shape, so B geometries are generated in one call on the device of the grid.
+
+def grid_2D(length_x, length_y, dx=1, dy=1, device=None, dtype=None):
+    r"""
+    The coordinates of the cell centers, with the layout of `generate_circle_2D`: x along the first and y along the second grid dimension.
+
+    Args:
+        length_x (float): The length of the domain in x direction.
+        length_y (float): The length of the domain in y direction.
+        dx (float, optional): The grid spacing in x direction. Defaults to 1.
+        dy (float, optional): The grid spacing in y direction. Defaults to 1.
+        device (str, optional): The device of the coordinates. Defaults to None.
+        dtype (torch.dtype, optional): The data type of the coordinates. Defaults to None, i.e., the default data type.
+
+    Returns:
+        X (torch.Tensor): The x coordinates with shape (N_x,1).
+        Y (torch.Tensor): The y coordinates with shape (1,N_y).
+    """
+    X = (torch.arange(int(length_x/dx), device=device, dtype=dtype)+0.5)*dx
+    Y = (torch.arange(int(length_y/dy), device=device, dtype=dtype)+0.5)*dy
+    return X[:, None], Y[None, :]
+
+def _parameter(value, X: torch.Tensor) -> torch.Tensor:
+    # a (...) parameter broadcast against the (N_x,N_y) grid.
+    return torch.as_tensor(value, device=X.device, dtype=X.dtype)[..., None, None]
+
+def _rotate(X, Y, center_x, center_y, angle):
+    # the coordinates in the frame of a body rotated by `angle` (counterclockwise, in radians) around its center.
+    x = X-_parameter(center_x, X)
+    y = Y-_parameter(center_y, X)
+    if isinstance(angle, (int, float)) and angle == 0:
+        return x, y
+    cos = torch.cos(_parameter(angle, X))
+    sin = torch.sin(_parameter(angle, X))
+    return x*cos+y*sin, y*cos-x*sin
+
+def circle_sdf(X: torch.Tensor, Y: torch.Tensor, center_x, center_y, radius) -> torch.Tensor:
+    r"""
+    The signed distance to circles.
+
+    Args:
+        X (torch.Tensor): The x coordinates, see `grid_2D`.
+        Y (torch.Tensor): The y coordinates, see `grid_2D`.
+        center_x (Union[float,torch.Tensor]): The x coordinates of the centers.
+        center_y (Union[float,torch.Tensor]): The y coordinates of the centers.
+        radius (Union[float,torch.Tensor]): The radii.
+
+    Returns:
+        sdf (torch.Tensor): The signed distance with shape (...,N_x,N_y).
+    """
+    x = X-_parameter(center_x, X)
+    y = Y-_parameter(center_y, X)
+    return torch.sqrt(x**2+y**2)-_parameter(radius, X)
+
+def ellipse_sdf(X: torch.Tensor, Y: torch.Tensor, center_x, center_y, radius_x, radius_y, angle=0.0) -> torch.Tensor:
+    r"""
+    The signed distance to ellipses.
+    The sign is exact, the distance is a first order approximation which is exact on the ellipse and for circles.
+
+    Args:
+        X (torch.Tensor): The x coordinates, see `grid_2D`.
+        Y (torch.Tensor): The y coordinates, see `grid_2D`.
+        center_x (Union[float,torch.Tensor]): The x coordinates of the centers.
+        center_y (Union[float,torch.Tensor]): The y coordinates of the centers.
+        radius_x (Union[float,torch.Tensor]): The semi-axes along x before the rotation.
+        radius_y (Union[float,torch.Tensor]): The semi-axes along y before the rotation.
+        angle (Union[float,torch.Tensor], optional): The counterclockwise rotations in radians. Defaults to 0.0.
+
+    Returns:
+        sdf (torch.Tensor): The signed distance with shape (...,N_x,N_y).
+    """
+    x, y = _rotate(X, Y, center_x, center_y, angle)
+    radius_x = _parameter(radius_x, X)
+    radius_y = _parameter(radius_y, X)
+    k0 = torch.sqrt((x/radius_x)**2+(y/radius_y)**2)
+    k1 = torch.sqrt((x/radius_x**2)**2+(y/radius_y**2)**2)
+    # the distance is -min(radius) at the center, where k1 is zero.
+    return torch.where(k1 > 0, k0*(k0-1)/k1.clamp_min(torch.finfo(k1.dtype).tiny), -torch.minimum(radius_x, radius_y))
+
+def rectangle_sdf(X: torch.Tensor, Y: torch.Tensor, center_x, center_y, width, height, angle=0.0) -> torch.Tensor:
+    r"""
+    The signed distance to rectangles.
+
+    Args:
+        X (torch.Tensor): The x coordinates, see `grid_2D`.
+        Y (torch.Tensor): The y coordinates, see `grid_2D`.
+        center_x (Union[float,torch.Tensor]): The x coordinates of the centers.
+        center_y (Union[float,torch.Tensor]): The y coordinates of the centers.
+        width (Union[float,torch.Tensor]): The sizes along x before the rotation.
+        height (Union[float,torch.Tensor]): The sizes along y before the rotation.
+        angle (Union[float,torch.Tensor], optional): The counterclockwise rotations in radians. Defaults to 0.0.
+
+    Returns:
+        sdf (torch.Tensor): The signed distance with shape (...,N_x,N_y).
+    """
+    x, y = _rotate(X, Y, center_x, center_y, angle)
+    qx = x.abs()-_parameter(width, X)/2
+    qy = y.abs()-_parameter(height, X)/2
+    outside = torch.sqrt(qx.clamp_min(0)**2+qy.clamp_min(0)**2)
+    inside = torch.maximum(qx, qy).clamp_max(0)
+    return outside+inside
+
+def polygon_sdf(X: torch.Tensor, Y: torch.Tensor, vertices: torch.Tensor) -> torch.Tensor:
+    r"""
+    The signed distance to simple polygons.
+
+    Args:
+        X (torch.Tensor): The x coordinates, see `grid_2D`.
+        Y (torch.Tensor): The y coordinates, see `grid_2D`.
+        vertices (torch.Tensor): The vertices with shape (...,N,2), in either orientation.
+
+    Returns:
+        sdf (torch.Tensor): The signed distance with shape (...,N_x,N_y).
+    """
+    vertices = torch.as_tensor(vertices, device=X.device, dtype=X.dtype)
+    if vertices.ndim < 2 or vertices.shape[-1] != 2 or vertices.shape[-2] < 3:
+        raise ValueError("vertices need to have the shape (...,N,2) with N>=3, got {}".format(tuple(vertices.shape)))
+    distance = None
+    inside = None
+    # the edges are processed one by one, so the memory does not grow with the number of vertices.
+    for i in range(vertices.shape[-2]):
+        start = vertices[..., i-1, :]
+        end = vertices[..., i, :]
+        start_x, start_y = start[..., 0, None, None], start[..., 1, None, None]
+        edge_x, edge_y = end[..., 0, None, None]-start_x, end[..., 1, None, None]-start_y
+        x, y = X-start_x, Y-start_y
+        t = ((x*edge_x+y*edge_y)/(edge_x**2+edge_y**2)).clamp(0, 1)
+        edge_distance = (x-t*edge_x)**2+(y-t*edge_y)**2
+        distance = edge_distance if distance is None else torch.minimum(distance, edge_distance)
+        # the even-odd rule: the number of edges crossed by a ray in +x direction.
+        straddles = (start_y > Y) != (start_y+edge_y > Y)
+        crosses = straddles & ((x*edge_y < y*edge_x) == (edge_y > 0))
+        inside = crosses if inside is None else inside ^ crosses
+    return torch.where(inside, -1.0, 1.0).to(X.dtype)*torch.sqrt(distance)
+
+def union(*sdfs: torch.Tensor, dim: Optional[int]=None) -> torch.Tensor:
+    r"""
+    The union of bodies: the minimum of their signed distances.
+
+    Args:
+        *sdfs (torch.Tensor): The signed distances.
+        dim (int, optional): If given, the bodies along this dimension of every SDF are merged as well, e.g., dim=1 for SDFs with shape (B,K,N_x,N_y). Defaults to None.
+
+    Returns:
+        sdf (torch.Tensor): The signed distance of the union.
+    """
+    if len(sdfs) == 0:
+        raise ValueError("union needs at least one signed distance")
+    if dim is not None:
+        sdfs = [sdf.amin(dim=dim) for sdf in sdfs]
+    result = sdfs[0]
+    for sdf in sdfs[1:]:
+        result = torch.minimum(result, sdf)
+    return result
+
+def intersection(*sdfs: torch.Tensor) -> torch.Tensor:
+    r"""
+    The intersection of bodies: the maximum of their signed distances.
+
+    Args:
+        *sdfs (torch.Tensor): The signed distances.
+
+    Returns:
+        sdf (torch.Tensor): The signed distance of the intersection.
+    """
+    if len(sdfs) == 0:
+        raise ValueError("intersection needs at least one signed distance")
+    result = sdfs[0]
+    for sdf in sdfs[1:]:
+        result = torch.maximum(result, sdf)
+    return result
+
+def difference(sdf: torch.Tensor, removed: torch.Tensor) -> torch.Tensor:
+    r"""
+    The body `sdf` without the body `removed`.
+
+    Args:
+        sdf (torch.Tensor): The signed distance of the body.
+        removed (torch.Tensor): The signed distance of the removed body.
+
+    Returns:
+        sdf (torch.Tensor): The signed distance of the difference.
+    """
+    return torch.maximum(sdf, -removed)
+
+def shape_field_from_sdf(sdf: torch.Tensor) -> torch.Tensor:
+    r"""
+    The shape field of the obstacle classes: 0 inside the bodies (negative signed distance) and 1 outside.
+
+    Examples:
+        ```python
+        X, Y = grid_2D(1, 1, 1/128, 1/128, device="cuda")
+        centers = torch.rand(10000, 3, 2, device="cuda")*0.6+0.2 # 10k geometries of 3 circles
+        sdf = union(circle_sdf(X, Y, centers[..., 0], centers[..., 1], 0.05), dim=1)
+        obstacle = DirichletObstacle(shape_field_from_sdf(sdf), 0.0) # a batched obstacle for fields with shape (10000,1,128,128)
+        ```
+
+    Args:
+        sdf (torch.Tensor): The signed distance with shape (N_x,N_y) or (B,N_x,N_y).
+
+    Returns:
+        shape_field (torch.Tensor): The shape field with shape (N_x,N_y) or (B,1,N_x,N_y).
+    """
+    shape_field = torch.where(sdf < 0, 0.0, 1.0).to(sdf.dtype)
+    if shape_field.ndim == 3:
+        shape_field = shape_field.unsqueeze(1)
+    return shape_field
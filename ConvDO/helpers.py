@@ -5,7 +5,6 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from collections.abc import Sequence
-import numpy as np
 from inspect import isfunction
 from .meta_type import *
 
@@ -0,0 +1,170 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+from .domain import *
+from .conv_operators import *
+from .solvers import *
+from typing import Optional
+
+def _linear_part(operator, value: torch.Tensor, domain: Domain):
+    # the operator without the bias of the boundary conditions.
+    return (operator*ScalarField(value, domain=domain)).value-(operator*ScalarField(torch.zeros_like(value), domain=domain)).value
+
+class NewtonKrylovStepper():
+    r"""
+    Implicit time stepping with the residual of a transient operation, e.g., `TransientNS` or `TransientNSWithForce`.
+    Given $(u_0,v_0,p_0)$, the next state $(u_1,v_1,p_1)$ is the root of the residual $F(u_1,v_1,p_1;u_0,v_0,p_0)=0$,
+    which is found with a Jacobian-free Newton-GMRES method: the Jacobian is never assembled and
+    its products with the Krylov vectors are computed with `torch.func.jvp` on the residual.
+
+    The optional "poisson" preconditioner is a SIMPLE-like block preconditioner:
+    the momentum block is approximated by $I/\Delta t$ and the pressure Schur complement by $-\frac{3\Delta t}{8}\nabla^2$, which is inverted by a `PoissonSolver`.
+
+    Examples:
+        ```python
+        operation = TransientNS(domain_u, domain_v, domain_p, viscosity=0.01, dt=0.5, order=2)
+        stepper = NewtonKrylovStepper(operation)
+        u, v, p = u_0, v_0, p_0
+        for _ in range(100):
+            u, v, p = stepper.step(u, v, p)
+        ```
+
+    Args:
+        operation (Union[TransientNS,TransientNSWithForce]): The transient operation giving the residual.
+        tol (float, optional): The absolute tolerance of the root mean square residual. Defaults to 1e-6.
+        max_newton (int, optional): The maximum number of Newton iterations. Defaults to 10.
+        krylov_tol (float, optional): The relative tolerance of the GMRES solve of every Newton iteration. Defaults to 1e-3.
+        restart (int, optional): The restart length of GMRES. Defaults to 30.
+        max_krylov (int, optional): The maximum number of GMRES iterations of every Newton iteration. Defaults to 100.
+        preconditioner (str, optional): "poisson" or None. Defaults to "poisson".
+        jvp (str, optional): "forward" to use `torch.func.jvp`, or "finite_difference" to use the finite difference of the residual. Defaults to "forward".
+        line_search (bool, optional): Whether to halve the Newton step while it does not decrease the residual. Defaults to True.
+    """
+
+    def __init__(self,
+                 operation,
+                 tol: float=1e-6,
+                 max_newton: int=10,
+                 krylov_tol: float=1e-3,
+                 restart: int=30,
+                 max_krylov: int=100,
+                 preconditioner: Optional[str]="poisson",
+                 jvp: str="forward",
+                 line_search: bool=True) -> None:
+        if preconditioner not in ["poisson", None]:
+            raise ValueError("preconditioner need to be 'poisson' or None, got '{}'".format(preconditioner))
+        if jvp not in ["forward", "finite_difference"]:
+            raise ValueError("jvp need to be 'forward' or 'finite_difference', got '{}'".format(jvp))
+        self.operation = operation
+        self.tol = tol
+        self.max_newton = max_newton
+        self.krylov_tol = krylov_tol
+        self.restart = restart
+        self.max_krylov = max_krylov
+        self.preconditioner = preconditioner
+        self.jvp = jvp
+        self.line_search = line_search
+        self.num_newton_iterations = 0
+        self.num_krylov_iterations = 0
+        self._poisson_solvers = {}
+
+    def _domains(self):
+        return self.operation.domain_u, self.operation.domain_v, self.operation.domain_p
+
+    def _poisson_solver(self, shape, device, dtype):
+        key = (tuple(shape), str(device), dtype)
+        if key not in self._poisson_solvers:
+            self._poisson_solvers[key] = PoissonSolver(self._domains()[2], shape, order=self._order(), device=device, dtype=dtype)
+        return self._poisson_solvers[key]
+
+    def _order(self):
+        # the order of the central schemes is given by the width of the Laplacian stencil.
+        return 2*self.operation.nabla2.op_x.pad
+
+    def _block_preconditioner(self, residual: torch.Tensor):
+        domain_u, domain_v, domain_p = self._domains()
+        dt = self.operation.dt
+        nabla = self.operation.nabla
+        solver = self._poisson_solver(residual.shape[-2:], residual.device, residual.dtype)
+        du = dt*residual[:, 0:1]
+        dv = dt*residual[:, 1:2]
+        # d(divergence)/d(u_1) = 3/4 div and d(momentum)/d(p_1) = 1/2 grad.
+        divergence = 0.75*(_linear_part(nabla.ux, du, domain_u)+_linear_part(nabla.uy, dv, domain_v))
+        dp = solver.solve((residual[:, 2:3]-divergence)/(-0.375*dt), homogeneous=True)
+        du = du-0.5*dt*_linear_part(nabla.ux, dp, domain_p)
+        dv = dv-0.5*dt*_linear_part(nabla.uy, dp, domain_p)
+        return torch.cat([du, dv, dp], dim=1)
+
+    def residual(self, u_0: torch.Tensor, v_0: torch.Tensor, p_0: torch.Tensor, state: torch.Tensor) -> torch.Tensor:
+        r"""
+        The residual of the operation for the next state.
+
+        Args:
+            u_0 (torch.Tensor): The x-velocity component at time step t with shape (B,1,H,W).
+            v_0 (torch.Tensor): The y-velocity component at time step t with shape (B,1,H,W).
+            p_0 (torch.Tensor): The pressure component at time step t with shape (B,1,H,W).
+            state (torch.Tensor): The concatenated (u_1,v_1,p_1) with shape (B,3,H,W).
+
+        Returns:
+            residual (torch.Tensor): The residual with shape (B,3,H,W).
+        """
+        return self.operation(u_0, v_0, p_0, state[:, 0:1], state[:, 1:2], state[:, 2:3])
+
+    def step(self, u_0: torch.Tensor, v_0: torch.Tensor, p_0: torch.Tensor,
+             u_1: Optional[torch.Tensor]=None, v_1: Optional[torch.Tensor]=None, p_1: Optional[torch.Tensor]=None):
+        r"""
+        Advance the state by one time step of the operation.
+
+        Args:
+            u_0 (torch.Tensor): The x-velocity component at time step t with shape (B,1,H,W).
+            v_0 (torch.Tensor): The y-velocity component at time step t with shape (B,1,H,W).
+            p_0 (torch.Tensor): The pressure component at time step t with shape (B,1,H,W).
+            u_1 (torch.Tensor, optional): The initial guess of the x-velocity component at time step t+1. Defaults to `u_0`.
+            v_1 (torch.Tensor, optional): The initial guess of the y-velocity component at time step t+1. Defaults to `v_0`.
+            p_1 (torch.Tensor, optional): The initial guess of the pressure component at time step t+1. Defaults to `p_0`.
+
+        Returns:
+            u_1 (torch.Tensor): The x-velocity component at time step t+1.
+            v_1 (torch.Tensor): The y-velocity component at time step t+1.
+            p_1 (torch.Tensor): The pressure component at time step t+1.
+        """
+        u_0, v_0, p_0 = u_0.detach(), v_0.detach(), p_0.detach()
+        state = torch.cat([default(u_1, u_0), default(v_1, v_0), default(p_1, p_0)], dim=1).detach()
+        function = lambda x: self.residual(u_0, v_0, p_0, x)
+        def norm(value):
+            return torch.sqrt((value**2).flatten(1).mean(dim=-1))
+        self.num_newton_iterations = 0
+        self.num_krylov_iterations = 0
+        residual = function(state)
+        for _ in range(self.max_newton):
+            residual_norm = norm(residual)
+            if (residual_norm <= self.tol).all():
+                break
+            if self.jvp == "forward":
+                jacobian = lambda vector: torch.func.jvp(function, (state,), (vector,))[1]
+            else:
+                def jacobian(vector):
+                    epsilon = 1e-4*(1+torch.linalg.vector_norm(state.flatten(1), dim=-1))/torch.linalg.vector_norm(vector.flatten(1), dim=-1).clamp_min(1e-12)
+                    epsilon = epsilon.reshape(-1, 1, 1, 1)
+                    return (function(state+epsilon*vector)-residual)/epsilon
+            preconditioner = self._block_preconditioner if self.preconditioner == "poisson" else None
+            update, num_iterations = gmres(jacobian, -residual, preconditioner=preconditioner,
+                                           tol=self.krylov_tol, restart=self.restart, max_iter=self.max_krylov)
+            self.num_krylov_iterations += num_iterations
+            self.num_newton_iterations += 1
+            step_length = torch.ones_like(residual_norm).reshape(-1, 1, 1, 1)
+            new_state = state+update
+            new_residual = function(new_state)
+            if self.line_search:
+                for _ in range(5):
+                    worse = (norm(new_residual) > residual_norm).reshape(-1, 1, 1, 1)
+                    if not worse.any():
+                        break
+                    step_length = torch.where(worse, 0.5*step_length, step_length)
+                    new_state = state+step_length*update
+                    new_residual = function(new_state)
+            state, residual = new_state, new_residual
+        return state[:, 0:1], state[:, 1:2], state[:, 2:3]
+
+    def __call__(self, u_0: torch.Tensor, v_0: torch.Tensor, p_0: torch.Tensor):
+        return self.step(u_0, v_0, p_0)
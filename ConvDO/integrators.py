@@ -0,0 +1,262 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+from .domain import *
+from .conv_operators import *
+from .operations import FieldOperations
+from .solvers import *
+from typing import Optional
+
+# Butcher tableaus (a, b) of the explicit Runge-Kutta schemes.
+RK_TABLEAUS = {
+    "euler": ([[]], [1.0]),
+    "heun": ([[], [1.0]], [0.5, 0.5]),
+    "ssprk3": ([[], [1.0], [0.25, 0.25]], [1/6, 1/6, 2/3]),
+    "rk4": ([[], [0.5], [0.0, 0.5], [0.0, 0.0, 1.0]], [1/6, 1/3, 1/3, 1/6]),
+}
+
+class _ProjectionIntegrator(FieldOperations):
+
+    def __init__(self,
+                 domain_u: Domain,
+                 domain_v: Domain,
+                 domain_p: Domain,
+                 viscosity: float,
+                 dt: float,
+                 order: int,
+                 force_x: Optional[torch.Tensor]=None,
+                 force_y: Optional[torch.Tensor]=None,
+                 device="cpu",
+                 dtype=torch.float32) -> None:
+        super().__init__(order, device=device, dtype=dtype)
+        self.domain_u = domain_u
+        self.domain_v = domain_v
+        self.domain_p = domain_p
+        self.viscosity = viscosity
+        self.dt = dt
+        self.order = order
+        self.device = device
+        self.dtype = dtype
+        self.force_x = force_x
+        self.force_y = force_y
+        self._solvers = {}
+        self._buffers = {}
+
+    def _solver(self, name: str, domain: Domain, shape, shift: float=0.0):
+        key = (name, tuple(shape), shift)
+        if key not in self._solvers:
+            self._solvers[key] = PoissonSolver(domain, shape, order=self.order, shift=shift, device=self.device, dtype=self.dtype)
+        return self._solvers[key]
+
+    def _velocity(self, velocity: torch.Tensor):
+        return VectorValue(ScalarField(velocity[:, 0:1], domain=self.domain_u), ScalarField(velocity[:, 1:2], domain=self.domain_v))
+
+    def _explicit_terms(self, velocity: torch.Tensor, out: torch.Tensor, viscous: bool=True):
+        # out = -u.grad(u) (+ nu*laplacian(u)) + f
+        # the products are taken on the values, as the derivatives do not keep the obstacles of the velocity domains.
+        field = self._velocity(velocity)
+        u, v = velocity[:, 0:1], velocity[:, 1:2]
+        for i, component in enumerate([field.ux, field.uy]):
+            tendency = -(u*(self.grad_x*component).value+v*(self.grad_y*component).value)
+            if viscous:
+                tendency = tendency+self.viscosity*(self.nabla2*component).value
+            out[:, i:i+1].copy_(tendency)
+        if self.force_x is not None:
+            out[:, 0:1].add_(self.force_x)
+        if self.force_y is not None:
+            out[:, 1:2].add_(self.force_y)
+        return out
+
+    def _project_(self, velocity: torch.Tensor, dt: float, pressure: torch.Tensor):
+        # Chorin projection: laplacian(p) = div(u*)/dt, u = u*-dt*grad(p). velocity and pressure are updated in place.
+        solver = self._solver("p", self.domain_p, velocity.shape[-2:])
+        divergence = (self.nabla @ self._velocity(velocity)).value
+        pressure.copy_(solver.solve(divergence/dt, x0=pressure))
+        gradient = self.nabla*ScalarField(pressure, domain=self.domain_p)
+        velocity[:, 0:1].sub_(dt*gradient.ux.value)
+        velocity[:, 1:2].sub_(dt*gradient.uy.value)
+
+    def _differentiable(self, state: torch.Tensor) -> bool:
+        return torch.is_grad_enabled() and state.requires_grad
+
+    def _buffer(self, name: str, state: torch.Tensor, channels: int):
+        if self._differentiable(state):
+            # a reused buffer is overwritten while the graph of the previous use still needs it.
+            return torch.empty(state.shape[0], channels, *state.shape[-2:], dtype=state.dtype, device=state.device)
+        key = (name, state.shape[0], tuple(state.shape[-2:]), state.dtype, str(state.device))
+        if key not in self._buffers:
+            self._buffers[key] = torch.empty(state.shape[0], channels, *state.shape[-2:], dtype=state.dtype, device=state.device)
+        return self._buffers[key]
+
+    def step_(self, state: torch.Tensor) -> torch.Tensor:
+        raise NotImplementedError
+
+    def step(self, u: torch.Tensor, v: torch.Tensor, p: torch.Tensor):
+        r"""
+        Advance the state by one time step.
+        If gradients are enabled and an input requires them, new buffers are allocated for every step,
+        so the result can be differentiated through several steps.
+
+        Args:
+            u (torch.Tensor): The x-velocity component with shape (B,1,H,W).
+            v (torch.Tensor): The y-velocity component with shape (B,1,H,W).
+            p (torch.Tensor): The pressure component with shape (B,1,H,W).
+
+        Returns:
+            u (torch.Tensor): The x-velocity component after the time step.
+            v (torch.Tensor): The y-velocity component after the time step.
+            p (torch.Tensor): The pressure component after the time step.
+        """
+        state = self.step_(torch.cat([u, v, p], dim=1))
+        return state[:, 0:1], state[:, 1:2], state[:, 2:3]
+
+    def rollout(self, u: torch.Tensor, v: torch.Tensor, p: torch.Tensor, num_steps: int, save_every: int=1) -> torch.Tensor:
+        r"""
+        Advance B independent states by `num_steps` time steps without gradients.
+        The state is updated in place and the saved frames are written into a preallocated trajectory.
+
+        Args:
+            u (torch.Tensor): The initial x-velocity component with shape (B,1,H,W).
+            v (torch.Tensor): The initial y-velocity component with shape (B,1,H,W).
+            p (torch.Tensor): The initial pressure component with shape (B,1,H,W).
+            num_steps (int): The number of time steps.
+            save_every (int, optional): The number of time steps between two saved frames. Defaults to 1.
+
+        Returns:
+            trajectory (torch.Tensor): The saved frames including the initial state, with shape (B,T,3,H,W) where T=num_steps//save_every+1.
+                The layout matches the input of `TransientNS.trajectory` after splitting the channels.
+        """
+        with torch.no_grad():
+            state = torch.cat([u, v, p], dim=1)
+            trajectory = torch.empty(state.shape[0], num_steps//save_every+1, 3, *state.shape[-2:], dtype=state.dtype, device=state.device)
+            trajectory[:, 0].copy_(state)
+            for step in range(num_steps):
+                self.step_(state)
+                if (step+1) % save_every == 0:
+                    trajectory[:, (step+1)//save_every].copy_(state)
+        return trajectory
+
+class RungeKuttaIntegrator(_ProjectionIntegrator):
+    r"""
+    Explicit Runge-Kutta time integration of the incompressible Navier-Stokes equations
+    $\partial \mathbf{u}/\partial t+\mathbf{u}\cdot\nabla\mathbf{u}+\nabla p-\nu\nabla^2\mathbf{u}-\mathbf{f}=0$, $\nabla\cdot\mathbf{u}=0$.
+    Every stage is made divergence free by a pressure projection solved with `PoissonSolver`, and the pressure of the state is the one of the last projection.
+    The stage buffers are allocated once for every state shape and reused by `step_` and `rollout` unless gradients are required, see `step`.
+    The other temporaries are still allocated at every step, e.g., the padded fields and the results of the operators and the FFTs of `PoissonSolver`.
+
+    Examples:
+        ```python
+        integrator = RungeKuttaIntegrator(domain_u, domain_v, domain_p, viscosity=0.01, dt=0.01, order=2, scheme="ssprk3")
+        trajectory = integrator.rollout(u, v, p, num_steps=1000, save_every=10) # u,v,p: (B,1,H,W)
+        ```
+
+    Args:
+        domain_u (Domain): The domain for the x-velocity component.
+        domain_v (Domain): The domain for the y-velocity component.
+        domain_p (Domain): The domain for the pressure component.
+        viscosity (float): The viscosity coefficient.
+        dt (float): The time step size.
+        order (int): The order of accuracy for the finite difference scheme.
+        scheme (str, optional): The Runge-Kutta scheme, one of "euler", "heun", "ssprk3" and "rk4". Defaults to "ssprk3".
+        force_x (torch.Tensor, optional): The x-component of the external force. Defaults to None.
+        force_y (torch.Tensor, optional): The y-component of the external force. Defaults to None.
+        device (str, optional): The device to use for computation (default: "cpu").
+        dtype (torch.dtype, optional): The data type to use for computation (default: torch.float32).
+    """
+
+    def __init__(self,
+                 domain_u: Domain,
+                 domain_v: Domain,
+                 domain_p: Domain,
+                 viscosity: float,
+                 dt: float,
+                 order: int,
+                 scheme: str="ssprk3",
+                 force_x: Optional[torch.Tensor]=None,
+                 force_y: Optional[torch.Tensor]=None,
+                 device="cpu",
+                 dtype=torch.float32) -> None:
+        super().__init__(domain_u, domain_v, domain_p, viscosity, dt, order, force_x, force_y, device=device, dtype=dtype)
+        if scheme not in RK_TABLEAUS:
+            raise ValueError("scheme need to be one of {}, got '{}'".format(list(RK_TABLEAUS.keys()), scheme))
+        self.scheme = scheme
+        self.a, self.b = RK_TABLEAUS[scheme]
+
+    def step_(self, state: torch.Tensor) -> torch.Tensor:
+        r"""
+        Advance the state by one time step in place.
+
+        Args:
+            state (torch.Tensor): The concatenated (u,v,p) with shape (B,3,H,W).
+
+        Returns:
+            state (torch.Tensor): The same tensor, updated.
+        """
+        velocity = state[:, 0:2]
+        pressure = state[:, 2:3]
+        stages = self._buffer("stages", state, 2*len(self.b))
+        for i, row in enumerate(self.a):
+            work = self._buffer("work", state, 2)
+            work.copy_(velocity)
+            for j, a_ij in enumerate(row):
+                if a_ij != 0:
+                    work.add_(stages[:, 2*j:2*j+2], alpha=self.dt*a_ij)
+            if sum(row) != 0:
+                self._project_(work, sum(row)*self.dt, pressure)
+            self._explicit_terms(work, stages[:, 2*i:2*i+2])
+        work = self._buffer("work", state, 2)
+        work.copy_(velocity)
+        for i, b_i in enumerate(self.b):
+            if b_i != 0:
+                work.add_(stages[:, 2*i:2*i+2], alpha=self.dt*b_i)
+        self._project_(work, self.dt, pressure)
+        velocity.copy_(work)
+        return state
+
+class IMEXIntegrator(_ProjectionIntegrator):
+    r"""
+    Implicit-explicit (IMEX Euler) time integration of the incompressible Navier-Stokes equations:
+    the advection and the external force are explicit, the viscous term is implicit and the pressure is obtained by a projection.
+    The viscous step solves the Helmholtz equation $(I-\nu\Delta t\nabla^2)\mathbf{u}^*=\mathbf{u}+\Delta t(\mathbf{f}-\mathbf{u}\cdot\nabla\mathbf{u})$ with `PoissonSolver`,
+    so the time step is not limited by the viscous stability constraint.
+    The work buffer is allocated once for every state shape and reused by `step_` and `rollout` unless gradients are required, see `step`.
+    The other temporaries are still allocated at every step, e.g., the padded fields and the results of the operators and the FFTs of `PoissonSolver`.
+
+    Args:
+        domain_u (Domain): The domain for the x-velocity component.
+        domain_v (Domain): The domain for the y-velocity component.
+        domain_p (Domain): The domain for the pressure component.
+        viscosity (float): The viscosity coefficient.
+        dt (float): The time step size.
+        order (int): The order of accuracy for the finite difference scheme.
+        force_x (torch.Tensor, optional): The x-component of the external force. Defaults to None.
+        force_y (torch.Tensor, optional): The y-component of the external force. Defaults to None.
+        device (str, optional): The device to use for computation (default: "cpu").
+        dtype (torch.dtype, optional): The data type to use for computation (default: torch.float32).
+    """
+
+    def step_(self, state: torch.Tensor) -> torch.Tensor:
+        r"""
+        Advance the state by one time step in place.
+
+        Args:
+            state (torch.Tensor): The concatenated (u,v,p) with shape (B,3,H,W).
+
+        Returns:
+            state (torch.Tensor): The same tensor, updated.
+        """
+        velocity = state[:, 0:2]
+        pressure = state[:, 2:3]
+        work = self._buffer("work", state, 2)
+        # the velocity is updated in place at the end, so the graph keeps a copy.
+        self._explicit_terms(velocity.clone() if self._differentiable(state) else velocity, work, viscous=False)
+        work.mul_(self.dt).add_(velocity)
+        if self.viscosity != 0:
+            shift = 1/(self.viscosity*self.dt)
+            shape = state.shape[-2:]
+            # (I-nu*dt*laplacian)u = w  <=>  laplacian(u)-u/(nu*dt) = -w/(nu*dt)
+            work[:, 0:1].copy_(self._solver("u", self.domain_u, shape, shift).solve(-shift*work[:, 0:1], x0=velocity[:, 0:1]))
+            work[:, 1:2].copy_(self._solver("v", self.domain_v, shape, shift).solve(-shift*work[:, 1:2], x0=velocity[:, 1:2]))
+        self._project_(work, self.dt, pressure)
+        velocity.copy_(work)
+        return state
@@ -0,0 +1,224 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+from .profiling import profiler
+import contextlib
+import json
+import threading
+import weakref
+from torch.utils._python_dispatch import TorchDispatchMode
+from torch.utils._pytree import tree_flatten
+
+class _AllocationMode(TorchDispatchMode):
+
+    def __init__(self, tracer) -> None:
+        super().__init__()
+        self.tracer = tracer
+
+    def __torch_dispatch__(self, func, types, args=(), kwargs=None):
+        result = func(*args, **(kwargs or {}))
+        self.tracer._record(func, args, result)
+        return result
+
+class MemoryTracer():
+    r"""
+    Trace the tensor allocations of the operators and the operations.
+
+    Every ATen operation executed inside the tracer is intercepted with a `TorchDispatchMode`.
+    The new storages of its outputs (e.g., the buffers of `F.pad`, the outputs of `F.conv2d`, the temporaries of `torch.where` and the outputs of `torch.cat`)
+    are attributed to a call site: the path of the profiler regions (see `Profiler`) followed by the name of the operation,
+    e.g., "TransientNS.advection/ConvOperator.x/DirichletBoundary.correct_left/aten.where".
+    The live set is the sum of the storages which are still referenced, and its peak is reported for every phase (e.g., "forward" and "backward")
+    together with the call sites of the storages which are live at the peak.
+    The tracking is done on the CPU as well, where PyTorch has no allocator statistics; for CUDA tensors, the peak of the CUDA allocator is reported as well.
+    A storage is considered free when the tensor which allocated it is released, so storages kept alive only by aliases which are not views
+    (e.g., the results of `detach`) are released early.
+    The CPU peak is therefore approximate: it can be lower than the memory actually held if such aliases outlive the tensors which allocated the storages,
+    and it counts the bytes of the storages only, without the overhead and the caching of the allocator.
+
+    Examples:
+        ```python
+        operation = TransientNS(domain_u, domain_v, domain_p, viscosity=0.01, dt=0.01, order=2)
+        tracer = MemoryTracer()
+        tracer.trace(lambda: operation(u_0, v_0, p_0, u_1, v_1, p_1, reduction="mse"))
+        summary = tracer.summary()
+        print(summary["phases"]["forward"]["peak"], summary["phases"]["backward"]["peak_sites"])
+        ```
+
+    Args:
+        call_sites (bool, optional): Whether to start the profiler hooks while tracing, so the allocations are attributed to the ConvDO call sites.
+            Otherwise only the operations and the phases are recorded. Defaults to True.
+    """
+
+    def __init__(self, call_sites: bool=True) -> None:
+        self.call_sites = call_sites
+        # reentrant, as a storage may be released by the garbage collector while the lock is held.
+        self._lock = threading.RLock()
+        self._live = {}
+        self._live_bytes = 0
+        self._mode = None
+        self._started_profiler = False
+        self._phase = "default"
+        self.reset()
+
+    def reset(self):
+        r"""
+        Remove the records. The storages which are still live stay in the live set.
+        """
+        with self._lock:
+            self._sites = {}
+            self._phases = {}
+
+    def _phase_stats(self, name: str) -> dict:
+        if name not in self._phases:
+            self._phases[name] = {"baseline": self._live_bytes, "peak": self._live_bytes, "allocated": 0, "allocations": 0, "peak_sites": {}}
+        return self._phases[name]
+
+    def _site(self, func) -> str:
+        name = "aten."+func.overloadpacket.__name__
+        stack = profiler._stack() if self.call_sites and profiler.enabled else []
+        return name if len(stack) == 0 else stack[-1]["path"]+"/"+name
+
+    def _free(self, key: int):
+        with self._lock:
+            if key in self._live:
+                size, _ = self._live.pop(key)
+                self._live_bytes -= size
+
+    def _record(self, func, args, result):
+        if func.namespace == "profiler":
+            return
+        inputs = set()
+        for value in tree_flatten(args)[0]:
+            if isinstance(value, torch.Tensor):
+                inputs.add(value.untyped_storage().data_ptr())
+        outputs = [value for value in tree_flatten(result)[0] if isinstance(value, torch.Tensor)]
+        if len(outputs) == 0:
+            return
+        site = None
+        with self._lock:
+            phase = self._phase_stats(self._phase)
+            for value in outputs:
+                storage = value.untyped_storage()
+                key, size = storage.data_ptr(), storage.nbytes()
+                # views and in-place results do not allocate.
+                if size == 0 or key in inputs or key in self._live:
+                    continue
+                site = default(site, self._site(func))
+                self._live[key] = (size, site)
+                self._live_bytes += size
+                weakref.finalize(value, self._free, key)
+                stats = self._sites.setdefault((self._phase, site), {"calls": 0, "bytes": 0})
+                stats["calls"] += 1
+                stats["bytes"] += size
+                phase["allocated"] += size
+                phase["allocations"] += 1
+                if self._live_bytes > phase["peak"]:
+                    phase["peak"] = self._live_bytes
+                    peak_sites = {}
+                    for live_size, live_site in list(self._live.values()):
+                        peak_sites[live_site] = peak_sites.get(live_site, 0)+live_size
+                    phase["peak_sites"] = peak_sites
+
+    def start(self):
+        r"""
+        Start tracing.
+        """
+        if self._mode is not None:
+            return
+        if self.call_sites and not profiler.enabled:
+            profiler.start()
+            self._started_profiler = True
+        self._mode = _AllocationMode(self)
+        self._mode.__enter__()
+
+    def stop(self):
+        r"""
+        Stop tracing. The records are kept until `reset`.
+        """
+        if self._mode is None:
+            return
+        self._mode.__exit__(None, None, None)
+        self._mode = None
+        if self._started_profiler:
+            profiler.stop()
+            self._started_profiler = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        r"""
+        A context manager recording the allocations and the peak live set of a phase, e.g., "forward" or "backward".
+
+        Args:
+            name (str): The name of the phase.
+        """
+        previous = self._phase
+        cuda = torch.cuda.is_available() and torch.cuda.is_initialized()
+        with self._lock:
+            self._phase = name
+            self._phase_stats(name)
+        if cuda:
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+        try:
+            yield self
+        finally:
+            if cuda:
+                torch.cuda.synchronize()
+                with self._lock:
+                    self._phases[name]["cuda_peak"] = torch.cuda.max_memory_allocated()
+            with self._lock:
+                self._phase = previous
+
+    def trace(self, function, *args, backward: bool=True, **kwargs):
+        r"""
+        Trace the forward pass of a function and, optionally, the backward pass of its result.
+
+        Args:
+            function (Callable): The function, e.g., a residual operation.
+            *args: The positional arguments of the call.
+            backward (bool, optional): Whether to trace the backward pass of the sum of the result. Defaults to True.
+            **kwargs: The keyword arguments of the call.
+
+        Returns:
+            result: The result of the function.
+        """
+        with self:
+            with self.phase("forward"):
+                result = function(*args, **kwargs)
+            if backward and result.requires_grad:
+                with self.phase("backward"):
+                    result.sum().backward()
+        return result
+
+    def summary(self) -> dict:
+        r"""
+        Returns:
+            summary (dict): A dict with the keys
+                "phases": for every phase, the live bytes at the start ("baseline"), the peak live bytes ("peak"),
+                the allocated bytes and the number of allocations, the live bytes of every call site at the peak ("peak_sites")
+                and, for CUDA, the peak of the CUDA allocator ("cuda_peak");
+                "sites": for every phase and call site, the number of allocations and the allocated bytes, sorted by decreasing bytes.
+        """
+        with self._lock:
+            phases = {name: dict(stats, peak_sites=dict(sorted(stats["peak_sites"].items(), key=lambda item: item[1], reverse=True)))
+                      for name, stats in self._phases.items()}
+            sites = [dict(stats, phase=phase, site=site) for (phase, site), stats in self._sites.items()]
+        return {"phases": phases, "sites": sorted(sites, key=lambda site: site["bytes"], reverse=True)}
+
+    def save(self, path: str):
+        r"""
+        Save the summary as a JSON file.
+
+        Args:
+            path (str): The path of the file.
+        """
+        with open(path, "w") as file:
+            json.dump(dict(self.summary(), torch=torch.__version__), file, indent=1)
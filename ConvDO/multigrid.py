@@ -0,0 +1,248 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+from .boundaries import *
+from .domain import *
+from .conv_operators import *
+from .sparse import *
+from .solvers import bicgstab
+from typing import Optional, Sequence
+
+def coarsen_domain(domain: Domain) -> Domain:
+    r"""
+    The domain on a grid coarsened by a factor of two in both directions.
+    The boundary conditions are kept, the grid spacing is doubled and the shape field of every obstacle is coarsened by a majority vote over 2x2 cells.
+
+    Args:
+        domain (Domain): The fine domain.
+
+    Returns:
+        Domain (Domain): The coarse domain.
+    """
+    obstacles = []
+    for obstacle in domain.obstacles:
+        coarse_shape = torch.where(F.avg_pool2d(obstacle.shape_field.value, 2) >= 0.5, 1.0, 0.0).to(obstacle.shape_field.value.dtype)
+        obstacles.append(obstacle.with_shape_field(coarse_shape))
+    return Domain(boundaries=[domain.left_boundary, domain.right_boundary, domain.top_boundary, domain.bottom_boundary],
+                  obstacles=obstacles, delta_x=2*domain.delta_x, delta_y=2*domain.delta_y)
+
+class _Level():
+
+    def __init__(self, domain: Domain, shape: Sequence[int], order: int, device, dtype) -> None:
+        self.domain = domain
+        self.shape = tuple(shape)
+        self.laplacian = ConvLaplacian(order=order, device=device, dtype=dtype)
+        zeros = torch.zeros(1, 1, *self.shape, device=device, dtype=dtype)
+        with torch.no_grad():
+            self.bias = (self.laplacian*ScalarField(zeros, domain=domain)).value
+        self.inside = zeros.clone()
+        for obstacle in domain.obstacles:
+            self.inside = torch.maximum(self.inside, 1-obstacle.shape_field.value.to(device=device, dtype=dtype))
+        self.fluid = 1-self.inside
+        # obstacle cells are identity rows, so the operator is not singular there.
+        diagonal = assemble_diagonal(self.laplacian, domain, self.shape, dtype=dtype, device=device)+self.inside
+        self.inverse_diagonal = torch.where(diagonal == 0, torch.zeros_like(diagonal), 1/torch.where(diagonal == 0, torch.ones_like(diagonal), diagonal))
+        self.periodic_x = isinstance(domain.left_boundary, PeriodicBoundary)
+        self.periodic_y = isinstance(domain.top_boundary, PeriodicBoundary)
+        # the sign of the ghost cells of a homogeneous correction: reflected at Dirichlet walls, where it vanishes on the face, and kept otherwise.
+        self.ghost_signs = torch.ones(1, 1, self.shape[0]+2, self.shape[1]+2, device=device, dtype=dtype)
+        for boundary, ghosts in [(domain.left_boundary, (..., slice(None), 0)), (domain.right_boundary, (..., slice(None), -1)),
+                                 (domain.top_boundary, (..., 0, slice(None))), (domain.bottom_boundary, (..., -1, slice(None)))]:
+            if isinstance(boundary, DirichletBoundary):
+                self.ghost_signs[ghosts] *= -1
+
+    def apply(self, x: torch.Tensor):
+        return (self.laplacian*ScalarField(x, domain=self.domain)).value-self.bias+self.inside*x
+
+class Multigrid():
+    r"""
+    Geometric multigrid for the Poisson equation $\nabla^2 p = f$ discretized as `ConvLaplacian*ScalarField(p,domain)`.
+
+    The hierarchy is derived from the domain: every level halves the grid, doubles the grid spacing,
+    coarsens the shape fields of the obstacles and rediscretizes the Laplacian with the same boundary conditions.
+    The residual is restricted by averaging the fluid cells of every 2x2 block and the correction is prolongated bilinearly,
+    weighted by the fluid cells so that no value is interpolated from inside the obstacles.
+    The coarse ghost cells of the prolongation follow the boundary of every side: wrapped if periodic, reflected with the opposite sign at Dirichlet walls
+    and repeated otherwise.
+    The smoothers (damped Jacobi or red-black Gauss-Seidel) only use the convolutional Laplacian and its diagonal.
+    The coarsest level is solved with the pseudo-inverse of its assembled matrix,
+    or with `bicgstab` preconditioned by its diagonal if it has more than `max_coarsest_cells` cells, e.g., for a shape which is not divisible by two.
+    As with `PoissonSolver`, the solution is set to zero inside the obstacles.
+
+    Examples:
+        ```python
+        multigrid = Multigrid(domain, (1024, 1024), order=2)
+        p = multigrid.solve(rhs) # V-cycles
+        p = multigrid.solve(rhs, x0=p, method="bicgstab") # BiCGStab preconditioned by one V-cycle
+        ```
+
+    Args:
+        domain (Domain): The domain of the pressure field.
+        shape (Sequence[int]): The shape (H,W) of the field. H and W should be divisible by a power of two.
+        order (int, optional): The order of the central Laplacian scheme. Defaults to 2.
+        smoother (str, optional): "jacobi" or "rbgs" (red-black Gauss-Seidel, which is a true Gauss-Seidel for order 2 only). Defaults to "jacobi".
+        omega (float, optional): The damping factor of the Jacobi smoother. Defaults to 0.8.
+        pre_smooth (int, optional): The number of smoothing steps before the coarse grid correction. Defaults to 2.
+        post_smooth (int, optional): The number of smoothing steps after the coarse grid correction. Defaults to 2.
+        coarsest_size (int, optional): The grid is not coarsened below this number of cells in any direction. Defaults to 8.
+        max_coarsest_cells (int, optional): The maximum number of cells of the coarsest level solved with the pseudo-inverse. Defaults to 4096.
+        prolongation (str, optional): "bilinear" or "constant". Defaults to "bilinear".
+        tol (float, optional): The relative tolerance of the residual norm. Defaults to 1e-6.
+        max_iter (int, optional): The maximum number of cycles (or preconditioned iterations). Defaults to 100.
+        device (str, optional): The device to use for computation. Defaults to "cpu".
+        dtype (torch.dtype, optional): The data type to use for computation. Defaults to torch.float32.
+    """
+
+    def __init__(self,
+                 domain: Domain,
+                 shape: Sequence[int],
+                 order: int=2,
+                 smoother: str="jacobi",
+                 omega: float=0.8,
+                 pre_smooth: int=2,
+                 post_smooth: int=2,
+                 coarsest_size: int=8,
+                 max_coarsest_cells: int=4096,
+                 prolongation: str="bilinear",
+                 tol: float=1e-6,
+                 max_iter: int=100,
+                 device="cpu",
+                 dtype=torch.float32) -> None:
+        if smoother not in ["jacobi", "rbgs"]:
+            raise ValueError("smoother need to be 'jacobi' or 'rbgs', got '{}'".format(smoother))
+        if prolongation not in ["bilinear", "constant"]:
+            raise ValueError("prolongation need to be 'bilinear' or 'constant', got '{}'".format(prolongation))
+        self.smoother = smoother
+        self.omega = omega
+        self.pre_smooth = pre_smooth
+        self.post_smooth = post_smooth
+        self.prolongation = prolongation
+        self.tol = tol
+        self.max_iter = max_iter
+        self.num_iterations = 0
+        self.levels = [_Level(domain, shape, order, device, dtype)]
+        height, width = shape
+        while height % 2 == 0 and width % 2 == 0 and min(height, width)//2 >= coarsest_size:
+            height, width = height//2, width//2
+            domain = coarsen_domain(domain)
+            self.levels.append(_Level(domain, (height, width), order, device, dtype))
+        coarsest = self.levels[-1]
+        # the dense pseudo-inverse needs (H*W)^2 elements, larger coarsest levels are solved iteratively.
+        if coarsest.shape[0]*coarsest.shape[1] <= max_coarsest_cells:
+            matrix = coarsest.laplacian.to_sparse(coarsest.domain, coarsest.shape).to_dense()+torch.diag(coarsest.inside.reshape(-1))
+            self.coarsest_inverse = torch.linalg.pinv(matrix)
+        else:
+            self.coarsest_inverse = None
+        self._red = {}
+        for level in self.levels:
+            rows = torch.arange(level.shape[0], device=device)[:, None]
+            cols = torch.arange(level.shape[1], device=device)[None, :]
+            self._red[level.shape] = ((rows+cols) % 2 == 0).to(dtype)
+
+    def _smooth(self, level: _Level, x: torch.Tensor, rhs: torch.Tensor, steps: int):
+        for _ in range(steps):
+            if self.smoother == "jacobi":
+                x = x+self.omega*level.inverse_diagonal*(rhs-level.apply(x))
+            else:
+                red = self._red[level.shape]
+                x = x+red*level.inverse_diagonal*(rhs-level.apply(x))
+                x = x+(1-red)*level.inverse_diagonal*(rhs-level.apply(x))
+        return x
+
+    def _restrict(self, fine: _Level, coarse: _Level, residual: torch.Tensor):
+        weight = F.avg_pool2d(fine.fluid, 2)
+        restricted = F.avg_pool2d(residual*fine.fluid, 2)/torch.where(weight == 0, torch.ones_like(weight), weight)
+        return restricted*coarse.fluid
+
+    def _prolong(self, coarse: _Level, fine: _Level, correction: torch.Tensor):
+        if self.prolongation == "constant":
+            return correction.repeat_interleave(2, dim=-2).repeat_interleave(2, dim=-1)*fine.fluid
+        def interpolate(value, signs=None):
+            # one coarse ghost cell on each side: wrapped on periodic directions and repeated otherwise.
+            value = F.pad(value, (1, 1, 0, 0), mode="circular" if coarse.periodic_x else "replicate")
+            value = F.pad(value, (0, 0, 1, 1), mode="circular" if coarse.periodic_y else "replicate")
+            if signs is not None:
+                value = value*signs
+            return F.interpolate(value, scale_factor=2, mode="bilinear", align_corners=False)[..., 2:-2, 2:-2]
+        weight = interpolate(coarse.fluid.expand_as(correction))
+        prolonged = interpolate(correction*coarse.fluid, coarse.ghost_signs)/torch.where(weight == 0, torch.ones_like(weight), weight)
+        return prolonged*fine.fluid
+
+    def _solve_coarsest(self, rhs: torch.Tensor, x: Optional[torch.Tensor]=None):
+        if self.coarsest_inverse is None:
+            coarsest = self.levels[-1]
+            solution, _ = bicgstab(coarsest.apply, rhs, x0=x, preconditioner=lambda residual: coarsest.inverse_diagonal*residual, tol=self.tol)
+            return solution
+        flat = rhs.reshape(rhs.shape[0], -1)
+        return (flat@self.coarsest_inverse.T).reshape(rhs.shape)
+
+    def v_cycle(self, rhs: torch.Tensor, x: Optional[torch.Tensor]=None, level_index: int=0) -> torch.Tensor:
+        r"""
+        One V-cycle for the linear system $A x = r$, where $A$ is the Laplacian without the boundary bias.
+
+        Args:
+            rhs (torch.Tensor): The right hand side $r$ with shape (B,1,H,W).
+            x (torch.Tensor, optional): The initial guess. Defaults to zeros.
+            level_index (int, optional): The level of `rhs`. Defaults to 0, the finest level.
+
+        Returns:
+            x (torch.Tensor): The improved solution with shape (B,1,H,W).
+        """
+        level = self.levels[level_index]
+        if level_index == len(self.levels)-1:
+            return self._solve_coarsest(rhs, x)
+        x = torch.zeros_like(rhs) if x is None else x
+        x = self._smooth(level, x, rhs, self.pre_smooth)
+        coarse = self.levels[level_index+1]
+        coarse_rhs = self._restrict(level, coarse, rhs-level.apply(x))
+        x = x+self._prolong(coarse, level, self.v_cycle(coarse_rhs, level_index=level_index+1))
+        return self._smooth(level, x, rhs, self.post_smooth)
+
+    def precondition(self, residual: torch.Tensor) -> torch.Tensor:
+        r"""
+        Apply one V-cycle from a zero initial guess, an approximate inverse of the Laplacian for Krylov solvers, e.g., `bicgstab`.
+
+        Args:
+            residual (torch.Tensor): The residual with shape (B,1,H,W).
+
+        Returns:
+            correction (torch.Tensor): The correction with shape (B,1,H,W).
+        """
+        return self.v_cycle(residual)
+
+    def solve(self, rhs: torch.Tensor, x0: Optional[torch.Tensor]=None, method: str="cycle") -> torch.Tensor:
+        r"""
+        Solve $\nabla^2 p = f$.
+
+        Args:
+            rhs (torch.Tensor): The right hand side $f$ with shape (H,W) or (B,1,H,W).
+            x0 (torch.Tensor, optional): The initial guess, e.g., the solution of the previous time step. Defaults to None.
+            method (str, optional): "cycle" to iterate V-cycles, or "bicgstab" to use the V-cycle as the preconditioner of BiCGStab. Defaults to "cycle".
+
+        Returns:
+            p (torch.Tensor): The solution with shape (B,1,H,W).
+        """
+        level = self.levels[0]
+        if len(rhs.shape) == 2:
+            rhs = rhs.unsqueeze(0).unsqueeze(0)
+        if x0 is not None and len(x0.shape) == 2:
+            x0 = x0.unsqueeze(0).unsqueeze(0)
+        rhs = (rhs-level.bias)*level.fluid
+        if method == "bicgstab":
+            solution, self.num_iterations = bicgstab(level.apply, rhs, x0=x0, preconditioner=self.precondition,
+                                                     tol=self.tol, max_iter=self.max_iter)
+            return solution
+        elif method != "cycle":
+            raise ValueError("method need to be 'cycle' or 'bicgstab', got '{}'".format(method))
+        x = torch.zeros_like(rhs) if x0 is None else x0.clone()
+        threshold = self.tol*torch.linalg.vector_norm(rhs.flatten(1), dim=-1)
+        for iteration in range(self.max_iter):
+            if (torch.linalg.vector_norm((rhs-level.apply(x)).flatten(1), dim=-1) <= threshold).all():
+                self.num_iterations = iteration
+                return x
+            x = self.v_cycle(rhs, x)
+        self.num_iterations = self.max_iter
+        return x
+
+    def __call__(self, rhs: torch.Tensor, x0: Optional[torch.Tensor]=None) -> torch.Tensor:
+        return self.solve(rhs, x0=x0)
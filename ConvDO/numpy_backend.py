@@ -0,0 +1,432 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+r"""
+The NumPy backend, which does not import torch.
+
+The value types, the faces, the boundaries, the domains and the stencil weights (`meta_type`, `faces`, `boundaries`, `domain` and `coefficients`) are shared with the PyTorch backend,
+so these modules must not import torch. The fields, the operators and the obstacles are reimplemented with NumPy arrays.
+"""
+from .meta_type import *
+from .faces import *
+from .boundaries import *
+from .domain import *
+from .coefficients import *
+import math
+import numpy as np
+from typing import Optional, Sequence
+
+def _as_array(value):
+    # memory-mapped arrays are used as they are, they are only read.
+    value = np.asarray(value)
+    if value.ndim == 2:
+        value = value[None, None]
+    return value
+
+def _pad(value, widths):
+    # zero padding with the (left, right, top, bottom) widths of `torch.nn.functional.pad`.
+    left, right, top, bottom = widths
+    return np.pad(value, [(0, 0)]*(value.ndim-2)+[(top, bottom), (left, right)], mode="constant", constant_values=0)
+
+def _is_shape_equal(shape_field1, shape_field2):
+    return np.sum(shape_field1.value-shape_field2.value) == 0
+
+class NumpyScalarField(CommutativeValue):
+    r"""
+    The NumPy counterpart of `ScalarField`.
+
+    Args:
+        value (Optional[np.ndarray], optional): The value of the scalar field with shape (...,H,W), e.g., a memory-mapped array. Defaults to None.
+            A (H,W) array is reshaped to (1,1,H,W).
+        domain (Optional[Domain], optional): The domain of the scalar field. Defaults to UnconstrainedDomain().
+    """
+
+    def __init__(self, value=None, domain: Optional[Domain]=UnconstrainedDomain()) -> None:
+        self.value = None
+        if value is not None:
+            self.register_value(value)
+        self.domain = domain
+
+    def register_value(self, value):
+        r"""Register the value of the scalar field.
+
+        Args:
+            value (np.ndarray): The value of the scalar field.
+        """
+        self.value = _as_array(value)
+
+    def __add__(self, other):
+        if isinstance(other, NumpyScalarField):
+            return NumpyScalarField(self.value+other.value, self.domain+other.domain)
+        else:
+            return NumpyScalarField(self.value+other, self.domain+other)
+
+    def __mul__(self, other):
+        if isinstance(other, NumpyScalarField):
+            return NumpyScalarField(self.value*other.value, self.domain*other.domain)
+        else:
+            return NumpyScalarField(self.value*other, self.domain*other)
+
+    def __pow__(self, other):
+        return NumpyScalarField(self.value**other, self.domain**other)
+
+    def __truediv__(self, other):
+        if isinstance(other, NumpyScalarField):
+            return NumpyScalarField(self.value/other.value, self.domain/other.domain)
+        else:
+            try:
+                return NumpyScalarField(self.value/other, self.domain/other)
+            except Exception:
+                return NotImplemented
+
+    def __rtruediv__(self, other):
+        if isinstance(other, NumpyScalarField):
+            return NumpyScalarField(other.value/self.value, other.domain/self.domain)
+        else:
+            try:
+                return NumpyScalarField(other/self.value, other/self.domain)
+            except Exception:
+                return NotImplemented
+
+class NumpyConvOperator():
+    r"""
+    The NumPy counterpart of `ConvOperator`, with the same boundary and obstacle corrections.
+    The one-dimensional stencil is applied as a sum of strided slices of the padded field.
+
+    Args:
+        weights (Sequence[float]): The weights of the stencil, see `coefficients`.
+        direction (str, optional): The direction of the derivative, "x" or "y". Defaults to "x".
+        derivative (int, optional): The order of the derivative. Defaults to 1.
+    """
+
+    def __init__(self, weights: Sequence[float], direction: str="x", derivative: int=1) -> None:
+        if direction not in ["x", "y"]:
+            raise ValueError("direction need to be 'x' or 'y', got '{}'".format(direction))
+        self.direction = direction
+        # as for the kernels of `FDScheme`, the y axis points from the last row to the first row.
+        self.weights = list(weights) if direction == "x" else list(reversed(weights))
+        self.pad = (len(weights)-1)//2
+        self.derivative = derivative
+        self.high_order = len(weights) > 3
+
+    def allow_highorder(self, domain):
+        if self.direction == "x":
+            return isinstance(domain.left_boundary, PeriodicBoundary)
+        else:
+            return isinstance(domain.top_boundary, PeriodicBoundary)
+
+    def __mul__(self, other):
+        if not isinstance(other, NumpyScalarField):
+            raise NotImplementedError("Operation not supported")
+        if self.high_order and not self.allow_highorder(other.domain):
+            raise ValueError(
+                "High order gradient only support PeriodicBoundary with no obstacles inside.")
+        domain = other.domain
+        scalar_field = other.value
+        pad = self.pad
+        if self.direction == "x":
+            delta = math.pow(domain.delta_x, self.derivative)
+            periodic = isinstance(domain.left_boundary, PeriodicBoundary)
+        else:
+            delta = math.pow(domain.delta_y, self.derivative)
+            periodic = isinstance(domain.top_boundary, PeriodicBoundary)
+        if periodic:
+            paded = np.pad(scalar_field, [(0, 0)]*(scalar_field.ndim-2)+[(pad, pad), (pad, pad)], mode="wrap")
+        elif self.direction == "x":
+            paded = _pad(scalar_field, (pad, pad, 0, 0))
+            paded = domain.left_boundary.correct_left(paded, scalar_field, delta)
+            paded = domain.right_boundary.correct_right(paded, scalar_field, delta)
+            paded = _pad(paded, (0, 0, pad, pad))
+        else:
+            paded = _pad(scalar_field, (0, 0, pad, pad))
+            paded = domain.top_boundary.correct_top(paded, scalar_field, delta)
+            paded = domain.bottom_boundary.correct_bottom(paded, scalar_field, delta)
+            paded = _pad(paded, (pad, pad, 0, 0))
+        for obstacle in domain.obstacles:
+            if self.direction == "x":
+                paded = obstacle.correct_left(paded, scalar_field, delta)
+                paded = obstacle.correct_right(paded, scalar_field, delta)
+            else:
+                paded = obstacle.correct_top(paded, scalar_field, delta)
+                paded = obstacle.correct_bottom(paded, scalar_field, delta)
+        height, width = scalar_field.shape[-2:]
+        operated = 0
+        for i, weight in enumerate(self.weights):
+            if weight == 0:
+                continue
+            if self.direction == "x":
+                operated = operated+(weight/delta)*paded[..., pad:pad+height, i:i+width]
+            else:
+                operated = operated+(weight/delta)*paded[..., i:i+height, pad:pad+width]
+        if not self.high_order:
+            for obstacle in domain.obstacles:
+                operated = obstacle.fill_internal_field(operated)
+        return NumpyScalarField(
+            operated,
+            Domain(
+                boundaries=[PeriodicBoundary() if isinstance(boundary, PeriodicBoundary) else UnConstrainedBoundary()
+                            for boundary in [domain.left_boundary, domain.right_boundary, domain.top_boundary, domain.bottom_boundary]],
+                delta_x=domain.delta_x, delta_y=domain.delta_y,
+                obstacles=[])
+        )
+
+def NumpyConvGrad(order: int=2, direction: str="x"):
+    r"""
+    The NumPy counterpart of `ConvGrad`.
+
+    Args:
+        order (int): The order of the central interpolation scheme (default is 2).
+        direction (str): The direction of the gradient operator, ("x" or "y", default is "x").
+
+    Returns:
+        NumpyConvOperator (NumpyConvOperator): The gradient operator.
+    """
+    return NumpyConvOperator(CENTRAL_INTERPOLATION_WEIGHTS[order], direction=direction, derivative=1)
+
+def NumpyConvGrad2(order: int=2, direction: str="x"):
+    r"""
+    The NumPy counterpart of `ConvGrad2`.
+
+    Args:
+        order (int): The order of the central Laplacian scheme (default is 2).
+        direction (str): The direction of the gradient operator, ("x" or "y", default is "x").
+
+    Returns:
+        NumpyConvOperator (NumpyConvOperator): The second order gradient operator.
+    """
+    return NumpyConvOperator(CENTRAL_LAPLACIAN_WEIGHTS[order], direction=direction, derivative=2)
+
+def NumpyConvNabla(order: int=2):
+    r"""
+    The NumPy counterpart of `ConvNabla`.
+
+    Args:
+        order (int): The order of the central interpolation scheme (default is 2).
+
+    Returns:
+        VectorValue (VectorValue): The x and y gradient operators.
+    """
+    return VectorValue(NumpyConvGrad(order, "x"), NumpyConvGrad(order, "y"))
+
+class NumpyConvLaplacian():
+    r"""
+    The NumPy counterpart of `ConvLaplacian`.
+
+    Args:
+        order (int): The order of the central Laplacian scheme (default is 2).
+    """
+
+    def __init__(self, order: int=2) -> None:
+        self.op_x = NumpyConvGrad2(order, "x")
+        self.op_y = NumpyConvGrad2(order, "y")
+
+    def __mul__(self, other):
+        if isinstance(other, NumpyScalarField):
+            return self.op_x*other+self.op_y*other
+        elif isinstance(other, VectorValue):
+            return VectorValue(
+                self.op_x*other.ux+self.op_y*other.ux,
+                self.op_x*other.uy+self.op_y*other.uy
+            )
+
+class NumpyObstacle(CommutativeValue):
+    r"""
+    The NumPy counterpart of `Obstacle`.
+
+    Args:
+        shape_field (Union[np.ndarray,NumpyScalarField]): A 2D array or a NumpyScalarField representing the shape field of the obstacle.
+            Note that the shape field is a binary field where 0 represents the obstacle region.
+        lrbt_region (Optional[Sequence], optional): A sequence of four elements representing the left, right, bottom, and top regions of the obstacle. Defaults to None.
+    """
+
+    def __init__(self, shape_field, lrbt_region: Optional[Sequence]=None) -> None:
+        if isinstance(shape_field, NumpyScalarField):
+            if not isinstance(shape_field.domain, Domain) or not all(isinstance(boundary, UnConstrainedBoundary) for boundary in
+                    [shape_field.domain.left_boundary, shape_field.domain.right_boundary, shape_field.domain.top_boundary, shape_field.domain.bottom_boundary]):
+                raise ValueError("The domain of the shape field must be unconstrained")
+            self.shape_field = shape_field
+        else:
+            self.shape_field = NumpyScalarField(shape_field, domain=UnconstrainedDomain())
+        if lrbt_region is not None:
+            if len(lrbt_region) != 4:
+                raise ValueError("The lrbt_region must be a sequence of 4 elements")
+            self.x_left, self.x_right, self.y_bottom, self.y_top = [_as_array(region) > 0.5 for region in lrbt_region]
+        else:
+            dx_mask = _pad((NumpyConvGrad(2, "x")*self.shape_field).value, (1, 1, 1, 1))
+            # right is the right side of the internal cells, i.e., the left side of the obstacle.
+            self.x_right = dx_mask < -0.5
+            self.x_left = dx_mask > 0.5
+            dy_mask = _pad((NumpyConvGrad(2, "y")*self.shape_field).value, (1, 1, 1, 1))
+            self.y_bottom = dy_mask > 0.5
+            self.y_top = dy_mask < -0.5
+
+    def fill_internal_field(self, target_field):
+        return target_field*self.shape_field.value
+
+    def _check_shape(self, other):
+        if isinstance(other, NumpyObstacle) and not _is_shape_equal(self.shape_field, other.shape_field):
+            raise ValueError("The two obstacles don't have same shape field.")
+
+    def __pow__(self, other):
+        return NumpyUnConstrainedObstacle(self.shape_field)
+
+    def __add__(self, other):
+        self._check_shape(other)
+        return NumpyUnConstrainedObstacle(self.shape_field)
+
+    def __mul__(self, other):
+        self._check_shape(other)
+        return NumpyUnConstrainedObstacle(self.shape_field)
+
+    def __truediv__(self, other):
+        self._check_shape(other)
+        return NumpyUnConstrainedObstacle(self.shape_field)
+
+    def __rtruediv__(self, other):
+        self._check_shape(other)
+        return NumpyUnConstrainedObstacle(self.shape_field)
+
+class NumpyDirichletObstacle(NumpyObstacle):
+    r"""
+    The NumPy counterpart of `DirichletObstacle`.
+
+    Args:
+        shape_field (Union[np.ndarray,NumpyScalarField]): A 2D array or a NumpyScalarField representing the shape field of the obstacle.
+        boundary_value (float): The boundary value of the Dirichlet obstacle.
+    """
+
+    def __init__(self, shape_field, boundary_value: float) -> None:
+        super().__init__(shape_field)
+        self.boundary_face = DirichletFace(boundary_value)
+
+    def correct_left(self, padded_face, ori_field, delta):
+        return np.where(self.x_left, self.boundary_face.correct_inward_padding(padded_face), padded_face)
+
+    def correct_right(self, padded_face, ori_field, delta):
+        return np.where(self.x_right, self.boundary_face.correct_outward_padding(padded_face), padded_face)
+
+    def correct_top(self, padded_face, ori_field, delta):
+        return np.where(self.y_top, self.boundary_face.correct_outward_padding(padded_face), padded_face)
+
+    def correct_bottom(self, padded_face, ori_field, delta):
+        return np.where(self.y_bottom, self.boundary_face.correct_inward_padding(padded_face), padded_face)
+
+    def _combine(self, other, operation):
+        self._check_shape(other)
+        if isinstance(other, NumpyDirichletObstacle):
+            return NumpyDirichletObstacle(self.shape_field, operation(self.boundary_face.face_value, other.boundary_face.face_value))
+        elif isinstance(other, NumpyObstacle):
+            return NumpyUnConstrainedObstacle(self.shape_field)
+        else:
+            return NumpyDirichletObstacle(self.shape_field, operation(self.boundary_face.face_value, other))
+
+    def __add__(self, other):
+        return self._combine(other, lambda a, b: a+b)
+
+    def __mul__(self, other):
+        return self._combine(other, lambda a, b: a*b)
+
+    def __truediv__(self, other):
+        return self._combine(other, lambda a, b: a/b)
+
+    def __rtruediv__(self, other):
+        return self._combine(other, lambda a, b: b/a)
+
+    def __pow__(self, other):
+        return NumpyDirichletObstacle(self.shape_field, self.boundary_face.face_value**other)
+
+class NumpyNeumannObstacle(NumpyObstacle):
+    r"""
+    The NumPy counterpart of `NeumannObstacle`.
+
+    Args:
+        shape_field (Union[np.ndarray,NumpyScalarField]): A 2D array or a NumpyScalarField representing the shape field of the obstacle.
+        boundary_gradient (float): The boundary gradient of the Neumann obstacle.
+    """
+
+    def __init__(self, shape_field, boundary_gradient: float) -> None:
+        super().__init__(shape_field)
+        self.boundary_face = NeumannFace(boundary_gradient)
+
+    def correct_left(self, padded_face, ori_field, delta):
+        return np.where(self.x_left, self.boundary_face.correct_inward_padding(padded_face, delta), padded_face)
+
+    def correct_right(self, padded_face, ori_field, delta):
+        return np.where(self.x_right, self.boundary_face.correct_outward_padding(padded_face, delta), padded_face)
+
+    def correct_top(self, padded_face, ori_field, delta):
+        return np.where(self.y_top, self.boundary_face.correct_outward_padding(padded_face, delta), padded_face)
+
+    def correct_bottom(self, padded_face, ori_field, delta):
+        return np.where(self.y_bottom, self.boundary_face.correct_inward_padding(padded_face, delta), padded_face)
+
+    def __add__(self, other):
+        self._check_shape(other)
+        if isinstance(other, NumpyNeumannObstacle):
+            return NumpyNeumannObstacle(self.shape_field, self.boundary_face.face_gradient+other.boundary_face.face_gradient)
+        elif isinstance(other, NumpyObstacle):
+            return NumpyUnConstrainedObstacle(self.shape_field)
+        else:
+            # Neumann+number=Neumann
+            return NumpyNeumannObstacle(self.shape_field, self.boundary_face.face_gradient)
+
+    def __mul__(self, other):
+        self._check_shape(other)
+        if isinstance(other, NumpyObstacle):
+            return NumpyUnConstrainedObstacle(self.shape_field)
+        return NumpyNeumannObstacle(self.shape_field, self.boundary_face.face_gradient*other)
+
+    def __truediv__(self, other):
+        self._check_shape(other)
+        if isinstance(other, NumpyObstacle):
+            return NumpyUnConstrainedObstacle(self.shape_field)
+        return NumpyNeumannObstacle(self.shape_field, self.boundary_face.face_gradient/other)
+
+    def __rtruediv__(self, other):
+        self._check_shape(other)
+        if isinstance(other, NumpyObstacle):
+            return NumpyUnConstrainedObstacle(self.shape_field)
+        return NumpyNeumannObstacle(self.shape_field, other/self.boundary_face.face_gradient)
+
+class NumpyUnConstrainedObstacle(NumpyObstacle):
+    r"""
+    The NumPy counterpart of `UnConstrainedObstacle`.
+
+    Args:
+        shape_field (Union[np.ndarray,NumpyScalarField]): A 2D array or a NumpyScalarField representing the shape field of the obstacle.
+    """
+
+    def __init__(self, shape_field) -> None:
+        super().__init__(shape_field)
+        self.boundary_face = UnConstrainedFace()
+
+    def correct_left(self, padded_face, ori_field, delta):
+        return np.where(self.x_left,
+                        _pad(self.boundary_face.correct_inward_padding(_pad(ori_field, (0, 1, 0, 0)),
+                                                                       _pad(ori_field[..., 1:], (0, 2, 0, 0)),
+                                                                       _pad(ori_field[..., 2:], (0, 3, 0, 0))),
+                             (1, 0, 1, 1)),
+                        padded_face)
+
+    def correct_right(self, padded_face, ori_field, delta):
+        return np.where(self.x_right,
+                        _pad(self.boundary_face.correct_outward_padding(_pad(ori_field, (1, 0, 0, 0)),
+                                                                        _pad(ori_field, (2, 0, 0, 0))[..., :-1],
+                                                                        _pad(ori_field, (3, 0, 0, 0))[..., :-2]),
+                             (0, 1, 1, 1)),
+                        padded_face)
+
+    def correct_top(self, padded_face, ori_field, delta):
+        return np.where(self.y_top,
+                        _pad(self.boundary_face.correct_outward_padding(_pad(ori_field, (0, 0, 0, 1)),
+                                                                        _pad(ori_field[..., 1:, :], (0, 0, 0, 2)),
+                                                                        _pad(ori_field[..., 2:, :], (0, 0, 0, 3))),
+                             (1, 1, 1, 0)),
+                        padded_face)
+
+    def correct_bottom(self, padded_face, ori_field, delta):
+        return np.where(self.y_bottom,
+                        _pad(self.boundary_face.correct_inward_padding(_pad(ori_field, (0, 0, 1, 0)),
+                                                                       _pad(ori_field, (0, 0, 2, 0))[..., :-1, :],
+                                                                       _pad(ori_field, (0, 0, 3, 0))[..., :-2, :]),
+                             (1, 1, 0, 1)),
+                        padded_face)
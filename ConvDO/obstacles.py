@@ -5,19 +5,60 @@ from .faces import *
 from .domain import *
 from .conv_operators import *
 from .meta_type import *
+from .cache import *
 import torch
+from torch.utils.weak import WeakIdKeyDictionary
 from typing import Union,Sequence,Optional
 
 def is_shape_equal(shape_filed1:ScalarField,shape_field2:ScalarField):
     return torch.sum(shape_filed1.value-shape_field2.value)==0
 
-def generate_circle_2D(center_x,center_y,radius,length_x,length_y,dx=1,dy=1):
+def _circle_2D(center_x,center_y,radius,length_x,length_y,dx,dy):
+    import numpy as np
     X, Y=np.ogrid[0.5:int(length_x/dx)+0.5, 0.5:int(length_y/dy)+0.5]
     X=X*dx
     Y=Y*dy
     dist_from_center = torch.tensor(np.sqrt((X - center_x)**2 + (Y-center_y)**2))
     return torch.where(dist_from_center < radius,0.0,1.0)
 
+def generate_circle_2D(center_x,center_y,radius,length_x,length_y,dx=1,dy=1):
+    # loaded from the disk cache if enabled, see `ArtifactCache`.
+    key=artifact_key("circle_2D",center_x,center_y,radius,length_x,length_y,dx,dy) if artifact_cache.enabled else None
+    return artifact_cache.cached(key,lambda: {"shape_field":_circle_2D(center_x,center_y,radius,length_x,length_y,dx,dy)})["shape_field"]
+
+def _gather_with_zeros(field,rows,cols,dtype=None):
+    # field[...,rows,cols] where positions outside the field are zero, as with the zero padding in `correct_*`, optionally converted to `dtype`.
+    inside=(rows>=0)&(rows<field.shape[-2])&(cols>=0)&(cols<field.shape[-1])
+    values=field[...,rows.clamp(0,field.shape[-2]-1),cols.clamp(0,field.shape[-1]-1)].to(dtype=default(dtype,field.dtype))
+    return torch.where(inside,values,torch.zeros_like(values))
+
+def _compute_edge_masks(shape_field:ScalarField):
+    gradx=ConvGrad(order=2,device=shape_field.value.device,direction='x')
+    grady=ConvGrad(order=2,device=shape_field.value.device,direction='y')
+    #dx_mask=nn.functional.pad((shape_field[...,1:]-shape_field[...,0:-1]),(1,1,0,0),"constant",0)
+    dx_mask=nn.functional.pad((gradx*shape_field).value,(1,1,1,1),"constant",0)
+    #dy_mask=nn.functional.pad((shape_field[...,0:-1,:]-shape_field[...,1:,:]),(0,0,1,1),"constant",0)
+    dy_mask=nn.functional.pad((grady*shape_field).value,(1,1,1,1),"constant",0)
+    #NOTE: right is the right corresponding to the internal cell, that is right is the left side of the obstacle
+    return {"x_left":torch.where(dx_mask > 0.5, 1.0, 0.0),
+            "x_right":torch.where(dx_mask < -0.5, 1.0, 0.0),
+            "y_bottom":torch.where(dy_mask > 0.5, 1.0, 0.0),
+            "y_top":torch.where(dy_mask < -0.5, 1.0, 0.0)}
+
+# the edge masks by shape field tensor, shared by the obstacles derived by the domain algebra, which reuse the shape field of their operands.
+# keyed by identity, tensors can not be compared with `==` as the keys of a `weakref.WeakKeyDictionary`.
+_shape_edge_masks=WeakIdKeyDictionary()
+
+def _edge_masks(shape_field:ScalarField):
+    value=shape_field.value
+    masks=_shape_edge_masks.get(value)
+    if masks is None or masks["version"]!=value._version:
+        # loaded from the disk cache if enabled, see `ArtifactCache`.
+        key=artifact_key("obstacle_masks",value) if artifact_cache.enabled else None
+        masks=dict(artifact_cache.cached(key,lambda: _compute_edge_masks(shape_field),device=value.device),version=value._version)
+        _shape_edge_masks[value]=masks
+    return masks
+
 class Obstacle(CommutativeValue):
     """
     A base class to represent an obstacle.
@@ -34,7 +75,9 @@ class Obstacle(CommutativeValue):
             shape_domain=UnconstrainedDomain()
             self.shape_field=ScalarField(shape_field,domain=shape_domain) #01 field where 0 inside the obstacle
         elif isinstance(shape_field,ScalarField):
-            if not isinstance(shape_field.domain,UnconstrainedDomain):
+            # `UnconstrainedDomain` is a factory, the boundaries are checked instead.
+            domain=shape_field.domain
+            if not all(isinstance(boundary,UnConstrainedBoundary) for boundary in [domain.left_boundary,domain.right_boundary,domain.top_boundary,domain.bottom_boundary]):
                 raise ValueError("The domain of the shape field must be unconstrained")
             self.shape_field=shape_field
         if lrbt_region is not None:
@@ -45,17 +88,11 @@ class Obstacle(CommutativeValue):
             self.y_bottom=lrbt_region[2]
             self.y_top=lrbt_region[3]
         else:
-            gradx=ConvGrad(order=2,device=self.shape_field.value.device,direction='x')
-            grady=ConvGrad(order=2,device=self.shape_field.value.device,direction='y')
-            #dx_mask=nn.functional.pad((shape_field[...,1:]-shape_field[...,0:-1]),(1,1,0,0),"constant",0)
-            dx_mask=nn.functional.pad((gradx*self.shape_field).value,(1,1,1,1),"constant",0)
-            #NOTE: right is the right corresponding to the internal cell, that is right is the left side of the obstacle
-            self.x_right=torch.where(dx_mask < -0.5, 1.0, 0.0)
-            self.x_left=torch.where(dx_mask > 0.5, 1.0, 0.0)
-            #dy_mask=nn.functional.pad((shape_field[...,0:-1,:]-shape_field[...,1:,:]),(0,0,1,1),"constant",0)
-            dy_mask=nn.functional.pad((grady*self.shape_field).value,(1,1,1,1),"constant",0)
-            self.y_bottom=torch.where(dy_mask > 0.5, 1.0, 0.0)
-            self.y_top=torch.where(dy_mask < -0.5, 1.0, 0.0)
+            masks=_edge_masks(self.shape_field)
+            self.x_left=masks["x_left"]
+            self.x_right=masks["x_right"]
+            self.y_bottom=masks["y_bottom"]
+            self.y_top=masks["y_top"]
     
     def correct_left(self,padded_face,ori_field,delta):
         raise NotImplementedError
@@ -68,8 +105,29 @@ class Obstacle(CommutativeValue):
     def correct_bottom(self,padded_face,ori_field,delta):
        raise NotImplementedError
 
+    # sample_* apply the same correction as correct_* to the padded values at the padded positions (rows,cols) only.
+    def sample_left(self,padded_values,ori_field,rows,cols,delta):
+        raise NotImplementedError
+
+    def sample_right(self,padded_values,ori_field,rows,cols,delta):
+        raise NotImplementedError
+
+    def sample_top(self,padded_values,ori_field,rows,cols,delta):
+        raise NotImplementedError
+
+    def sample_bottom(self,padded_values,ori_field,rows,cols,delta):
+        raise NotImplementedError
+
+    # in the precision of the target, e.g., a float16 derivative is not promoted by a float32 shape field.
     def fill_internal_field(self,target_field):
-        return target_field*self.shape_field.value
+        return target_field*self.shape_field.value.to(target_field.dtype)
+
+    def sample_internal_field(self,target_values,rows,cols):
+        return target_values*self.shape_field.value[...,rows,cols].to(target_values.dtype)
+
+    # returns an obstacle of the same type and boundary condition with another shape field, e.g., on a coarser grid.
+    def with_shape_field(self,shape_field):
+        raise NotImplementedError
 
 class DirichletObstacle(Obstacle):
     """
@@ -106,7 +164,30 @@ class DirichletObstacle(Obstacle):
                            self.boundary_face.correct_inward_padding(padded_face),
                            padded_face)
 
+    def sample_left(self,padded_values,ori_field,rows,cols,delta):
+        return torch.where(self.x_left[...,rows,cols]>0.5,
+                           self.boundary_face.correct_inward_padding(padded_values),
+                           padded_values)
+
+    def sample_right(self,padded_values,ori_field,rows,cols,delta):
+        return torch.where(self.x_right[...,rows,cols]>0.5,
+                           self.boundary_face.correct_outward_padding(padded_values),
+                           padded_values)
+
+    def sample_top(self,padded_values,ori_field,rows,cols,delta):
+        return torch.where(self.y_top[...,rows,cols]>0.5,
+                           self.boundary_face.correct_outward_padding(padded_values),
+                           padded_values)
+
+    def sample_bottom(self,padded_values,ori_field,rows,cols,delta):
+        return torch.where(self.y_bottom[...,rows,cols]>0.5,
+                           self.boundary_face.correct_inward_padding(padded_values),
+                           padded_values)
+
     # + ： 
+    def with_shape_field(self,shape_field):
+        return DirichletObstacle(shape_field,self.boundary_face.face_value)
+
     def __add__(self, other):
         if isinstance(other,Obstacle):
             if not is_shape_equal(self.shape_field,other.shape_field):
@@ -208,7 +289,30 @@ class NeumannObstacle(Obstacle):
                            self.boundary_face.correct_inward_padding(padded_face,delta),
                            padded_face)
 
+    def sample_left(self,padded_values,ori_field,rows,cols,delta):
+        return torch.where(self.x_left[...,rows,cols]>0.5,
+                           self.boundary_face.correct_inward_padding(padded_values,delta),
+                           padded_values)
+
+    def sample_right(self,padded_values,ori_field,rows,cols,delta):
+        return torch.where(self.x_right[...,rows,cols]>0.5,
+                           self.boundary_face.correct_outward_padding(padded_values,delta),
+                           padded_values)
+
+    def sample_top(self,padded_values,ori_field,rows,cols,delta):
+        return torch.where(self.y_top[...,rows,cols]>0.5,
+                           self.boundary_face.correct_outward_padding(padded_values,delta),
+                           padded_values)
+
+    def sample_bottom(self,padded_values,ori_field,rows,cols,delta):
+        return torch.where(self.y_bottom[...,rows,cols]>0.5,
+                           self.boundary_face.correct_inward_padding(padded_values,delta),
+                           padded_values)
+
     # + ： 
+    def with_shape_field(self,shape_field):
+        return NeumannObstacle(shape_field,self.boundary_face.face_gradient)
+
     def __add__(self, other):
         if isinstance(other,Obstacle):
             if not is_shape_equal(self.shape_field,other.shape_field):
@@ -314,7 +418,39 @@ class UnConstrainedObstacle(Obstacle):
                             (1,1,0,1),"constant",0),
                            padded_face)
 
+    # the padded position (r,c) corresponds to the position (r-1,c-1) of the original field.
+    def sample_left(self,padded_values,ori_field,rows,cols,delta):
+        return torch.where(self.x_left[...,rows,cols]>0.5,
+                           self.boundary_face.correct_inward_padding(_gather_with_zeros(ori_field,rows-1,cols-1,padded_values.dtype),
+                                                                     _gather_with_zeros(ori_field,rows-1,cols,padded_values.dtype),
+                                                                     _gather_with_zeros(ori_field,rows-1,cols+1,padded_values.dtype)),
+                           padded_values)
+
+    def sample_right(self,padded_values,ori_field,rows,cols,delta):
+        return torch.where(self.x_right[...,rows,cols]>0.5,
+                           self.boundary_face.correct_outward_padding(_gather_with_zeros(ori_field,rows-1,cols-1,padded_values.dtype),
+                                                                      _gather_with_zeros(ori_field,rows-1,cols-2,padded_values.dtype),
+                                                                      _gather_with_zeros(ori_field,rows-1,cols-3,padded_values.dtype)),
+                           padded_values)
+
+    def sample_top(self,padded_values,ori_field,rows,cols,delta):
+        return torch.where(self.y_top[...,rows,cols]>0.5,
+                           self.boundary_face.correct_outward_padding(_gather_with_zeros(ori_field,rows-1,cols-1,padded_values.dtype),
+                                                                      _gather_with_zeros(ori_field,rows,cols-1,padded_values.dtype),
+                                                                      _gather_with_zeros(ori_field,rows+1,cols-1,padded_values.dtype)),
+                           padded_values)
+
+    def sample_bottom(self,padded_values,ori_field,rows,cols,delta):
+        return torch.where(self.y_bottom[...,rows,cols]>0.5,
+                           self.boundary_face.correct_inward_padding(_gather_with_zeros(ori_field,rows-1,cols-1,padded_values.dtype),
+                                                                     _gather_with_zeros(ori_field,rows-2,cols-1,padded_values.dtype),
+                                                                     _gather_with_zeros(ori_field,rows-3,cols-1,padded_values.dtype)),
+                           padded_values)
+
     # + ： 
+    def with_shape_field(self,shape_field):
+        return UnConstrainedObstacle(shape_field)
+
     def __add__(self, other):
         if isinstance(other,Obstacle):
             if not is_shape_equal(self.shape_field,other.shape_field):
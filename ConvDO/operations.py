@@ -2,6 +2,10 @@ from .helpers import *
 from .schemes import *
 from .domain import *
 from .conv_operators import *
+from .conv_operators import _LOW_PRECISION_DTYPES
+from .frozen import *
+from .profiling import *
+from .registry import *
 
 class FieldOperations():
     r"""
@@ -17,15 +21,118 @@ class FieldOperations():
         nabla2 (ConvLaplacian): The Laplacian operator.
         grad_x (ConvGrad): The gradient operator in the x direction.
         grad_y (ConvGrad): The gradient operator in the y direction.
+
+    The operators are shared by every operation with the same order, device and data type, see `OperatorRegistry`.
+    The operations only hold their configuration (operators, domains, coefficients):
+    the fields are passed through every call and never stored, so one operation can be shared by concurrent threads.
     """
 
     def __init__(self, order:int, device="cpu", dtype=torch.float32) -> None:
-        self.nabla = ConvNabla(order, device=device, dtype=dtype)
-        self.nabla2 = ConvLaplacian(order, device=device, dtype=dtype)
-        self.grad_x = ConvGrad(order, direction='x', device=device, dtype=dtype)
-        self.grad_y = ConvGrad(order, direction='y', device=device, dtype=dtype)
-        self.grad2_x = ConvGrad2(order, direction='x', device=device, dtype=dtype)
-        self.grad2_y = ConvGrad2(order, direction='y', device=device, dtype=dtype)
+        # shared by every operation with the same order, device and data type, see `OperatorRegistry`.
+        operators = operator_registry.get(order, device=device, dtype=dtype)
+        self.nabla = operators["nabla"]
+        self.nabla2 = operators["nabla2"]
+        self.grad_x = operators["grad_x"]
+        self.grad_y = operators["grad_y"]
+        self.grad2_x = operators["grad2_x"]
+        self.grad2_y = operators["grad2_y"]
+
+
+def _reduce_residuals(residuals, reduction=None, per_channel=False, mask=None, dim=-3):
+    # reduces every residual channel on its own, so the concatenated residual is never materialized.
+    if reduction is None or reduction == "none":
+        return torch.cat(residuals, dim=dim)
+    if reduction not in ["mse", "l1", "sum"]:
+        raise ValueError("reduction need to be None, 'none', 'mse', 'l1' or 'sum', got '{}'".format(reduction))
+    losses = []
+    counts = []
+    for residual in residuals:
+        if residual.dtype in _LOW_PRECISION_DTYPES:
+            # the losses of half precision residuals are accumulated in float32.
+            residual = residual.float()
+        if reduction == "l1":
+            weighted = residual.abs() if mask is None else residual.abs()*mask
+            losses.append(weighted.sum())
+        else:
+            # dot product keeps only the residual (and its masked copy) for backward instead of its square.
+            weighted = residual if mask is None else residual*mask
+            losses.append(torch.dot(weighted.reshape(-1), residual.reshape(-1)))
+        if reduction == "sum":
+            counts.append(1)
+        elif mask is None:
+            counts.append(residual.numel())
+        else:
+            counts.append(mask.expand_as(residual).sum())
+    if per_channel:
+        return torch.stack([loss/count for loss, count in zip(losses, counts)])
+    return sum(losses)/sum(counts) if reduction != "sum" else sum(losses)
+
+
+def _transient_ns_sampled(operation, velocity_0, velocity_1, p_0, p_1, index, force=None):
+    # derivatives of the intermediate velocity are averages of the derivatives of both frames,
+    # so the intermediate fields never need to be formed on the whole grid.
+    def sample_average(operator, field_0, field_1):
+        return (operator.sample(field_0, index)+operator.sample(field_1, index))*0.5
+    u_0, v_0 = velocity_0.ux, velocity_0.uy
+    u_1, v_1 = velocity_1.ux, velocity_1.uy
+    u_inter = (u_0.sample(index)+u_1.sample(index))*0.5
+    v_inter = (v_0.sample(index)+v_1.sample(index))*0.5
+    du_dx_1 = operation.grad_x.sample(u_1, index)
+    dv_dy_1 = operation.grad_y.sample(v_1, index)
+    du_dx_inter = (operation.grad_x.sample(u_0, index)+du_dx_1)*0.5
+    dv_dy_inter = (operation.grad_y.sample(v_0, index)+dv_dy_1)*0.5
+    transient_x = (u_1.sample(index)-u_0.sample(index))/operation.dt
+    transient_y = (v_1.sample(index)-v_0.sample(index))/operation.dt
+    advection_x = u_inter*du_dx_inter+v_inter*sample_average(operation.grad_y, u_0, u_1)
+    advection_y = u_inter*sample_average(operation.grad_x, v_0, v_1)+v_inter*dv_dy_inter
+    pressure_x = sample_average(operation.grad_x, p_0, p_1)
+    pressure_y = sample_average(operation.grad_y, p_0, p_1)
+    vis_x = -1*operation.viscosity*sample_average(operation.nabla2, u_0, u_1)
+    vis_y = -1*operation.viscosity*sample_average(operation.nabla2, v_0, v_1)
+    ns_res_x = transient_x+advection_x+pressure_x+vis_x
+    ns_res_y = transient_y+advection_y+pressure_y+vis_y
+    if force is not None:
+        ns_res_x = ns_res_x-force.ux.sample(index)
+        ns_res_y = ns_res_y-force.uy.sample(index)
+    divergence = ((du_dx_inter+dv_dy_inter)+(du_dx_1+dv_dy_1))*0.5
+    return [ns_res_x, ns_res_y, divergence]
+
+
+def _transient_ns_trajectory(operation, u, v, p, force=None):
+    # all derivatives are affine in the field, so the derivative of the average of two frames
+    # is the average of the derivatives of the frames. Every frame is thus differentiated only once.
+    batch, frames = u.shape[0], u.shape[1]
+    shape = u.shape[-2:]
+    def per_frame(operator, value, domain):
+        return (operator*ScalarField(value.reshape(batch*frames, 1, *shape), domain=domain)).value.reshape(batch, frames, *shape)
+    def average(value):
+        return (value[:, 1:]+value[:, :-1])*0.5
+    domain_u = operation.domain_u
+    domain_v = operation.domain_v
+    domain_p = operation.domain_p
+    du_dx = per_frame(operation.grad_x, u, domain_u)
+    du_dy = per_frame(operation.grad_y, u, domain_u)
+    dv_dx = per_frame(operation.grad_x, v, domain_v)
+    dv_dy = per_frame(operation.grad_y, v, domain_v)
+    u_inter = average(u)
+    v_inter = average(v)
+    du_dx_inter = average(du_dx)
+    dv_dy_inter = average(dv_dy)
+    transient_x = (u[:, 1:]-u[:, :-1])/operation.dt
+    transient_y = (v[:, 1:]-v[:, :-1])/operation.dt
+    advection_x = u_inter*du_dx_inter+v_inter*average(du_dy)
+    advection_y = u_inter*average(dv_dx)+v_inter*dv_dy_inter
+    pressure_x = average(per_frame(operation.grad_x, p, domain_p))
+    pressure_y = average(per_frame(operation.grad_y, p, domain_p))
+    vis_x = -1*operation.viscosity*average(per_frame(operation.nabla2.op_x, u, domain_u)+per_frame(operation.nabla2.op_y, u, domain_u))
+    vis_y = -1*operation.viscosity*average(per_frame(operation.nabla2.op_x, v, domain_v)+per_frame(operation.nabla2.op_y, v, domain_v))
+    ns_res_x = transient_x+advection_x+pressure_x+vis_x
+    ns_res_y = transient_y+advection_y+pressure_y+vis_y
+    if force is not None:
+        ns_res_x = ns_res_x-force.ux.value
+        ns_res_y = ns_res_y-force.uy.value
+    divergence = ((du_dx_inter+dv_dy_inter)+(du_dx[:, 1:]+dv_dy[:, 1:]))*0.5
+    return torch.stack([ns_res_x, ns_res_y, divergence], dim=2)
 
 
 class TransientNSWithForce(FieldOperations):
@@ -66,17 +173,16 @@ class TransientNSWithForce(FieldOperations):
                  dtype=torch.float32,
                  ) -> None:
         super().__init__(order, device=device, dtype=dtype)
-        self.p_0 = ScalarField(domain=domain_p)
-        self.p_1 = ScalarField(domain=domain_p)
-        self.velocity_0 = VectorValue(ScalarField(domain=domain_u), ScalarField(domain=domain_v))
-        self.velocity_1 = VectorValue(ScalarField(domain=domain_u), ScalarField(domain=domain_v))
+        self.domain_u = domain_u
+        self.domain_v = domain_v
+        self.domain_p = domain_p
         self.force = VectorValue(ScalarField(force_x, domain=domain_force_x),
                                  ScalarField(force_y, domain=domain_force_y))
         self.viscosity = viscosity
         self.dt = dt
         
 
-    def __call__(self, u_0, v_0, p_0, u_1, v_1, p_1):
+    def __call__(self, u_0, v_0, p_0, u_1, v_1, p_1, reduction=None, per_channel=False, mask=None, index=None):
         """
         Compute the solution of the transient Navier-Stokes equations with external force.
 
@@ -87,24 +193,64 @@ class TransientNSWithForce(FieldOperations):
             u_1 (torch.Tensor): The x-velocity component at time step t+1.
             v_1 (torch.Tensor): The y-velocity component at time step t+1.
             p_1 (torch.Tensor): The pressure component at time step t+1.
+            reduction (str, optional): If given, the residual is reduced to a loss during the evaluation instead of being concatenated.
+                "mse" gives the mean squared residual, "l1" the mean absolute residual and "sum" the sum of squared residuals.
+                Defaults to None, which returns the concatenated residual.
+            per_channel (bool, optional): Whether to return one loss for every residual channel instead of a single loss. Defaults to False.
+            mask (torch.Tensor, optional): A weight field broadcastable to the residual of one channel, e.g., 0 outside the region of interest.
+                The means are then taken over the weights. Defaults to None.
+            index (Sequence[torch.Tensor], optional): The row and column indices `(rows, cols)` of the cells where the residual is evaluated,
+                two integer tensors of shape (N,). The residual then has the shape (B,C,N) and the cost scales with N. Defaults to None, i.e., all cells.
 
         Returns:
-            residual (torch.Tensor): The concatenated tensor of the x-velocity, y-velocity, and divergence components.
+            residual (torch.Tensor): The concatenated tensor of the x-velocity, y-velocity, and divergence components, or the loss if `reduction` is given.
         """
-        self.velocity_0.ux.register_value(u_0)
-        self.velocity_0.uy.register_value(v_0)
-        self.p_0.register_value(p_0)
-        self.velocity_1.ux.register_value(u_1)
-        self.velocity_1.uy.register_value(v_1)
-        self.p_1.register_value(p_1)
-        u_inter = (self.velocity_0 + self.velocity_1) * 0.5
-        transient = (self.velocity_1 - self.velocity_0) / self.dt
-        advection = u_inter @ (self.nabla * u_inter)
-        pressure = self.nabla * ((self.p_0 + self.p_1) * 0.5)
-        vis = -1 * self.viscosity * (self.nabla2 * u_inter)
+        velocity_0 = VectorValue(ScalarField(u_0, self.domain_u), ScalarField(v_0, self.domain_v))
+        velocity_1 = VectorValue(ScalarField(u_1, self.domain_u), ScalarField(v_1, self.domain_v))
+        p_0 = ScalarField(p_0, self.domain_p)
+        p_1 = ScalarField(p_1, self.domain_p)
+        if index is not None:
+            return _reduce_residuals(_transient_ns_sampled(self, velocity_0, velocity_1, p_0, p_1, index, force=self.force), reduction, per_channel, mask, dim=-2)
+        u_inter = (velocity_0 + velocity_1) * 0.5
+        with region("TransientNSWithForce.transient"):
+            transient = (velocity_1 - velocity_0) / self.dt
+        with region("TransientNSWithForce.advection"):
+            advection = u_inter @ (self.nabla * u_inter)
+        with region("TransientNSWithForce.pressure"):
+            pressure = self.nabla * ((p_0 + p_1) * 0.5)
+        with region("TransientNSWithForce.viscous"):
+            vis = -1 * self.viscosity * (self.nabla2 * u_inter)
         ns_res = transient + advection + pressure + vis - self.force
-        divergence = ((self.nabla @ u_inter) + (self.nabla @ self.velocity_1)) * 0.5
-        return torch.cat([ns_res.ux.value, ns_res.uy.value, divergence.value], dim=-3)
+        with region("TransientNSWithForce.divergence"):
+            divergence = ((self.nabla @ u_inter) + (self.nabla @ velocity_1)) * 0.5
+        return _reduce_residuals([ns_res.ux.value, ns_res.uy.value, divergence.value], reduction, per_channel, mask)
+
+    def trajectory(self, u, v, p):
+        """
+        Compute the residuals of all successive frame pairs of a trajectory in one batched pass.
+        The spatial derivatives of every frame are computed only once and shared by the two residuals using the frame.
+
+        Args:
+            u (torch.Tensor): The x-velocity component with shape (B,T,H,W).
+            v (torch.Tensor): The y-velocity component with shape (B,T,H,W).
+            p (torch.Tensor): The pressure component with shape (B,T,H,W).
+
+        Returns:
+            residual (torch.Tensor): The residuals with shape (B,T-1,3,H,W), where `residual[:,t]` equals the result of `__call__` for frames t and t+1.
+        """
+        return _transient_ns_trajectory(self, u, v, p, force=self.force)
+
+    def freeze(self, shape):
+        """
+        Freeze the operation for one field shape into a `torch.compile`-friendly module, see `FrozenTransientNS`.
+
+        Args:
+            shape (Sequence[int]): The shape (H,W) of the fields.
+
+        Returns:
+            module (FrozenTransientNS): The frozen operation.
+        """
+        return FrozenTransientNS(self, shape)
 
 
 class TransientNS(FieldOperations):
@@ -136,15 +282,14 @@ class TransientNS(FieldOperations):
                  dtype=torch.float32,
                  ) -> None:
         super().__init__(order, device=device, dtype=dtype)
-        self.p_0 = ScalarField(domain=domain_p)
-        self.p_1 = ScalarField(domain=domain_p)
-        self.velocity_0 = VectorValue(ScalarField(domain=domain_u), ScalarField(domain=domain_v))
-        self.velocity_1 = VectorValue(ScalarField(domain=domain_u), ScalarField(domain=domain_v))
+        self.domain_u = domain_u
+        self.domain_v = domain_v
+        self.domain_p = domain_p
         self.viscosity = viscosity
         self.dt = dt
         
 
-    def __call__(self, u_0, v_0, p_0, u_1, v_1, p_1):
+    def __call__(self, u_0, v_0, p_0, u_1, v_1, p_1, reduction=None, per_channel=False, mask=None, index=None):
         """
         Compute the solution of the transient Navier-Stokes equations with external force.
 
@@ -155,24 +300,64 @@ class TransientNS(FieldOperations):
             u_1 (torch.Tensor): The x-velocity component at time step t+1.
             v_1 (torch.Tensor): The y-velocity component at time step t+1.
             p_1 (torch.Tensor): The pressure component at time step t+1.
+            reduction (str, optional): If given, the residual is reduced to a loss during the evaluation instead of being concatenated.
+                "mse" gives the mean squared residual, "l1" the mean absolute residual and "sum" the sum of squared residuals.
+                Defaults to None, which returns the concatenated residual.
+            per_channel (bool, optional): Whether to return one loss for every residual channel instead of a single loss. Defaults to False.
+            mask (torch.Tensor, optional): A weight field broadcastable to the residual of one channel, e.g., 0 outside the region of interest.
+                The means are then taken over the weights. Defaults to None.
+            index (Sequence[torch.Tensor], optional): The row and column indices `(rows, cols)` of the cells where the residual is evaluated,
+                two integer tensors of shape (N,). The residual then has the shape (B,C,N) and the cost scales with N. Defaults to None, i.e., all cells.
 
         Returns:
-            residual (torch.Tensor): The concatenated tensor of the x-velocity, y-velocity, and divergence components.
+            residual (torch.Tensor): The concatenated tensor of the x-velocity, y-velocity, and divergence components, or the loss if `reduction` is given.
         """
-        self.velocity_0.ux.register_value(u_0)
-        self.velocity_0.uy.register_value(v_0)
-        self.p_0.register_value(p_0)
-        self.velocity_1.ux.register_value(u_1)
-        self.velocity_1.uy.register_value(v_1)
-        self.p_1.register_value(p_1)
-        u_inter = (self.velocity_0 + self.velocity_1) * 0.5
-        transient = (self.velocity_1 - self.velocity_0) / self.dt
-        advection = u_inter @ (self.nabla * u_inter)
-        pressure = self.nabla * ((self.p_0 + self.p_1) * 0.5)
-        vis = -1 * self.viscosity * (self.nabla2 * u_inter)
+        velocity_0 = VectorValue(ScalarField(u_0, self.domain_u), ScalarField(v_0, self.domain_v))
+        velocity_1 = VectorValue(ScalarField(u_1, self.domain_u), ScalarField(v_1, self.domain_v))
+        p_0 = ScalarField(p_0, self.domain_p)
+        p_1 = ScalarField(p_1, self.domain_p)
+        if index is not None:
+            return _reduce_residuals(_transient_ns_sampled(self, velocity_0, velocity_1, p_0, p_1, index), reduction, per_channel, mask, dim=-2)
+        u_inter = (velocity_0 + velocity_1) * 0.5
+        with region("TransientNS.transient"):
+            transient = (velocity_1 - velocity_0) / self.dt
+        with region("TransientNS.advection"):
+            advection = u_inter @ (self.nabla * u_inter)
+        with region("TransientNS.pressure"):
+            pressure = self.nabla * ((p_0 + p_1) * 0.5)
+        with region("TransientNS.viscous"):
+            vis = -1 * self.viscosity * (self.nabla2 * u_inter)
         ns_res = transient + advection + pressure + vis
-        divergence = ((self.nabla @ u_inter) + (self.nabla @ self.velocity_1)) * 0.5
-        return torch.cat([ns_res.ux.value, ns_res.uy.value, divergence.value], dim=-3)
+        with region("TransientNS.divergence"):
+            divergence = ((self.nabla @ u_inter) + (self.nabla @ velocity_1)) * 0.5
+        return _reduce_residuals([ns_res.ux.value, ns_res.uy.value, divergence.value], reduction, per_channel, mask)
+
+    def trajectory(self, u, v, p):
+        """
+        Compute the residuals of all successive frame pairs of a trajectory in one batched pass.
+        The spatial derivatives of every frame are computed only once and shared by the two residuals using the frame.
+
+        Args:
+            u (torch.Tensor): The x-velocity component with shape (B,T,H,W).
+            v (torch.Tensor): The y-velocity component with shape (B,T,H,W).
+            p (torch.Tensor): The pressure component with shape (B,T,H,W).
+
+        Returns:
+            residual (torch.Tensor): The residuals with shape (B,T-1,3,H,W), where `residual[:,t]` equals the result of `__call__` for frames t and t+1.
+        """
+        return _transient_ns_trajectory(self, u, v, p)
+
+    def freeze(self, shape):
+        """
+        Freeze the operation for one field shape into a `torch.compile`-friendly module, see `FrozenTransientNS`.
+
+        Args:
+            shape (Sequence[int]): The shape (H,W) of the fields.
+
+        Returns:
+            module (FrozenTransientNS): The frozen operation.
+        """
+        return FrozenTransientNS(self, shape)
 
 
 class PoissonDivergenceWithForce(FieldOperations):
@@ -208,11 +393,12 @@ class PoissonDivergenceWithForce(FieldOperations):
                  device="cpu", 
                  dtype=torch.float32) -> None:
         super().__init__(order, device=device, dtype=dtype)
-        self.pressure = ScalarField(domain=domain_p)
-        self.velocity = VectorValue(ScalarField(domain=domain_u), ScalarField(domain=domain_v))
+        self.domain_u = domain_u
+        self.domain_v = domain_v
+        self.domain_p = domain_p
         self.force = VectorValue(ScalarField(force_x, domain=domain_force_x),ScalarField(force_y, domain=domain_force_y))
 
-    def __call__(self, u, v, p):
+    def __call__(self, u, v, p, reduction=None, per_channel=False, mask=None, index=None):
         """
         Compute the solution of the Poisson equation for pressure and the divergence of the velocity field.
         
@@ -220,16 +406,45 @@ class PoissonDivergenceWithForce(FieldOperations):
             u (torch.Tensor): The x-velocity component.
             v (torch.Tensor): The y-velocity component.
             p (torch.Tensor): The pressure component.
+            reduction (str, optional): If given, the residual is reduced to a loss during the evaluation instead of being concatenated.
+                "mse" gives the mean squared residual, "l1" the mean absolute residual and "sum" the sum of squared residuals.
+                Defaults to None, which returns the concatenated residual.
+            per_channel (bool, optional): Whether to return one loss for every residual channel instead of a single loss. Defaults to False.
+            mask (torch.Tensor, optional): A weight field broadcastable to the residual of one channel, e.g., 0 outside the region of interest.
+                The means are then taken over the weights. Defaults to None.
+            index (Sequence[torch.Tensor], optional): The row and column indices `(rows, cols)` of the cells where the residual is evaluated,
+                two integer tensors of shape (N,). The residual then has the shape (B,C,N) and the cost scales with N. Defaults to None, i.e., all cells.
         
         Returns:
-            residual (torch.Tensor): The concatenated tensor of the Poisson equation and the divergence components.
+            residual (torch.Tensor): The concatenated tensor of the Poisson equation and the divergence components, or the loss if `reduction` is given.
+        """
+        velocity = VectorValue(ScalarField(u, self.domain_u), ScalarField(v, self.domain_v))
+        pressure = ScalarField(p, self.domain_p)
+        if index is not None:
+            du_dx = self.grad_x.sample(velocity.ux, index)
+            du_dy = self.grad_y.sample(velocity.ux, index)
+            dv_dx = self.grad_x.sample(velocity.uy, index)
+            dv_dy = self.grad_y.sample(velocity.uy, index)
+            poisson = self.nabla2.sample(pressure, index)+du_dx**2+2*du_dy*dv_dx+dv_dy**2-(self.nabla.ux.sample(self.force.ux, index)+self.nabla.uy.sample(self.force.uy, index))
+            divergence = du_dx+dv_dy
+            return _reduce_residuals([poisson, divergence], reduction, per_channel, mask, dim=-2)
+        with region("PoissonDivergenceWithForce.poisson"):
+            poisson = (self.nabla2*pressure)+(self.grad_x*velocity.ux)**2+2*(self.grad_y*velocity.ux)*(self.grad_x*velocity.uy)+(self.grad_y*velocity.uy)**2-self.nabla@self.force
+        with region("PoissonDivergenceWithForce.divergence"):
+            divergence = self.nabla@velocity
+        return _reduce_residuals([poisson.value, divergence.value], reduction, per_channel, mask)
+
+    def freeze(self, shape):
+        """
+        Freeze the operation for one field shape into a `torch.compile`-friendly module, see `FrozenPoissonDivergence`.
+
+        Args:
+            shape (Sequence[int]): The shape (H,W) of the fields.
+
+        Returns:
+            module (FrozenPoissonDivergence): The frozen operation.
         """
-        self.velocity.ux.register_value(u)
-        self.velocity.uy.register_value(v)
-        self.pressure.register_value(p)
-        poisson = (self.nabla2*self.pressure)+(self.grad_x*self.velocity.ux)**2+2*(self.grad_y*self.velocity.ux)*(self.grad_x*self.velocity.uy)+(self.grad_y*self.velocity.uy)**2-self.nabla@self.force
-        divergence = self.nabla@self.velocity
-        return torch.cat([poisson.value, divergence.value], dim=-3)
+        return FrozenPoissonDivergence(self, shape)
 
 
 class PoissonDivergence(FieldOperations):
@@ -256,10 +471,11 @@ class PoissonDivergence(FieldOperations):
                  device="cpu", 
                  dtype=torch.float32) -> None:
         super().__init__(order, device=device, dtype=dtype)
-        self.pressure = ScalarField(domain=domain_p)
-        self.velocity = VectorValue(ScalarField(domain=domain_u), ScalarField(domain=domain_v))
+        self.domain_u = domain_u
+        self.domain_v = domain_v
+        self.domain_p = domain_p
 
-    def __call__(self, u, v, p):
+    def __call__(self, u, v, p, reduction=None, per_channel=False, mask=None, index=None):
         """
         Compute the solution of the Poisson equation for pressure and the divergence of the velocity field.
         
@@ -267,13 +483,42 @@ class PoissonDivergence(FieldOperations):
             u (torch.Tensor): The x-velocity component.
             v (torch.Tensor): The y-velocity component.
             p (torch.Tensor): The pressure component.
+            reduction (str, optional): If given, the residual is reduced to a loss during the evaluation instead of being concatenated.
+                "mse" gives the mean squared residual, "l1" the mean absolute residual and "sum" the sum of squared residuals.
+                Defaults to None, which returns the concatenated residual.
+            per_channel (bool, optional): Whether to return one loss for every residual channel instead of a single loss. Defaults to False.
+            mask (torch.Tensor, optional): A weight field broadcastable to the residual of one channel, e.g., 0 outside the region of interest.
+                The means are then taken over the weights. Defaults to None.
+            index (Sequence[torch.Tensor], optional): The row and column indices `(rows, cols)` of the cells where the residual is evaluated,
+                two integer tensors of shape (N,). The residual then has the shape (B,C,N) and the cost scales with N. Defaults to None, i.e., all cells.
             
         Returns:
-            residual (torch.Tensor): The concatenated tensor of the Poisson equation and the divergence components.
+            residual (torch.Tensor): The concatenated tensor of the Poisson equation and the divergence components, or the loss if `reduction` is given.
+        """
+        velocity = VectorValue(ScalarField(u, self.domain_u), ScalarField(v, self.domain_v))
+        pressure = ScalarField(p, self.domain_p)
+        if index is not None:
+            du_dx = self.grad_x.sample(velocity.ux, index)
+            du_dy = self.grad_y.sample(velocity.ux, index)
+            dv_dx = self.grad_x.sample(velocity.uy, index)
+            dv_dy = self.grad_y.sample(velocity.uy, index)
+            poisson = self.nabla2.sample(pressure, index)+du_dx**2+2*du_dy*dv_dx+dv_dy**2
+            divergence = du_dx+dv_dy
+            return _reduce_residuals([poisson, divergence], reduction, per_channel, mask, dim=-2)
+        with region("PoissonDivergence.poisson"):
+            poisson = (self.nabla2*pressure)+(self.grad_x*velocity.ux)**2+2*(self.grad_y*velocity.ux)*(self.grad_x*velocity.uy)+(self.grad_y*velocity.uy)**2
+        with region("PoissonDivergence.divergence"):
+            divergence = self.nabla@velocity
+        return _reduce_residuals([poisson.value, divergence.value], reduction, per_channel, mask)
+
+    def freeze(self, shape):
+        """
+        Freeze the operation for one field shape into a `torch.compile`-friendly module, see `FrozenPoissonDivergence`.
+
+        Args:
+            shape (Sequence[int]): The shape (H,W) of the fields.
+
+        Returns:
+            module (FrozenPoissonDivergence): The frozen operation.
         """
-        self.velocity.ux.register_value(u)
-        self.velocity.uy.register_value(v)
-        self.pressure.register_value(p)
-        poisson = (self.nabla2*self.pressure)+(self.grad_x*self.velocity.ux)**2+2*(self.grad_y*self.velocity.ux)*(self.grad_x*self.velocity.uy)+(self.grad_y*self.velocity.uy)**2
-        divergence = self.nabla@self.velocity
-        return torch.cat([poisson.value, divergence.value], dim=-3)
\ No newline at end of file
+        return FrozenPoissonDivergence(self, shape)
\ No newline at end of file
@@ -0,0 +1,173 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+from .boundaries import *
+from .domain import *
+import collections
+import numbers
+import threading
+from typing import Optional
+
+class _Unplannable(Exception):
+    pass
+
+def _face_signature(face):
+    values = []
+    for name in ["face_value", "face_gradient"]:
+        if hasattr(face, name):
+            value = getattr(face, name)
+            if not isinstance(value, numbers.Number):
+                # e.g., a tensor boundary value which may require gradients, it is not frozen into a plan.
+                raise _Unplannable()
+            values.append(float(value))
+    return tuple(values)
+
+def domain_signature(domain: Domain) -> tuple:
+    r"""
+    A hashable signature of a domain: the type and values of the boundaries, the grid spacing,
+    and the type, value and shape field tensor (with its version counter) of the obstacles.
+    Two domains with the same signature give the same result for every operator, an in-place update of a shape field changes the signature.
+    Obstacles derived by the domain algebra share the shape field tensor of their operands, so they share the signature as well.
+
+    Args:
+        domain (Domain): The domain.
+
+    Returns:
+        signature (tuple): The signature.
+
+    Raises:
+        _Unplannable: If a boundary value is not a number.
+    """
+    boundaries = tuple((type(boundary), _face_signature(getattr(boundary, "boundary_face", None)))
+                       for boundary in [domain.left_boundary, domain.right_boundary, domain.top_boundary, domain.bottom_boundary])
+    obstacles = tuple((type(obstacle), _face_signature(getattr(obstacle, "boundary_face", None)),
+                       id(obstacle.shape_field.value), obstacle.shape_field.value._version)
+                      for obstacle in domain.obstacles)
+    return (boundaries, float(domain.delta_x), float(domain.delta_y), obstacles)
+
+class _Plan():
+
+    def __init__(self, operator, domain: Domain, module, output_domain: Domain) -> None:
+        # the operator and the obstacles (with their shape fields) are referenced so that the ids in the key are not reused while the plan is cached.
+        self.operator = operator
+        self.obstacles = list(domain.obstacles)
+        self.module = module
+        self.output_domain = output_domain
+
+    def memory(self) -> int:
+        if self.module is None:
+            return 0
+        return sum(buffer.numel()*buffer.element_size() for buffer in self.module.buffers())
+
+class PlanCache():
+    r"""
+    A least-recently-used cache of operator plans.
+
+    A plan is a `FrozenConvOperator` computed once for an operator and a (shape, dtype, device, domain signature):
+    it holds the padding strategy, the precomputed boundary coefficients and obstacle masks, and the scaled kernel.
+    `ConvOperator.__mul__` executes the plan if it exists instead of resolving the domain at every call.
+    Configurations which can not be frozen (e.g., batched obstacles or tensor boundary values) fall back to the regular path.
+
+    Args:
+        max_plans (int, optional): The maximum number of cached plans. Defaults to 256.
+        enabled (bool, optional): Whether the operators use the cache. Defaults to True.
+    """
+
+    def __init__(self, max_plans: int=256, enabled: bool=True) -> None:
+        self.max_plans = max_plans
+        self.enabled = enabled
+        self._plans = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, operator, domain: Domain, value: torch.Tensor):
+        # the version counter of the kernel invalidates the plan if the kernel is modified in place.
+        return (id(operator), operator.kernel._version, tuple(value.shape[-2:]), value.dtype, str(value.device), domain_signature(domain))
+
+    def _build(self, operator, domain: Domain, value: torch.Tensor):
+        from .frozen import FrozenConvOperator
+        output_domain = Domain(
+            boundaries=[PeriodicBoundary() if isinstance(boundary, PeriodicBoundary) else UnConstrainedBoundary()
+                        for boundary in [domain.left_boundary, domain.right_boundary, domain.top_boundary, domain.bottom_boundary]],
+            delta_x=domain.delta_x, delta_y=domain.delta_y, obstacles=[])
+        try:
+            module = FrozenConvOperator(operator, domain, value.shape[-2:])
+        except ValueError:
+            # the regular path handles (or reports) the configuration.
+            module = None
+        return _Plan(operator, domain, module, output_domain)
+
+    def get(self, operator, domain: Domain, value: torch.Tensor):
+        r"""
+        Get the plan of an operator for a field, building it on the first call.
+
+        Args:
+            operator (ConvOperator): The operator.
+            domain (Domain): The domain of the field.
+            value (torch.Tensor): The value of the field with shape (B,1,H,W).
+
+        Returns:
+            plan (Optional[_Plan]): The plan, or None if the configuration can not be planned.
+        """
+        if len(value.shape) != 4:
+            return None
+        try:
+            key = self._key(operator, domain, value)
+        except _Unplannable:
+            return None
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                return plan if plan.module is not None else None
+            self.misses += 1
+        plan = self._build(operator, domain, value)
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+        return plan if plan.module is not None else None
+
+    def plans(self) -> list:
+        r"""
+        List the cached plans, from the least to the most recently used.
+
+        Returns:
+            plans (list): One dict per plan with the keys "direction", "derivative", "shape", "dtype", "device", "domain", "frozen" and "memory" (bytes).
+        """
+        with self._lock:
+            items = list(self._plans.items())
+        return [{"direction": plan.operator.direction,
+                 "derivative": plan.operator.derivative,
+                 "shape": key[2],
+                 "dtype": key[3],
+                 "device": key[4],
+                 "domain": key[5],
+                 "frozen": plan.module is not None,
+                 "memory": plan.memory()} for key, plan in items]
+
+    def memory(self) -> int:
+        r"""
+        Returns:
+            memory (int): The total memory of the buffers of all cached plans in bytes.
+        """
+        with self._lock:
+            return sum(plan.memory() for plan in self._plans.values())
+
+    def clear(self):
+        r"""
+        Remove all plans and reset the hit and miss counters.
+        """
+        with self._lock:
+            self._plans.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._plans)
+
+# the cache used by all operators.
+plan_cache = PlanCache()
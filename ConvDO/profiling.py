@@ -0,0 +1,247 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+import contextlib
+import functools
+import json
+import threading
+import time
+from typing import Optional
+
+_NULL_REGION = contextlib.nullcontext(lambda *args, **kwargs: None)
+
+def _tensor_bytes(result) -> int:
+    if isinstance(result, torch.Tensor):
+        return result.numel()*result.element_size()
+    value = getattr(result, "value", None)
+    if isinstance(value, torch.Tensor):
+        return value.numel()*value.element_size()
+    return 0
+
+def _tensor_numel(result) -> int:
+    if isinstance(result, torch.Tensor):
+        return result.numel()
+    value = getattr(result, "value", None)
+    if isinstance(value, torch.Tensor):
+        return value.numel()
+    return 0
+
+def _operator_flops(args, result) -> int:
+    # one multiply-add for every non-zero weight of the stencil and every output cell.
+    operator = args[0]
+    return 2*int((operator.kernel != 0).sum())*_tensor_numel(result)
+
+def _correction_flops(args, result) -> int:
+    # a correction is an element-wise operation on the padded field.
+    return _tensor_numel(result)
+
+class _Record():
+
+    def __init__(self) -> None:
+        self.bytes = 0
+        self.flops = 0
+
+    def __call__(self, result=None, flops: int=0, bytes: Optional[int]=None):
+        self.bytes += _tensor_bytes(result) if bytes is None else bytes
+        self.flops += flops
+
+class Profiler():
+    r"""
+    Opt-in instrumentation of the operators and the residual operations.
+
+    While the profiler is active, hooks are installed on `ConvOperator.__mul__` and on the `correct_*` methods of the boundaries and obstacles,
+    and the terms of the residual operations (e.g., "TransientNS.advection", "TransientNS.pressure", "TransientNS.viscous" and "TransientNS.divergence") are recorded as regions.
+    Every region records its wall time, its self time (without the nested regions), its number of calls,
+    the bytes of the tensors returned by the instrumented calls and an estimate of their floating point operations.
+    The records are aggregated per call site, i.e., per path of nested regions such as "TransientNS.advection/ConvOperator.x/DirichletBoundary.correct_left".
+    Every region is also a `torch.profiler.record_function` range, so it appears in the traces of `torch.profiler`.
+    The hooks are removed when the profiler stops, so the operators have no overhead when the profiler is inactive.
+
+    Examples:
+        ```python
+        operation = TransientNS(domain_u, domain_v, domain_p, viscosity=0.01, dt=0.01, order=2)
+        with profiler:
+            operation(u_0, v_0, p_0, u_1, v_1, p_1)
+        profiler.save("profile.json")
+        for record in profiler.summary()[:10]:
+            print(record["path"], record["time"], record["calls"])
+        ```
+
+    Args:
+        trace_corrections (bool, optional): Whether to disable the operator plans while profiling, see `PlanCache`.
+            The plans apply the boundary and obstacle corrections as precomputed tensors, so the corrections are only recorded without plans. Defaults to True.
+        synchronize (bool, optional): Whether to synchronize CUDA at the start and the end of every region, so the wall times include the kernels. Defaults to True.
+    """
+
+    def __init__(self, trace_corrections: bool=True, synchronize: bool=True) -> None:
+        self.trace_corrections = trace_corrections
+        self.synchronize = synchronize
+        self.enabled = False
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._hooks = []
+        self._plans_enabled = None
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _sync(self):
+        if self.synchronize and torch.cuda.is_available() and torch.cuda.is_initialized():
+            torch.cuda.synchronize()
+
+    @contextlib.contextmanager
+    def _region(self, name: str):
+        stack = self._stack()
+        path = name if len(stack) == 0 else stack[-1]["path"]+"/"+name
+        frame = {"path": path, "children": 0.0, "bytes": 0, "flops": 0}
+        record = _Record()
+        stack.append(frame)
+        self._sync()
+        start = time.perf_counter()
+        try:
+            with torch.profiler.record_function(name):
+                yield record
+        finally:
+            self._sync()
+            elapsed = time.perf_counter()-start
+            stack.pop()
+            # the bytes and the operations are inclusive, as the time.
+            inclusive_bytes = frame["bytes"]+record.bytes
+            inclusive_flops = frame["flops"]+record.flops
+            if len(stack) > 0:
+                stack[-1]["children"] += elapsed
+                stack[-1]["bytes"] += inclusive_bytes
+                stack[-1]["flops"] += inclusive_flops
+            with self._lock:
+                stats = self._stats.setdefault(path, {"calls": 0, "time": 0.0, "self_time": 0.0, "bytes": 0, "self_bytes": 0, "flops": 0, "self_flops": 0})
+                stats["calls"] += 1
+                stats["time"] += elapsed
+                stats["self_time"] += elapsed-frame["children"]
+                stats["bytes"] += inclusive_bytes
+                stats["self_bytes"] += record.bytes
+                stats["flops"] += inclusive_flops
+                stats["self_flops"] += record.flops
+
+    def region(self, name: str):
+        r"""
+        A context manager recording a region, which does nothing if the profiler is inactive.
+        The context value is a callable `record(result=None, flops=0, bytes=None)` adding the bytes of a result tensor and an operation count to the region.
+
+        Args:
+            name (str): The name of the region.
+        """
+        if not self.enabled:
+            return _NULL_REGION
+        return self._region(name)
+
+    def _hook(self, cls, method: str, name, flops):
+        function = cls.__dict__[method]
+        profiler = self
+        @functools.wraps(function)
+        def hooked(*args, **kwargs):
+            with profiler.region(name(args)) as record:
+                result = function(*args, **kwargs)
+                record(result, flops=flops(args, result))
+            return result
+        setattr(cls, method, hooked)
+        self._hooks.append((cls, method, function))
+
+    def _install(self):
+        from .boundaries import Boundary
+        from .obstacles import Obstacle
+        from .conv_operators import ConvOperator
+        def subclasses(cls):
+            found = [cls]
+            for subclass in cls.__subclasses__():
+                found.extend(subclasses(subclass))
+            return found
+        self._hook(ConvOperator, "__mul__", lambda args: "ConvOperator.{}".format(args[0].direction), _operator_flops)
+        methods = ["correct_left", "correct_right", "correct_top", "correct_bottom"]
+        for cls in subclasses(Boundary):
+            for method in methods:
+                if method in cls.__dict__:
+                    self._hook(cls, method, lambda args, name="{}.{}".format(cls.__name__, method): name, _correction_flops)
+        for cls in subclasses(Obstacle):
+            for method in methods+["fill_internal_field"]:
+                if method in cls.__dict__:
+                    self._hook(cls, method, lambda args, name="{}.{}".format(cls.__name__, method): name, _correction_flops)
+
+    def _remove(self):
+        for cls, method, function in reversed(self._hooks):
+            setattr(cls, method, function)
+        self._hooks = []
+
+    def start(self):
+        r"""
+        Install the hooks and start recording.
+        """
+        if self.enabled:
+            return
+        self._install()
+        if self.trace_corrections:
+            from .plans import plan_cache
+            self._plans_enabled = plan_cache.enabled
+            plan_cache.enabled = False
+        self.enabled = True
+
+    def stop(self):
+        r"""
+        Stop recording and remove the hooks. The records are kept until `reset`.
+        """
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._remove()
+        if self._plans_enabled is not None:
+            from .plans import plan_cache
+            plan_cache.enabled = self._plans_enabled
+            self._plans_enabled = None
+
+    def reset(self):
+        r"""
+        Remove the records.
+        """
+        with self._lock:
+            self._stats = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def summary(self) -> list:
+        r"""
+        Returns:
+            summary (list): One dict per call site with the keys "path", "calls", "time", "self_time" (seconds),
+                "bytes", "self_bytes", "flops" and "self_flops", sorted by decreasing self time.
+        """
+        with self._lock:
+            records = [dict(stats, path=path) for path, stats in self._stats.items()]
+        return sorted(records, key=lambda record: record["self_time"], reverse=True)
+
+    def save(self, path: str):
+        r"""
+        Save the summary as a JSON file.
+
+        Args:
+            path (str): The path of the file.
+        """
+        with open(path, "w") as file:
+            json.dump({"torch": torch.__version__, "records": self.summary()}, file, indent=1)
+
+# the profiler used by the operators and the operations.
+profiler = Profiler()
+
+def region(name: str):
+    r"""
+    Record a region with the shared profiler, see `Profiler.region`.
+
+    Args:
+        name (str): The name of the region.
+    """
+    return profiler.region(name)
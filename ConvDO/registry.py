@@ -0,0 +1,97 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+from .meta_type import *
+from .conv_operators import *
+import threading
+
+def _registry_key(order: int, device, dtype) -> tuple:
+    # "cuda" and "cuda:0" are different keys, as for the plans.
+    return (order, str(torch.device(device)), dtype)
+
+class OperatorRegistry():
+    r"""
+    A process-wide registry of the operators of `FieldOperations`.
+    The operators of one (order, device, dtype) are built once and shared by reference by every operation,
+    so creating many operations, e.g., for different viscosities or domains, does not copy the kernels again.
+    `nabla` shares its components with `grad_x` and `grad_y`, and `nabla2` with `grad2_x` and `grad2_y`.
+    The shared operators must not be modified in place; set `enabled` to False to give every operation its own operators.
+
+    Examples:
+        ```python
+        operations = [TransientNS(domain_u, domain_v, domain_p, viscosity=nu, dt=0.01, order=2) for nu in viscosities]
+        operator_registry.summary() # {"sets": 1, "operators": 4, "kernel_bytes": ...}
+        ```
+
+    Args:
+        enabled (bool, optional): Whether the operations share their operators. Defaults to True.
+    """
+
+    def __init__(self, enabled: bool=True) -> None:
+        self.enabled = enabled
+        self._sets = {}
+        self._lock = threading.RLock()
+
+    def _build(self, order: int, device, dtype) -> dict:
+        grad_x = ConvGrad(order, direction='x', device=device, dtype=dtype)
+        grad_y = ConvGrad(order, direction='y', device=device, dtype=dtype)
+        grad2_x = ConvGrad2(order, direction='x', device=device, dtype=dtype)
+        grad2_y = ConvGrad2(order, direction='y', device=device, dtype=dtype)
+        nabla2 = ConvLaplacian(order, device=device, dtype=dtype)
+        nabla2.op_x = grad2_x
+        nabla2.op_y = grad2_y
+        return {"nabla": VectorValue(grad_x, grad_y), "nabla2": nabla2,
+                "grad_x": grad_x, "grad_y": grad_y, "grad2_x": grad2_x, "grad2_y": grad2_y}
+
+    def get(self, order: int, device="cpu", dtype=torch.float32) -> dict:
+        r"""
+        Get the operators of an order, device and data type, building them on the first call.
+
+        Args:
+            order (int): The order of the schemes.
+            device (str, optional): The device of the kernels. Defaults to "cpu".
+            dtype (torch.dtype, optional): The data type of the kernels. Defaults to torch.float32.
+
+        Returns:
+            operators (dict): The operators "nabla", "nabla2", "grad_x", "grad_y", "grad2_x" and "grad2_y".
+        """
+        if not self.enabled:
+            return self._build(order, device, dtype)
+        key = _registry_key(order, device, dtype)
+        with self._lock:
+            if key not in self._sets:
+                self._sets[key] = self._build(order, device, dtype)
+            return dict(self._sets[key])
+
+    def operators(self) -> list:
+        r"""
+        Returns:
+            operators (list): The distinct `ConvOperator`s of the registry.
+        """
+        with self._lock:
+            operators = {}
+            for operator_set in self._sets.values():
+                for name in ["grad_x", "grad_y", "grad2_x", "grad2_y"]:
+                    operators[id(operator_set[name])] = operator_set[name]
+            return list(operators.values())
+
+    def summary(self) -> dict:
+        r"""
+        Returns:
+            summary (dict): The number of operator sets ("sets"), of distinct operators ("operators") and the bytes of their kernels ("kernel_bytes").
+        """
+        with self._lock:
+            operators = self.operators()
+            return {"sets": len(self._sets),
+                    "operators": len(operators),
+                    "kernel_bytes": sum(operator.kernel.numel()*operator.kernel.element_size() for operator in operators)}
+
+    def clear(self):
+        r"""
+        Forget the operators. The operations which already hold them keep them.
+        """
+        with self._lock:
+            self._sets = {}
+
+# the registry used by `FieldOperations`.
+operator_registry = OperatorRegistry()
@@ -0,0 +1,351 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+from .boundaries import *
+from .domain import *
+from .conv_operators import *
+from .sparse import *
+from typing import Callable, Optional, Sequence
+
+def _batched_dot(a: torch.Tensor, b: torch.Tensor):
+    return (a*b).sum(dim=(-3, -2, -1), keepdim=True)
+
+def _safe_div(a: torch.Tensor, b: torch.Tensor):
+    return a/torch.where(b == 0, torch.ones_like(b), b)
+
+def bicgstab(matvec: Callable, rhs: torch.Tensor, x0: Optional[torch.Tensor]=None,
+             preconditioner: Optional[Callable]=None, tol: float=1e-6, max_iter: int=500):
+    r"""
+    Batched right-preconditioned BiCGStab.
+    Every sample of the batch is iterated until its own relative residual is below `tol`.
+
+    Args:
+        matvec (Callable): The linear operator, mapping a (B,1,H,W) tensor to a (B,1,H,W) tensor.
+        rhs (torch.Tensor): The right hand side with shape (B,1,H,W).
+        x0 (torch.Tensor, optional): The initial guess. Defaults to zeros.
+        preconditioner (Callable, optional): The preconditioner, an approximate inverse of `matvec`. Defaults to the identity.
+        tol (float, optional): The relative tolerance of the residual norm. Defaults to 1e-6.
+        max_iter (int, optional): The maximum number of iterations. Defaults to 500.
+
+    Returns:
+        x (torch.Tensor): The solution with shape (B,1,H,W).
+        num_iterations (int): The number of iterations.
+    """
+    # `default` calls function defaults, so the identity is returned by a factory.
+    preconditioner = default(preconditioner, lambda: (lambda x: x))
+    x = torch.zeros_like(rhs) if x0 is None else x0.clone()
+    r = rhs-matvec(x)
+    r_hat = r.clone()
+    threshold = tol*torch.sqrt(_batched_dot(rhs, rhs))
+    rho = torch.ones_like(threshold)
+    alpha = torch.ones_like(threshold)
+    omega = torch.ones_like(threshold)
+    v = torch.zeros_like(rhs)
+    p = torch.zeros_like(rhs)
+    for iteration in range(max_iter):
+        active = torch.sqrt(_batched_dot(r, r)) > threshold
+        if not active.any():
+            return x, iteration
+        rho_new = _batched_dot(r_hat, r)
+        beta = _safe_div(rho_new, rho)*_safe_div(alpha, omega)
+        p = r+beta*(p-omega*v)
+        p_hat = preconditioner(p)
+        v = matvec(p_hat)
+        alpha = _safe_div(rho_new, _batched_dot(r_hat, v))
+        s = r-alpha*v
+        s_hat = preconditioner(s)
+        t = matvec(s_hat)
+        omega = _safe_div(_batched_dot(t, s), _batched_dot(t, t))
+        x = torch.where(active, x+alpha*p_hat+omega*s_hat, x)
+        r = torch.where(active, s-omega*t, r)
+        rho = rho_new
+    return x, max_iter
+
+def gmres(matvec: Callable, rhs: torch.Tensor, x0: Optional[torch.Tensor]=None,
+          preconditioner: Optional[Callable]=None, tol: float=1e-6, restart: int=30, max_iter: int=100):
+    r"""
+    Batched right-preconditioned restarted GMRES.
+    The dimensions after the first one are the unknowns of one sample, and every sample has its own Krylov basis.
+
+    Args:
+        matvec (Callable): The linear operator, mapping a tensor of the shape of `rhs` to a tensor of the same shape.
+        rhs (torch.Tensor): The right hand side with shape (B,...).
+        x0 (torch.Tensor, optional): The initial guess. Defaults to zeros.
+        preconditioner (Callable, optional): The preconditioner, an approximate inverse of `matvec`. Defaults to the identity.
+        tol (float, optional): The relative tolerance of the residual norm. Defaults to 1e-6.
+        restart (int, optional): The dimension of the Krylov subspace before a restart. Defaults to 30.
+        max_iter (int, optional): The maximum total number of iterations. Defaults to 100.
+
+    Returns:
+        x (torch.Tensor): The solution with the shape of `rhs`.
+        num_iterations (int): The number of iterations.
+    """
+    # `default` calls function defaults, so the identity is returned by a factory.
+    preconditioner = default(preconditioner, lambda: (lambda x: x))
+    batch = rhs.shape[0]
+    def dot(a, b):
+        return (a*b).reshape(batch, -1).sum(dim=-1)
+    def expand(value):
+        return value.reshape(batch, *([1]*(len(rhs.shape)-1)))
+    x = torch.zeros_like(rhs) if x0 is None else x0.clone()
+    threshold = tol*torch.sqrt(dot(rhs, rhs))
+    num_iterations = 0
+    while num_iterations < max_iter:
+        r = rhs-matvec(x)
+        beta = torch.sqrt(dot(r, r))
+        if (beta <= threshold).all():
+            break
+        basis = [r/expand(torch.where(beta == 0, torch.ones_like(beta), beta))]
+        directions = []
+        hessenberg = torch.zeros(batch, restart+1, restart, dtype=rhs.dtype, device=rhs.device)
+        target = torch.zeros(batch, restart+1, dtype=rhs.dtype, device=rhs.device)
+        target[:, 0] = beta
+        for j in range(restart):
+            directions.append(preconditioner(basis[j]))
+            w = matvec(directions[j])
+            # modified Gram-Schmidt
+            for i in range(j+1):
+                hessenberg[:, i, j] = dot(w, basis[i])
+                w = w-expand(hessenberg[:, i, j])*basis[i]
+            hessenberg[:, j+1, j] = torch.sqrt(dot(w, w))
+            basis.append(w/expand(torch.where(hessenberg[:, j+1, j] == 0, torch.ones_like(beta), hessenberg[:, j+1, j])))
+            num_iterations += 1
+            coefficients = (torch.linalg.pinv(hessenberg[:, :j+2, :j+1])@target[:, :j+2, None])[..., 0]
+            residual = torch.linalg.vector_norm((hessenberg[:, :j+2, :j+1]@coefficients[..., None])[..., 0]-target[:, :j+2], dim=-1)
+            if (residual <= threshold).all() or num_iterations >= max_iter:
+                break
+        for i, direction in enumerate(directions):
+            x = x+expand(coefficients[:, i])*direction
+    return x, num_iterations
+
+def _trigonometric_modes(matrix: torch.Tensor):
+    # the cell-centred second order stencil a*[1,-2,1] has a corner entry -3a at a Dirichlet wall (odd ghost) and -a at a Neumann wall (even ghost).
+    # its eigenvectors are cos/sin(pi*m_k*(j+1/2)/N) with m_k=k (Neumann-Neumann, DCT-II), k+1 (Dirichlet-Dirichlet, DST-II) or k+1/2 (mixed, DCT-IV/DST-IV).
+    # returns (m, odd_start) or None if the matrix is not such a stencil, e.g., a high order boundary stencil.
+    length = matrix.shape[0]
+    if length < 2:
+        return None
+    a = matrix[0, 1]
+    expected = a*(torch.diag(torch.full((length,), -2.0, dtype=matrix.dtype, device=matrix.device))
+                  +torch.diag(torch.ones(length-1, dtype=matrix.dtype, device=matrix.device), 1)
+                  +torch.diag(torch.ones(length-1, dtype=matrix.dtype, device=matrix.device), -1))
+    corners = []
+    for index in [0, length-1]:
+        corner = matrix[index, index]-expected[index, index]
+        if torch.isclose(corner, -a, rtol=1e-6):
+            corners.append("odd")
+        elif torch.isclose(corner, a, rtol=1e-6):
+            corners.append("even")
+        else:
+            return None
+        expected[index, index] = matrix[index, index]
+    if a == 0 or not torch.allclose(matrix, expected, rtol=0, atol=1e-6*a.abs().item()):
+        return None
+    shift = {("even", "even"): 0.0, ("odd", "odd"): 1.0}.get(tuple(corners), 0.5)
+    return torch.arange(length, dtype=torch.float64)+shift, corners[0] == "odd"
+
+class _SpectralAxis():
+    # inverts a 1D operator along one axis: with FFT if the axis is periodic (circulant matrix),
+    # with the DST/DCT computed by FFT for the second order stencil at Dirichlet/Neumann walls,
+    # or with the eigenbasis of the symmetric matrix otherwise.
+
+    def __init__(self, matrix: torch.Tensor, periodic: bool, dim: int) -> None:
+        self.periodic = periodic
+        self.dim = dim
+        self.modes = None
+        if periodic:
+            self.eigenvalues = torch.fft.fft(matrix[:, 0].to(torch.complex128 if matrix.dtype == torch.float64 else torch.complex64))
+            return
+        modes = _trigonometric_modes(matrix)
+        if modes is not None:
+            self.modes, self.odd = modes
+            length = matrix.shape[0]
+            angles = math.pi*self.modes/(2*length)
+            self.eigenvalues = (-4*matrix[0, 1].double()*torch.sin(angles)**2).to(device=matrix.device, dtype=matrix.dtype)
+            # the squared norms of the basis vectors, N/2 except for the constant (DCT-II) and alternating (DST-II) modes.
+            norms = torch.full((length,), length/2, dtype=torch.float64)
+            norms[(self.modes == 0) | (self.modes == length)] = length
+            self.norms = norms.to(device=matrix.device)
+            self.twiddle = torch.exp(-1j*angles).to(device=matrix.device)
+            self.half_shift = torch.exp(-1j*math.pi*(self.modes[0]-self.modes[0].floor())*torch.arange(length, dtype=torch.float64)/length).to(device=matrix.device)
+        else:
+            eigenvalues, self.eigenvectors = torch.linalg.eigh(matrix)
+            self.eigenvalues = eigenvalues
+
+    def _trigonometric(self, x: torch.Tensor, inverse: bool):
+        # x_j <-> sum_k c_k cos/sin(pi*m_k*(j+1/2)/N), with an FFT of length 2N along `dim`.
+        if x.is_complex():
+            return torch.complex(self._trigonometric(x.real, inverse), self._trigonometric(x.imag, inverse))
+        x = x.movedim(self.dim, -1)
+        length = x.shape[-1]
+        complex_dtype = torch.complex128 if x.dtype == torch.float64 else torch.complex64
+        frequencies = self.modes.floor().long().to(x.device)
+        if not inverse:
+            transformed = torch.fft.fft(x*self.half_shift.to(complex_dtype), n=2*length, dim=-1)[..., frequencies]*self.twiddle.to(complex_dtype)
+            result = -transformed.imag if self.odd else transformed.real
+        else:
+            coefficients = x/self.norms.to(x.dtype)
+            coefficients = (-1j*coefficients if self.odd else coefficients.to(complex_dtype))*self.twiddle.conj().to(complex_dtype)
+            spectrum = torch.zeros(*x.shape[:-1], 2*length, dtype=complex_dtype, device=x.device)
+            spectrum[..., frequencies] = coefficients
+            result = (torch.fft.ifft(spectrum, dim=-1)[..., :length]*(2*length)*self.half_shift.conj().to(complex_dtype)).real
+        return result.movedim(-1, self.dim)
+
+    def forward(self, x: torch.Tensor):
+        if self.periodic:
+            return torch.fft.fft(x, dim=self.dim)
+        if self.modes is not None:
+            return self._trigonometric(x, inverse=False)
+        basis = self.eigenvectors.to(x.dtype)
+        return x@basis if self.dim == -1 else basis.T@x
+
+    def backward(self, x: torch.Tensor):
+        if self.periodic:
+            return torch.fft.ifft(x, dim=self.dim)
+        if self.modes is not None:
+            return self._trigonometric(x, inverse=True)
+        basis = self.eigenvectors.to(x.dtype)
+        return x@basis.T if self.dim == -1 else basis@x
+
+def _line_matrix(operator: ConvOperator, domain: Domain, length: int):
+    # the operator along one axis is the same for every line if there is no obstacle.
+    line_domain = Domain(boundaries=[domain.left_boundary, domain.right_boundary, domain.top_boundary, domain.bottom_boundary],
+                         obstacles=[], delta_x=domain.delta_x, delta_y=domain.delta_y)
+    shape = (1, length) if operator.direction == "x" else (length, 1)
+    return assemble(operator, line_domain, shape).to_dense()
+
+class PoissonSolver():
+    r"""
+    Solve the Poisson equation $\nabla^2 p = f$ discretized exactly as `ConvLaplacian*ScalarField(p,domain)`,
+    i.e., with the same scheme, boundary conditions and obstacles.
+    With a non-zero `shift` $s$, the Helmholtz equation $\nabla^2 p - s p = f$ is solved instead, e.g., for implicit viscous steps.
+
+    Without obstacles, the Laplacian is separable and the equation is solved directly:
+    with FFT along periodic directions and with the DST/DCT (computed by FFT) along Dirichlet/Neumann directions.
+    With obstacles (or boundaries giving a non-symmetric operator), the equation is solved with a batched BiCGStab preconditioned by the direct solver of the obstacle-free box.
+    The solution is set to zero inside the obstacles.
+    If the operator is singular, e.g., for periodic or pure Neumann domains, the direct solver returns the solution with zero mean.
+
+    Examples:
+        ```python
+        domain = PeriodicDomain(delta_x=2*3.14/64, delta_y=2*3.14/64)
+        solver = PoissonSolver(domain, (64, 64), order=2)
+        p = solver.solve(rhs) # rhs: (B,1,64,64)
+        p = solver.solve(rhs_next, x0=p) # warm start from the previous solution
+        ```
+
+    Args:
+        domain (Domain): The domain of the pressure field.
+        shape (Sequence[int]): The shape (H,W) of the field.
+        order (int, optional): The order of the central Laplacian scheme. Defaults to 2.
+        tol (float, optional): The relative tolerance of the iterative solver. Defaults to 1e-6.
+        max_iter (int, optional): The maximum number of iterations of the iterative solver. Defaults to 500.
+        shift (float, optional): The shift $s$ of the Helmholtz equation. Defaults to 0.
+        device (str, optional): The device to use for computation. Defaults to "cpu".
+        dtype (torch.dtype, optional): The data type to use for computation. Defaults to torch.float32.
+    """
+
+    def __init__(self,
+                 domain: Domain,
+                 shape: Sequence[int],
+                 order: int=2,
+                 tol: float=1e-6,
+                 max_iter: int=500,
+                 shift: float=0.0,
+                 device="cpu",
+                 dtype=torch.float32) -> None:
+        self.domain = domain
+        self.shift = shift
+        self.shape = tuple(shape)
+        self.tol = tol
+        self.max_iter = max_iter
+        self.laplacian = ConvLaplacian(order=order, device=device, dtype=dtype)
+        self.num_iterations = 0
+        height, width = self.shape
+        with torch.no_grad():
+            self.bias = (self.laplacian*ScalarField(torch.zeros(1, 1, height, width, device=device, dtype=dtype), domain=domain)).value
+        self.inside = torch.zeros(1, 1, height, width, device=device, dtype=dtype)
+        for obstacle in domain.obstacles:
+            self.inside = torch.maximum(self.inside, 1-obstacle.shape_field.value.to(device=device, dtype=dtype))
+        # the trivial equations p=0 inside the obstacles are scaled like the Laplacian,
+        # so that the operator preconditioned by the obstacle-free box stays definite.
+        self.inside_scale = -2/domain.delta_x**2-2/domain.delta_y**2-shift
+        self.axes = None
+        try:
+            matrix_x = _line_matrix(self.laplacian.op_x, domain, width)
+            matrix_y = _line_matrix(self.laplacian.op_y, domain, height)
+            periodic_x = isinstance(domain.left_boundary, PeriodicBoundary)
+            periodic_y = isinstance(domain.top_boundary, PeriodicBoundary)
+            for matrix, periodic in [(matrix_x, periodic_x), (matrix_y, periodic_y)]:
+                if not periodic and not torch.allclose(matrix, matrix.T, atol=1e-6*matrix.abs().max().item()):
+                    raise ValueError("The operator is not symmetric.")
+            self.axes = (_SpectralAxis(matrix_x, periodic_x, dim=-1), _SpectralAxis(matrix_y, periodic_y, dim=-2))
+        except ValueError:
+            # e.g., unconstrained boundaries, the iterative solver is used with a Jacobi preconditioner.
+            self.diagonal = self.laplacian.to_sparse(domain, self.shape).diagonal().reshape(1, 1, height, width)-shift*(1-self.inside)+self.inside_scale*self.inside
+        if self.axes is not None:
+            eigenvalues = self.axes[1].eigenvalues[:, None]+self.axes[0].eigenvalues[None, :]-shift
+            magnitude = eigenvalues.abs()
+            zero_mode = magnitude <= 1e-6*magnitude.max()
+            # the direct solver returns the pseudo-inverse, the preconditioner replaces the zero modes by the smallest non-zero one.
+            self.inverse_eigenvalues = torch.where(zero_mode, torch.zeros_like(eigenvalues), 1/torch.where(zero_mode, torch.ones_like(eigenvalues), eigenvalues))
+            smallest = magnitude[~zero_mode].min() if (~zero_mode).any() else torch.ones_like(magnitude.max())
+            self.preconditioner_eigenvalues = torch.where(zero_mode, -1/smallest.to(eigenvalues.dtype), self.inverse_eigenvalues)
+
+    @property
+    def direct(self) -> bool:
+        r"""
+        Whether the equation is solved directly.
+        """
+        return self.axes is not None and len(self.domain.obstacles) == 0
+
+    def _spectral_solve(self, rhs: torch.Tensor, inverse_eigenvalues: torch.Tensor):
+        axis_x, axis_y = self.axes
+        complex_dtype = torch.complex128 if rhs.dtype == torch.float64 else torch.complex64
+        transformed = rhs.to(complex_dtype) if (axis_x.periodic or axis_y.periodic) else rhs
+        transformed = axis_y.forward(axis_x.forward(transformed))
+        transformed = transformed*inverse_eigenvalues.to(transformed.dtype)
+        solution = axis_x.backward(axis_y.backward(transformed))
+        return solution.real if solution.is_complex() else solution
+
+    def _matvec(self, x: torch.Tensor):
+        return (self.laplacian*ScalarField(x, domain=self.domain)).value-self.bias-self.shift*(1-self.inside)*x+self.inside_scale*self.inside*x
+
+    def _preconditioner(self, x: torch.Tensor):
+        if self.axes is not None:
+            # the box solver acts on the fluid cells only, the cells inside the obstacles are inverted exactly.
+            fluid = 1-self.inside
+            return fluid*self._spectral_solve(fluid*x, self.preconditioner_eigenvalues)+self.inside*x/self.inside_scale
+        return x/torch.where(self.diagonal == 0, torch.ones_like(self.diagonal), self.diagonal)
+
+    def solve(self, rhs: torch.Tensor, x0: Optional[torch.Tensor]=None, homogeneous: bool=False) -> torch.Tensor:
+        r"""
+        Solve $\nabla^2 p = f$.
+
+        Args:
+            rhs (torch.Tensor): The right hand side $f$ with shape (H,W) or (B,1,H,W).
+            x0 (torch.Tensor, optional): The initial guess of the iterative solver, e.g., the solution of the previous time step.
+                Ignored by the direct solver. Defaults to None.
+            homogeneous (bool, optional): Whether to solve with homogeneous boundary conditions, i.e., to invert only the linear part of the Laplacian,
+                e.g., for pressure corrections and preconditioners. Defaults to False.
+
+        Returns:
+            p (torch.Tensor): The solution with shape (B,1,H,W).
+        """
+        if len(rhs.shape) == 2:
+            rhs = rhs.unsqueeze(0).unsqueeze(0)
+        # the boundary conditions contribute an affine bias to the discrete Laplacian.
+        if not homogeneous:
+            rhs = rhs-self.bias
+        rhs = rhs*(1-self.inside)
+        if self.direct:
+            self.num_iterations = 0
+            return self._spectral_solve(rhs, self.inverse_eigenvalues)
+        if x0 is not None and len(x0.shape) == 2:
+            x0 = x0.unsqueeze(0).unsqueeze(0)
+        solution, self.num_iterations = bicgstab(self._matvec, rhs, x0=x0, preconditioner=self._preconditioner,
+                                                 tol=self.tol, max_iter=self.max_iter)
+        return solution
+
+    def __call__(self, rhs: torch.Tensor, x0: Optional[torch.Tensor]=None, homogeneous: bool=False) -> torch.Tensor:
+        return self.solve(rhs, x0=x0, homogeneous=homogeneous)
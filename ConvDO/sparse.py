@@ -0,0 +1,250 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+from .boundaries import *
+from .domain import *
+from .cache import *
+import copy
+import weakref
+from typing import Optional, Sequence
+
+class SparseOperator():
+    r"""
+    A convolutional operator assembled for a given domain and field shape.
+    The operator is affine in the flattened field $f$: $\mathrm{op}(f) = A f + b$,
+    where $A$ is a sparse matrix and $b$ the bias due to the (inhomogeneous) boundary conditions.
+
+    Args:
+        matrix (torch.Tensor): The sparse matrix $A$ with shape (H*W,H*W), in COO or CSR layout.
+        bias (torch.Tensor): The bias $b$ with shape (H*W,).
+        shape (Sequence[int]): The shape (H,W) of the field.
+    """
+
+    def __init__(self, matrix: torch.Tensor, bias: torch.Tensor, shape: Sequence[int]) -> None:
+        self.matrix = matrix
+        self.bias = bias
+        self.shape = tuple(shape)
+
+    def __call__(self, value: torch.Tensor) -> torch.Tensor:
+        r"""
+        Apply the assembled operator with `torch.sparse` matrix products.
+
+        Args:
+            value (torch.Tensor): The field with shape (H,W) or (B,1,H,W).
+
+        Returns:
+            operated (torch.Tensor): The operated field with shape (B,1,H,W).
+        """
+        if len(value.shape) == 2:
+            value = value.unsqueeze(0).unsqueeze(0)
+        flat = value.reshape(value.shape[0], -1)
+        operated = (self.matrix @ flat.T).T+self.bias
+        return operated.reshape(value.shape[0], 1, *self.shape)
+
+    def __add__(self, other):
+        if isinstance(other, SparseOperator):
+            matrix = (self.matrix.to_sparse_coo()+other.matrix.to_sparse_coo()).coalesce()
+            if self.matrix.layout == torch.sparse_csr:
+                matrix = matrix.to_sparse_csr()
+            return SparseOperator(matrix, self.bias+other.bias, self.shape)
+        return NotImplemented
+
+    def diagonal(self) -> torch.Tensor:
+        r"""
+        Returns:
+            diagonal (torch.Tensor): The diagonal of $A$ with shape (H*W,).
+        """
+        matrix = self.matrix.to_sparse_coo().coalesce()
+        indices = matrix.indices()
+        on_diagonal = indices[0] == indices[1]
+        diagonal = torch.zeros(matrix.shape[0], dtype=matrix.dtype, device=matrix.device)
+        diagonal[indices[0][on_diagonal]] = matrix.values()[on_diagonal]
+        return diagonal
+
+    def to_dense(self) -> torch.Tensor:
+        r"""
+        Returns:
+            matrix (torch.Tensor): $A$ as a dense matrix with shape (H*W,H*W).
+        """
+        return self.matrix.to_dense()
+
+    def to_scipy(self):
+        r"""
+        Convert $A$ to a `scipy.sparse.csr_matrix`. Requires scipy.
+
+        Returns:
+            matrix (scipy.sparse.csr_matrix): The matrix $A$.
+            bias (np.ndarray): The bias $b$.
+        """
+        try:
+            import scipy.sparse
+        except ImportError:
+            raise ImportError("scipy is required to export the operator as a scipy matrix.")
+        matrix = self.matrix.to_sparse_coo().coalesce().cpu()
+        indices = matrix.indices().numpy()
+        return (scipy.sparse.coo_matrix((matrix.values().numpy(), (indices[0], indices[1])), shape=tuple(matrix.shape)).tocsr(),
+                self.bias.cpu().numpy())
+
+# assembled operators are cached on the operator for every domain (weakly) and field shape.
+_assembled_operators = weakref.WeakKeyDictionary()
+
+def _num_colors(reach: int, length: int, periodic: bool):
+    colors = 2*reach+1
+    if colors >= length:
+        return length
+    if periodic:
+        # on a periodic axis the colors have to wrap around consistently.
+        while length % colors != 0:
+            colors += 1
+    return colors
+
+def _probe_direction(operator, domain: Domain, shape: Sequence[int], dtype, device):
+    from .conv_operators import ScalarField
+    height, width = shape
+    if operator.direction == "x":
+        length = width
+        periodic = isinstance(domain.left_boundary, PeriodicBoundary)
+    else:
+        length = height
+        periodic = isinstance(domain.top_boundary, PeriodicBoundary)
+    # an output cell depends on the cells within the stencil, and the boundary and obstacle corrections
+    # extrapolate from at most two more cells.
+    reach = operator.pad+2
+    n_colors = _num_colors(reach, length, periodic)
+    positions = torch.arange(length, device=device)
+    colors = torch.arange(n_colors, device=device)
+    combs = (positions[None, :] % n_colors == colors[:, None]).to(dtype)
+    if operator.direction == "x":
+        combs = combs[:, None, None, :].expand(n_colors, 1, height, width)
+    else:
+        combs = combs[:, None, :, None].expand(n_colors, 1, height, width)
+    probes = torch.cat([torch.zeros(1, 1, height, width, dtype=dtype, device=device), combs], dim=0)
+    with torch.no_grad():
+        responses = (operator*ScalarField(probes, domain=domain)).value[:, 0]
+    bias = responses[0]
+    return responses[1:]-bias, bias, n_colors, length, periodic
+
+def _diagonal_direction(operator, domain: Domain, shape: Sequence[int], dtype, device):
+    responses, _, n_colors, _, _ = _probe_direction(operator, domain, shape, dtype, device)
+    height, width = shape
+    if operator.direction == "x":
+        colors = (torch.arange(width, device=device) % n_colors)[None, None, :].expand(1, height, width)
+    else:
+        colors = (torch.arange(height, device=device) % n_colors)[None, :, None].expand(1, height, width)
+    # every cell is probed by the comb of its own color.
+    return torch.gather(responses, 0, colors)[0]
+
+def _assemble_direction(operator, domain: Domain, shape: Sequence[int], dtype, device):
+    responses, bias, n_colors, length, periodic = _probe_direction(operator, domain, shape, dtype, device)
+    height, width = shape
+    rows = torch.arange(height, device=device)[:, None].expand(height, width)
+    cols = torch.arange(width, device=device)[None, :].expand(height, width)
+    out_positions = cols if operator.direction == "x" else rows
+    all_rows = []
+    all_cols = []
+    all_values = []
+    for color in range(n_colors):
+        if n_colors == length:
+            in_positions = torch.full_like(out_positions, color)
+        else:
+            half = n_colors//2
+            in_positions = out_positions+torch.remainder(color-out_positions+half, n_colors)-half
+            if periodic:
+                in_positions = torch.remainder(in_positions, length)
+        values = responses[color]
+        valid = (in_positions >= 0) & (in_positions < length) & (values != 0)
+        if operator.direction == "x":
+            in_index = rows*width+in_positions
+        else:
+            in_index = in_positions*width+cols
+        all_rows.append((rows*width+cols)[valid])
+        all_cols.append(in_index[valid])
+        all_values.append(values[valid])
+    matrix = torch.sparse_coo_tensor(
+        torch.stack([torch.cat(all_rows), torch.cat(all_cols)]),
+        torch.cat(all_values),
+        (height*width, height*width)).coalesce()
+    return matrix, bias.reshape(-1)
+
+def _probed_operator(operator, dtype, device):
+    # the operator is probed with fields of `dtype` on `device`, so the kernel is cast as well.
+    if operator.kernel.dtype == dtype and operator.kernel.device == torch.device(device):
+        return operator
+    probed = copy.copy(operator)
+    probed.kernel = operator.kernel.to(dtype=dtype, device=device)
+    return probed
+
+def _assemble_artifact(operator, domain: Domain, shape: Sequence[int], dtype, device) -> dict:
+    matrix, bias = _assemble_direction(operator, domain, shape, dtype, device)
+    return {"indices": matrix.indices(), "values": matrix.values(), "bias": bias}
+
+def assemble(operator, domain: Domain, shape: Sequence[int], layout: str="csr", dtype=None, device=None) -> SparseOperator:
+    r"""
+    Assemble a `ConvOperator` or a `ConvLaplacian` as a sparse matrix with an affine bias for a given domain and field shape.
+
+    The operator is probed with a few comb fields, so the assembled matrix contains exactly the boundary and obstacle corrections applied by the operator.
+    The result is cached for every (domain, shape) pair, and on disk if the artifact cache is enabled, see `ArtifactCache`.
+
+    Examples:
+        ```python
+        nabla2 = ConvLaplacian(order=2)
+        sparse_nabla2 = assemble(nabla2, domain, (64, 64))
+        sparse_nabla2(p) # equals (nabla2*ScalarField(p, domain)).value
+        ```
+
+    Args:
+        operator (Union[ConvOperator,ConvLaplacian]): The operator.
+        domain (Domain): The domain of the field.
+        shape (Sequence[int]): The shape (H,W) of the field.
+        layout (str, optional): The layout of the sparse matrix, "csr" or "coo". Defaults to "csr".
+        dtype (torch.dtype, optional): The data type of the matrix, the kernel is cast to it for the probing. Defaults to the data type of the operator.
+        device (str, optional): The device of the matrix. Defaults to the device of the operator.
+
+    Returns:
+        SparseOperator (SparseOperator): The assembled operator.
+    """
+    if layout not in ["csr", "coo"]:
+        raise ValueError("layout need to be 'csr' or 'coo', got '{}'".format(layout))
+    kernel = operator.op_x.kernel if hasattr(operator, "op_x") else operator.kernel
+    dtype = default(dtype, kernel.dtype)
+    device = default(device, kernel.device)
+    key = (id(operator), tuple(shape), layout, dtype, str(device))
+    cached = _assembled_operators.setdefault(domain, {})
+    if key in cached:
+        return cached[key][1]
+    if hasattr(operator, "op_x"):
+        # the sum is cached under the key of the Laplacian, the directions under their own keys.
+        assembled = assemble(operator.op_x, domain, shape, layout, dtype, device)+assemble(operator.op_y, domain, shape, layout, dtype, device)
+    else:
+        probed = _probed_operator(operator, dtype, device)
+        # loaded from the disk cache if enabled, see `ArtifactCache`.
+        artifact_name = artifact_key("sparse_operator", probed.kernel, operator.direction, operator.derivative, domain, list(shape), str(dtype)) if artifact_cache.enabled else None
+        artifact = artifact_cache.cached(artifact_name, lambda: _assemble_artifact(probed, domain, shape, dtype, device), device=device)
+        matrix = torch.sparse_coo_tensor(artifact["indices"], artifact["values"], (shape[0]*shape[1], shape[0]*shape[1])).coalesce()
+        if layout == "csr":
+            matrix = matrix.to_sparse_csr()
+        assembled = SparseOperator(matrix, artifact["bias"], shape)
+    # the operator is kept alive with the entry, so its id can not be reused.
+    cached[key] = (operator, assembled)
+    return assembled
+
+def assemble_diagonal(operator, domain: Domain, shape: Sequence[int], dtype=None, device=None) -> torch.Tensor:
+    r"""
+    The diagonal of the matrix of a `ConvOperator` or a `ConvLaplacian`, see `assemble`.
+    Only the probing is done, the sparse matrix is not built.
+
+    Args:
+        operator (Union[ConvOperator,ConvLaplacian]): The operator.
+        domain (Domain): The domain of the field.
+        shape (Sequence[int]): The shape (H,W) of the field.
+        dtype (torch.dtype, optional): The data type of the diagonal. Defaults to the data type of the operator.
+        device (str, optional): The device of the diagonal. Defaults to the device of the operator.
+
+    Returns:
+        diagonal (torch.Tensor): The diagonal with shape (H,W).
+    """
+    if hasattr(operator, "op_x"):
+        return assemble_diagonal(operator.op_x, domain, shape, dtype, device)+assemble_diagonal(operator.op_y, domain, shape, dtype, device)
+    dtype = default(dtype, operator.kernel.dtype)
+    device = default(device, operator.kernel.device)
+    return _diagonal_direction(_probed_operator(operator, dtype, device), domain, shape, dtype, device)
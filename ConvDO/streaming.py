@@ -0,0 +1,139 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+from .helpers import *
+import numpy as np
+import os
+import queue
+import threading
+from typing import Optional, Sequence, Union
+
+def load_trajectory(path: str):
+    r"""
+    Open a trajectory file without reading it into memory.
+    `.npy` files are memory-mapped with numpy and `.pt` files are memory-mapped with `torch.load(..., mmap=True)`.
+
+    Args:
+        path (str): The path of the `.npy` or `.pt` file.
+
+    Returns:
+        trajectory (Union[np.ndarray,torch.Tensor]): The memory-mapped array.
+    """
+    extension = os.path.splitext(path)[1]
+    if extension == ".npy":
+        return np.load(path, mmap_mode="r")
+    elif extension == ".pt":
+        return torch.load(path, map_location="cpu", mmap=True)
+    else:
+        raise ValueError("Only '.npy' and '.pt' files are supported, got '{}'".format(extension))
+
+class TrajectoryStream():
+    r"""
+    Stream the (u0,v0,p0,u1,v1,p1) windows of a trajectory in batches.
+
+    The trajectory is stored as an array of shape (T,C,H,W) where T is the number of frames and C the number of channels.
+    Only the frames of the next batches are read from the memory-mapped file, so the memory use does not depend on the length of the trajectory.
+    The batches are read by a background thread and up to `prefetch` batches are kept ready.
+
+    Examples:
+        ```python
+        stream = TrajectoryStream("trajectory.npy", batch_size=8)
+        operator = TransientNS(domain_u, domain_v, domain_p, viscosity=0.01, dt=0.1, order=2)
+        for window in stream:
+            residual = operator(*window)
+        ```
+
+    Args:
+        source (Union[str,np.ndarray,torch.Tensor]): The path of the trajectory file or an (optionally memory-mapped) array of shape (T,C,H,W).
+            A single frame of shape (C,H,W) is rejected, a trajectory needs at least two frames for one window.
+        batch_size (int, optional): The number of windows in one batch. Defaults to 1.
+        stride (int, optional): The number of frames between the first frames of two successive windows. Defaults to 1.
+        channels (Sequence[int], optional): The channel indices of u, v and p. Defaults to (0,1,2).
+        prefetch (int, optional): The number of batches read ahead. Defaults to 2.
+        device (str, optional): The device of the yielded tensors. Defaults to "cpu".
+        dtype (torch.dtype, optional): The data type of the yielded tensors. Defaults to torch.float32.
+    """
+
+    def __init__(self,
+                 source: Union[str,np.ndarray,torch.Tensor],
+                 batch_size: int=1,
+                 stride: int=1,
+                 channels: Sequence[int]=(0,1,2),
+                 prefetch: int=2,
+                 device="cpu",
+                 dtype=torch.float32) -> None:
+        if isinstance(source, str):
+            source = load_trajectory(source)
+        if len(source.shape) == 3:
+            raise ValueError("The trajectory need to have the shape (T,C,H,W), got {} which is a single (C,H,W) frame; "
+                             "stack at least two frames along a new first dimension.".format(tuple(source.shape)))
+        if len(source.shape) != 4:
+            raise ValueError("The trajectory need to have the shape (T,C,H,W), got {}".format(tuple(source.shape)))
+        if len(channels) != 3:
+            raise ValueError("channels need to give the indices of u, v and p.")
+        if batch_size < 1:
+            raise ValueError("batch_size need to be at least 1, got {}".format(batch_size))
+        if stride < 1:
+            raise ValueError("stride need to be at least 1, got {}".format(stride))
+        self.trajectory = source
+        self.batch_size = batch_size
+        self.stride = stride
+        self.channels = list(channels)
+        self.prefetch = prefetch
+        self.device = device
+        self.dtype = dtype
+        self.num_windows = max(0, (source.shape[0]-2)//stride+1)
+
+    def __len__(self):
+        return (self.num_windows+self.batch_size-1)//self.batch_size
+
+    def _read_batch(self, first_window: int):
+        starts = [t*self.stride for t in range(first_window, min(first_window+self.batch_size, self.num_windows))]
+        if self.stride == 1:
+            frames = self.trajectory[starts[0]:starts[-1]+2]
+            index_0 = list(range(len(starts)))
+        else:
+            # windows do not overlap, only the frames used by this batch are read.
+            frames = self.trajectory[sum([[t, t+1] for t in starts], [])]
+            index_0 = list(range(0, 2*len(starts), 2))
+        # indexing the channels copies the frames out of the memory map.
+        frames = torch.as_tensor(frames[:, self.channels]).to(device=self.device, dtype=self.dtype)
+        frames_0 = frames[index_0].unsqueeze(2)
+        frames_1 = frames[[i+1 for i in index_0]].unsqueeze(2)
+        return (frames_0[:, 0], frames_0[:, 1], frames_0[:, 2],
+                frames_1[:, 0], frames_1[:, 1], frames_1[:, 2])
+
+    def _put(self, buffer: queue.Queue, item, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _produce(self, buffer: queue.Queue, stop: threading.Event):
+        try:
+            for first_window in range(0, self.num_windows, self.batch_size):
+                if stop.is_set():
+                    return
+                self._put(buffer, self._read_batch(first_window), stop)
+        except Exception as e:
+            self._put(buffer, e, stop)
+            return
+        self._put(buffer, None, stop)
+
+    def __iter__(self):
+        buffer = queue.Queue(maxsize=max(1, self.prefetch))
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(buffer, stop), daemon=True)
+        producer.start()
+        try:
+            while True:
+                batch = buffer.get()
+                if batch is None:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                yield batch
+        finally:
+            stop.set()
+            producer.join()
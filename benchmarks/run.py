@@ -0,0 +1,275 @@
+#usr/bin/python3
+# -*- coding: UTF-8 -*-
+r"""
+Benchmarks of the ConvDO operators and operations.
+
+Run the benchmarks and save the results:
+    python benchmarks/run.py run --preset quick --output results.json
+Measure the import time of the package in fresh interpreters:
+    python benchmarks/run.py import --output import.json
+Compare the results against a baseline, returning a non-zero exit code if a case is slower than the threshold:
+    python benchmarks/run.py compare baseline.json results.json --threshold 0.1
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+import torch
+import torch.utils.benchmark as benchmark
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ConvDO import *
+
+PRESETS = {
+    "quick": {"sizes": [64, 256], "batch_sizes": [1], "threads": [torch.get_num_threads()]},
+    "default": {"sizes": [64, 256, 1024], "batch_sizes": [1, 8], "threads": [1, torch.get_num_threads()]},
+    "full": {"sizes": [64, 256, 1024, 4096], "batch_sizes": [1, 8, 32], "threads": [1, 4, torch.get_num_threads()]},
+}
+
+OPERATORS = ["ConvGrad", "ConvGrad2", "ConvLaplacian", "ConvNabla"]
+OPERATIONS = ["TransientNS", "TransientNSWithForce", "PoissonDivergence", "PoissonDivergenceWithForce"]
+BOUNDARIES = ["periodic", "dirichlet", "neumann"]
+
+def _boundary(kind: str):
+    if kind == "periodic":
+        return PeriodicBoundary()
+    if kind == "dirichlet":
+        return DirichletBoundary(0.0)
+    return NeumannBoundary(0.0)
+
+def _domain(kind: str, size: int, num_obstacles: int, dtype, device):
+    obstacles = []
+    for i in range(num_obstacles):
+        # circles on the diagonal, away from the boundaries.
+        center = size*(i+1)/(num_obstacles+1)
+        shape_field = generate_circle_2D(center, center, size/(4*(num_obstacles+1)), size, size)
+        obstacles.append(DirichletObstacle(shape_field.to(dtype=dtype, device=device), 0.0))
+    return Domain([_boundary(kind) for _ in range(4)], obstacles=obstacles, delta_x=1/size, delta_y=1/size)
+
+def _supported(name: str, order: int, boundary: str, num_obstacles: int) -> bool:
+    # the high order schemes only support periodic boundaries without obstacles,
+    # and the forces of the operations are defined on an unconstrained domain.
+    if order != 2 and (boundary != "periodic" or num_obstacles > 0 or name.endswith("WithForce")):
+        return False
+    # the products of the transient operations need the same obstacles on both factors, which the derivatives do not keep,
+    # and the Neumann boundaries can not be scaled.
+    if name.startswith("TransientNS") and (boundary == "neumann" or num_obstacles > 0):
+        return False
+    return True
+
+def _out_of_memory(error: BaseException) -> bool:
+    return (isinstance(error, (MemoryError, torch.cuda.OutOfMemoryError))
+            or "out of memory" in str(error) or "can't allocate memory" in str(error))
+
+def _operator_case(name, order, field, domain, dtype, device):
+    if name == "ConvGrad":
+        operator = ConvGrad(order, "x", device=device, dtype=dtype)
+        return lambda: (operator*ScalarField(field, domain)).value
+    if name == "ConvGrad2":
+        operator = ConvGrad2(order, "x", device=device, dtype=dtype)
+        return lambda: (operator*ScalarField(field, domain)).value
+    if name == "ConvLaplacian":
+        operator = ConvLaplacian(order, device=device, dtype=dtype)
+        return lambda: (operator*ScalarField(field, domain)).value
+    operator = ConvNabla(order, device=device, dtype=dtype)
+    def gradient():
+        result = operator*ScalarField(field, domain)
+        return result.ux.value+result.uy.value
+    return gradient
+
+def _operation_case(name, order, fields, domain, dtype, device):
+    force = torch.ones_like(fields[0])
+    force_domain = UnconstrainedDomain()
+    if name == "TransientNS":
+        operation = TransientNS(domain, domain, domain, viscosity=0.01, dt=0.01, order=order, device=device, dtype=dtype)
+        return lambda: operation(*fields)
+    if name == "TransientNSWithForce":
+        operation = TransientNSWithForce(domain, domain, domain, force, force, force_domain, force_domain,
+                                         viscosity=0.01, dt=0.01, order=order, device=device, dtype=dtype)
+        return lambda: operation(*fields)
+    if name == "PoissonDivergence":
+        operation = PoissonDivergence(domain, domain, domain, order=order, device=device, dtype=dtype)
+        return lambda: operation(*fields[:3])
+    operation = PoissonDivergenceWithForce(domain, domain, domain, force, force, force_domain, force_domain,
+                                           order=order, device=device, dtype=dtype)
+    return lambda: operation(*fields[:3])
+
+def _cases(args):
+    dtype = getattr(torch, args.dtype)
+    for size, batch, order, boundary, num_obstacles, name, mode in itertools.product(
+            args.sizes, args.batch_sizes, args.orders, args.boundaries, args.obstacles, args.names, args.modes):
+        if not _supported(name, order, boundary, num_obstacles):
+            continue
+        params = {"name": name, "size": size, "batch": batch, "order": order, "boundary": boundary,
+                  "obstacles": num_obstacles, "mode": mode, "dtype": args.dtype, "device": args.device}
+        yield params, (lambda size=size, batch=batch, order=order, boundary=boundary, num_obstacles=num_obstacles, name=name, mode=mode:
+                       _build(name, size, batch, order, boundary, num_obstacles, mode, dtype, args.device))
+
+def _build(name, size, batch, order, boundary, num_obstacles, mode, dtype, device):
+    domain = _domain(boundary, size, num_obstacles, dtype, device)
+    if name in OPERATORS:
+        inputs = [torch.rand(batch, 1, size, size, dtype=dtype, device=device, requires_grad=(mode == "backward"))]
+        function = _operator_case(name, order, inputs[0], domain, dtype, device)
+    else:
+        inputs = [torch.rand(batch, 1, size, size, dtype=dtype, device=device, requires_grad=(mode == "backward")) for _ in range(6)]
+        function = _operation_case(name, order, inputs, domain, dtype, device)
+    if mode == "forward":
+        def forward():
+            with torch.no_grad():
+                return function()
+        return forward
+    def backward():
+        for value in inputs:
+            value.grad = None
+        function().sum().backward()
+    return backward
+
+# the statements of the import benchmark, each timed in a fresh interpreter.
+IMPORTS = {
+    "import ConvDO": "import ConvDO",
+    "import operators": "from ConvDO import ConvGrad, ScalarField, Domain, DirichletBoundary",
+    "import operations": "from ConvDO import TransientNS",
+    "import all": "from ConvDO import *",
+}
+
+_MEASUREMENTS = ["median", "iqr", "runs", "error"]
+
+def _metadata(device: str="cpu"):
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "torch": torch.__version__,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cuda": torch.cuda.get_device_name() if device.startswith("cuda") else None,
+    }
+
+def _save(results, path: str, device: str="cpu", skipped=()):
+    with open(path, "w") as file:
+        json.dump({"metadata": _metadata(device), "results": results, "skipped": list(skipped)}, file, indent=1)
+    print("saved {} results to {}".format(len(results), path))
+
+def _import_time(statement: str) -> float:
+    # the time of the statement after torch is imported, as every statement needs torch.
+    code = ("import time, torch\n"
+            "start = time.perf_counter()\n"
+            "{}\n"
+            "print(time.perf_counter()-start)").format(statement)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def run_import(args):
+    results = []
+    for name, statement in IMPORTS.items():
+        times = sorted(_import_time(statement) for _ in range(args.repeats))
+        quartiles = statistics.quantiles(times, n=4) if len(times) > 1 else [times[0]]*3
+        result = {"name": name, "median": statistics.median(times), "iqr": quartiles[2]-quartiles[0], "runs": len(times)}
+        results.append(result)
+        print("{:>28} {:.3e} s".format(name, result["median"]))
+    _save(results, args.output)
+
+def run(args):
+    results = []
+    skipped = []
+    for params, build in _cases(args):
+        for threads in args.threads:
+            try:
+                function = build()
+                # the first call builds the operator plans.
+                function()
+                measurement = benchmark.Timer(stmt="function()", globals={"function": function}, num_threads=threads,
+                                              label=params["name"], sub_label=str(params)).blocked_autorange(min_run_time=args.min_run_time)
+            except (RuntimeError, MemoryError) as error:
+                # the unsupported configurations are filtered by `_supported`, only the cases which do not fit in memory are skipped.
+                if not _out_of_memory(error):
+                    raise
+                skipped.append(dict(params, threads=threads, error="{}: {}".format(type(error).__name__, error)))
+                print("skipped {} ({})".format(params, error))
+                continue
+            result = dict(params, threads=threads, median=measurement.median, iqr=measurement.iqr, runs=len(measurement.times))
+            results.append(result)
+            print("{name:>28} size={size:<5} batch={batch:<3} order={order} {boundary:>9} obstacles={obstacles} {mode:>8} threads={threads:<3} {median:.3e} s".format(**result))
+    if len(skipped) > 0:
+        print("{} cases skipped:".format(len(skipped)))
+        for case in skipped:
+            print("  {} {}".format(_case_name(case), case["error"]))
+    _save(results, args.output, args.device, skipped=skipped)
+
+def _case_key(result):
+    return tuple(sorted((key, value) for key, value in result.items() if key not in _MEASUREMENTS))
+
+def _case_name(result):
+    return " ".join([result["name"]]+["{}={}".format(key, value) for key, value in result.items() if key not in _MEASUREMENTS+["name"]])
+
+def compare(args):
+    with open(args.baseline, "r") as file:
+        baseline = {_case_key(result): result for result in json.load(file)["results"]}
+    with open(args.results, "r") as file:
+        content = json.load(file)
+    results = content["results"]
+    for case in content.get("skipped", []):
+        print("{} skipped ({})".format(_case_name(case), case["error"]))
+    regressions = 0
+    for result in results:
+        reference = baseline.get(_case_key(result))
+        if reference is None:
+            continue
+        ratio = result["median"]/reference["median"]
+        # a change within the interquartile ranges of both measurements is noise.
+        noise = (result["iqr"]+reference["iqr"])/reference["median"]
+        status = ""
+        if ratio > 1+max(args.threshold, noise):
+            status = "REGRESSION"
+            regressions += 1
+        elif ratio < 1-max(args.threshold, noise):
+            status = "improvement"
+        print("{} {:.3e} s -> {:.3e} s ({:+.1%}) {}".format(_case_name(result), reference["median"], result["median"], ratio-1, status))
+    print("{} regressions".format(regressions))
+    return 1 if regressions > 0 else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the ConvDO operators and operations.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    parser_run = subparsers.add_parser("run", help="run the benchmarks")
+    parser_run.add_argument("--preset", choices=list(PRESETS.keys()), default="quick",
+                            help="the default sizes, batch sizes and thread counts")
+    parser_run.add_argument("--sizes", type=int, nargs="+", help="the grid sizes, e.g., 64 256 1024 4096")
+    parser_run.add_argument("--batch-sizes", type=int, nargs="+", help="the batch sizes")
+    parser_run.add_argument("--threads", type=int, nargs="+", help="the CPU thread counts")
+    parser_run.add_argument("--orders", type=int, nargs="+", default=[2, 4, 6, 8])
+    parser_run.add_argument("--boundaries", nargs="+", choices=BOUNDARIES, default=BOUNDARIES)
+    parser_run.add_argument("--obstacles", type=int, nargs="+", default=[0, 1, 2], help="the numbers of obstacles")
+    parser_run.add_argument("--names", nargs="+", choices=OPERATORS+OPERATIONS, default=OPERATORS+OPERATIONS)
+    parser_run.add_argument("--modes", nargs="+", choices=["forward", "backward"], default=["forward", "backward"])
+    parser_run.add_argument("--dtype", default="float32")
+    parser_run.add_argument("--device", default="cpu")
+    parser_run.add_argument("--min-run-time", type=float, default=0.2, help="the minimum run time of every case in seconds")
+    parser_run.add_argument("--output", default="benchmark_results.json")
+    parser_import = subparsers.add_parser("import", help="measure the import time in fresh interpreters")
+    parser_import.add_argument("--repeats", type=int, default=10)
+    parser_import.add_argument("--output", default="import_results.json")
+    parser_compare = subparsers.add_parser("compare", help="compare results against a baseline")
+    parser_compare.add_argument("baseline")
+    parser_compare.add_argument("results")
+    parser_compare.add_argument("--threshold", type=float, default=0.1, help="the relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        for name in ["sizes", "batch_sizes", "threads"]:
+            if getattr(args, name) is None:
+                setattr(args, name, PRESETS[args.preset][name])
+        run(args)
+        return 0
+    if args.command == "import":
+        run_import(args)
+        return 0
+    return compare(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("numpy")
+
+from ConvDO import *
+
+def _tensors(seed, size=32):
+    generator = torch.Generator().manual_seed(seed)
+    return {"values": torch.rand(size, size, generator=generator),
+            "indices": torch.randint(0, 100, (2, size), generator=generator),
+            "half": torch.rand(size, size, generator=generator).to(torch.bfloat16)}
+
+def test_round_trip_gives_identical_tensors(tmp_path):
+    cache = ArtifactCache(directory=str(tmp_path), enabled=True)
+    tensors = _tensors(0)
+    cache.put("artifact", tensors)
+    loaded = cache.get("artifact")
+    assert set(loaded) == set(tensors)
+    for name, tensor in tensors.items():
+        assert loaded[name].dtype == tensor.dtype
+        assert torch.equal(loaded[name], tensor)
+    calls = []
+    cached = cache.cached("artifact", lambda: calls.append(1) or _tensors(1))
+    assert calls == [] and torch.equal(cached["values"], tensors["values"])
+
+def test_eviction_keeps_the_cache_within_max_bytes(tmp_path):
+    cache = ArtifactCache(directory=str(tmp_path), enabled=True)
+    cache.put("first", _tensors(0))
+    max_bytes = int(2.5*cache.size())
+    cache.max_bytes = max_bytes
+    for i in range(1, 6):
+        cache.put("artifact-{}".format(i), _tensors(i))
+        assert cache.size() <= max_bytes
+    keys = [entry[0] for entry in cache.entries()]
+    # the least recently used artifacts are removed first.
+    assert "first" not in keys and "artifact-5" in keys
+
+def test_geometry_is_loaded_from_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_cache, "enabled", True)
+    monkeypatch.setattr(artifact_cache, "directory", str(tmp_path))
+    computed = generate_circle_2D(0.5, 0.5, 0.2, 1, 1, 1/64, 1/64)
+    assert len(artifact_cache.entries()) > 0
+    loaded = generate_circle_2D(0.5, 0.5, 0.2, 1, 1, 1/64, 1/64)
+    assert torch.equal(loaded, computed)
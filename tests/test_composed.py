@@ -0,0 +1,51 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ConvDO import *
+
+@pytest.fixture
+def p():
+    domain = Domain([PeriodicBoundary()]*4, delta_x=1/32, delta_y=1/32)
+    value = torch.rand(2, 1, 32, 32, generator=torch.Generator().manual_seed(0), dtype=torch.float64)
+    return ScalarField(value, domain=domain)
+
+@pytest.fixture
+def operators():
+    return {"grad_x": ConvGrad(2, direction="x", dtype=torch.float64),
+            "grad_y": ConvGrad(2, direction="y", dtype=torch.float64),
+            "nabla2": ConvLaplacian(2, dtype=torch.float64)}
+
+def test_scaled_operators(p, operators):
+    grad_x, nabla2 = operators["grad_x"], operators["nabla2"]
+    for operator in [grad_x, nabla2]:
+        expected = (operator*p).value*2
+        torch.testing.assert_close((2*operator*p).value, expected)
+        torch.testing.assert_close((operator*2*p).value, expected)
+        torch.testing.assert_close((-operator*p).value, -(operator*p).value)
+
+def test_sum_and_difference_of_operators(p, operators):
+    grad_x, grad_y, nabla2 = operators["grad_x"], operators["grad_y"], operators["nabla2"]
+    torch.testing.assert_close(((grad_x-grad_y)*p).value, (grad_x*p).value-(grad_y*p).value)
+    torch.testing.assert_close(((nabla2+grad_x)*p).value, (nabla2*p).value+(grad_x*p).value)
+    torch.testing.assert_close(((nabla2-grad_x)*p).value, (nabla2*p).value-(grad_x*p).value)
+
+def test_composed_operators_match_the_chained_application(p, operators):
+    grad_x, grad_y, nabla2 = operators["grad_x"], operators["grad_y"], operators["nabla2"]
+    torch.testing.assert_close(((grad_x*grad_y)*p).value, (grad_x*(grad_y*p)).value)
+    torch.testing.assert_close(((nabla2*nabla2)*p).value, (nabla2*(nabla2*p)).value)
+
+def test_unsupported_operands_raise(operators):
+    for operator in [operators["grad_x"], operators["nabla2"]]:
+        with pytest.raises(NotImplementedError):
+            operator*"p"
+
+@pytest.mark.parametrize("boundaries", [[DirichletBoundary(0.0)]*4, [PeriodicBoundary()]*2+[DirichletBoundary(1.0)]*2], ids=["dirichlet", "periodic_x"])
+def test_composed_operators_are_chained_on_non_periodic_domains(boundaries):
+    domain = Domain(boundaries, delta_x=1/32, delta_y=1/32)
+    p = ScalarField(torch.rand(2, 1, 32, 32, generator=torch.Generator().manual_seed(0), dtype=torch.float64), domain=domain)
+    mixed, biharmonic = ConvMixedGrad(2, dtype=torch.float64), ConvBiharmonic(2, dtype=torch.float64)
+    assert not mixed.allow_precomposed(domain) and not biharmonic.allow_precomposed(domain)
+    grad_x, grad_y, nabla2 = ConvGrad(2, direction="x", dtype=torch.float64), ConvGrad(2, direction="y", dtype=torch.float64), ConvLaplacian(2, dtype=torch.float64)
+    torch.testing.assert_close((mixed*p).value, (grad_x*(grad_y*p)).value)
+    torch.testing.assert_close((biharmonic*p).value, (nabla2*(nabla2*p)).value)
@@ -0,0 +1,37 @@
+import functools
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ConvDO import *
+
+SIZE = 16
+
+def build_operation(boundary):
+    boundaries = [PeriodicBoundary()]*4 if boundary == "periodic" else [DirichletBoundary(0.0)]*4
+    domains = [Domain(boundaries, delta_x=1/SIZE, delta_y=1/SIZE) for _ in range(3)]
+    return PoissonDivergence(*domains, order=2, dtype=torch.float64)
+
+def _fields(number=3):
+    generator = torch.Generator().manual_seed(0)
+    return [torch.rand(37, SIZE, SIZE, generator=generator, dtype=torch.float64) for _ in range(number)]
+
+def _serial(operation, fields, ord=2):
+    norms = []
+    for i in range(fields[0].shape[0]):
+        residual = operation(*[field[i:i+1, None] for field in fields])
+        norms.append(torch.linalg.vector_norm(residual.flatten(-2), ord=ord, dim=-1))
+    return torch.cat(norms, dim=0)
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+@pytest.mark.parametrize("boundary", ["periodic", "dirichlet"])
+def test_pooled_results_equal_a_serial_loop(backend, boundary):
+    fields = _fields()
+    expected = _serial(build_operation(boundary), fields)
+    num_threads = torch.get_num_threads()
+    with ResidualEvaluator(functools.partial(build_operation, boundary), num_workers=2, backend=backend, batch_size=8) as evaluator:
+        torch.testing.assert_close(evaluator.evaluate(*fields), expected)
+        batches = [[field[start:start+10] for field in fields] for start in range(0, 37, 10)]
+        torch.testing.assert_close(torch.cat(list(evaluator.evaluate_batches(batches)), dim=0), expected)
+    # the intra-op thread number of the caller is not changed.
+    assert torch.get_num_threads() == num_threads
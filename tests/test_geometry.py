@@ -0,0 +1,25 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ConvDO import *
+
+CIRCLES = [(0.5, 0.5, 0.2, 1, 1, 1/64, 1/64), (0.3, 0.6, 0.13, 1, 2, 1/48, 1/32)]
+
+@pytest.mark.parametrize("center_x, center_y, radius, length_x, length_y, dx, dy", CIRCLES)
+def test_circle_shape_field_matches_generate_circle_2D(center_x, center_y, radius, length_x, length_y, dx, dy):
+    X, Y = grid_2D(length_x, length_y, dx, dy, dtype=torch.float64)
+    shape_field = shape_field_from_sdf(circle_sdf(X, Y, center_x, center_y, radius))
+    expected = generate_circle_2D(center_x, center_y, radius, length_x, length_y, dx, dy)
+    assert shape_field.shape == expected.shape
+    assert torch.equal(shape_field.to(expected.dtype), expected)
+
+def test_batched_geometries_match_single_geometries():
+    X, Y = grid_2D(1, 1, 1/32, 1/32, dtype=torch.float64)
+    centers = torch.tensor([[[0.3, 0.3], [0.7, 0.6]], [[0.5, 0.5], [0.2, 0.8]]], dtype=torch.float64)
+    shape_fields = shape_field_from_sdf(union(circle_sdf(X, Y, centers[..., 0], centers[..., 1], 0.1), dim=1))
+    assert shape_fields.shape == (2, 1, 32, 32)
+    for b in range(2):
+        single = torch.minimum(generate_circle_2D(*centers[b, 0].tolist(), 0.1, 1, 1, 1/32, 1/32),
+                               generate_circle_2D(*centers[b, 1].tolist(), 0.1, 1, 1, 1/32, 1/32))
+        assert torch.equal(shape_fields[b, 0].to(single.dtype), single)
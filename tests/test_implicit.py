@@ -0,0 +1,42 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ConvDO import *
+
+SIZE = 16
+
+def _fields(number=3):
+    generator = torch.Generator().manual_seed(0)
+    return [0.1*torch.rand(2, 1, SIZE, SIZE, generator=generator, dtype=torch.float64) for _ in range(number)]
+
+def _operation(force):
+    domains = [Domain([PeriodicBoundary()]*4, delta_x=1/SIZE, delta_y=1/SIZE) for _ in range(3)]
+    if force:
+        force_x, force_y = _fields(2)
+        return TransientNSWithForce(*domains, force_x[:1], force_y[:1], *domains[:2], viscosity=0.05, dt=0.01, order=2, dtype=torch.float64)
+    return TransientNS(*domains, viscosity=0.05, dt=0.01, order=2, dtype=torch.float64)
+
+def _rms(residual):
+    return torch.sqrt(residual.square().flatten(1).mean(dim=-1))
+
+@pytest.mark.parametrize("force", [False, True])
+@pytest.mark.parametrize("preconditioner", ["poisson", None])
+def test_converged_state_solves_the_residual(force, preconditioner):
+    operation = _operation(force)
+    stepper = NewtonKrylovStepper(operation, tol=1e-8, krylov_tol=1e-6, max_newton=20, preconditioner=preconditioner)
+    u_0, v_0, p_0 = _fields()
+    u_1, v_1, p_1 = stepper.step(u_0, v_0, p_0)
+    assert 0 < stepper.num_newton_iterations < 20
+    assert (_rms(operation(u_0, v_0, p_0, u_1, v_1, p_1)) <= 1e-8).all()
+
+def test_forward_and_finite_difference_jvp_agree():
+    operation = _operation(force=False)
+    u_0, v_0, p_0 = _fields()
+    states = [NewtonKrylovStepper(operation, tol=1e-8, krylov_tol=1e-6, max_newton=20, jvp=jvp).step(u_0, v_0, p_0)
+              for jvp in ["forward", "finite_difference"]]
+    for field_forward, field_difference in zip(states[0][:2], states[1][:2]):
+        torch.testing.assert_close(field_forward, field_difference, rtol=0, atol=1e-6)
+    # the pressure is unique only up to a constant on periodic domains.
+    pressures = [state[2]-state[2].mean(dim=(-2, -1), keepdim=True) for state in states]
+    torch.testing.assert_close(pressures[0], pressures[1], rtol=0, atol=1e-4)
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+import pytest
+
+pytest.importorskip("torch")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _run(code):
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+def test_import_prints_nothing():
+    result = _run("import ConvDO")
+    assert result.stdout == ""
+    assert result.stderr == ""
+
+def test_operator_import_does_not_load_optional_modules():
+    result = _run("import sys\n"
+                  "from ConvDO import ConvGrad\n"
+                  "print(' '.join(sorted(name for name in sys.modules if name.startswith('ConvDO.'))))")
+    loaded = result.stdout.split()
+    assert "ConvDO.conv_operators" in loaded
+    for name in ["ConvDO.solvers", "ConvDO.export", "ConvDO.memory", "ConvDO.streaming"]:
+        assert name not in loaded
+
+def test_star_import_keeps_the_previous_names():
+    result = _run("from ConvDO import *\n"
+                  "print(np.__name__, isfunction.__name__, Sequence.__name__, math.__name__, conv_operators.__name__)")
+    assert result.stdout.split() == ["numpy", "isfunction", "Sequence", "math", "ConvDO.conv_operators"]
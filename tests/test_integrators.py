@@ -0,0 +1,57 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ConvDO import *
+
+SIZE = 16
+
+def _domains(boundary):
+    if boundary == "periodic":
+        return [Domain([PeriodicBoundary()]*4, delta_x=1/SIZE, delta_y=1/SIZE) for _ in range(3)]
+    obstacles_u = obstacles_p = []
+    if boundary == "obstacle":
+        shape_field = generate_circle_2D(0.5, 0.5, 0.2, 1, 1, 1/SIZE, 1/SIZE)
+        obstacles_u = [DirichletObstacle(shape_field, 0.0)]
+        obstacles_p = [NeumannObstacle(shape_field, 0.0)]
+    return [Domain([DirichletBoundary(0.0)]*4, obstacles=obstacles_u, delta_x=1/SIZE, delta_y=1/SIZE),
+            Domain([DirichletBoundary(0.0)]*4, obstacles=obstacles_u, delta_x=1/SIZE, delta_y=1/SIZE),
+            Domain([NeumannBoundary(0.0)]*4, obstacles=obstacles_p, delta_x=1/SIZE, delta_y=1/SIZE)]
+
+def _integrators(boundary):
+    dt = 0.01 if boundary == "periodic" else 0.001
+    return [RungeKuttaIntegrator(*_domains(boundary), viscosity=0.01, dt=dt, order=2, scheme="rk4", dtype=torch.float64),
+            IMEXIntegrator(*_domains(boundary), viscosity=0.01, dt=dt, order=2, dtype=torch.float64)]
+
+def _fields():
+    generator = torch.Generator().manual_seed(0)
+    return [torch.rand(2, 1, SIZE, SIZE, generator=generator, dtype=torch.float64) for _ in range(3)]
+
+CASES = [(integrator, boundary) for boundary in ["periodic", "dirichlet", "obstacle"] for integrator in range(2)]
+IDS = ["{}-{}".format(["rk4", "imex"][integrator], boundary) for integrator, boundary in CASES]
+
+@pytest.mark.parametrize("integrator, boundary", CASES, ids=IDS)
+def test_step_is_differentiable_through_several_steps(integrator, boundary):
+    integrator = _integrators(boundary)[integrator]
+    with torch.no_grad():
+        u, v, p = _fields()
+        for _ in range(3):
+            u, v, p = integrator.step(u, v, p)
+        expected = torch.cat([u, v, p], dim=1).clone()
+    u_0, v_0, p_0 = [field.requires_grad_() for field in _fields()]
+    u, v, p = u_0, v_0, p_0
+    for _ in range(3):
+        u, v, p = integrator.step(u, v, p)
+    torch.testing.assert_close(torch.cat([u, v, p], dim=1), expected)
+    (u.square().sum()+v.square().sum()).backward()
+    assert u_0.grad is not None and torch.isfinite(u_0.grad).all()
+    assert v_0.grad is not None and torch.isfinite(v_0.grad).all()
+
+@pytest.mark.parametrize("integrator, boundary", CASES, ids=IDS)
+def test_step_in_place_equals_step(integrator, boundary):
+    integrator = _integrators(boundary)[integrator]
+    u, v, p = _fields()
+    state = torch.cat([u, v, p], dim=1)
+    expected = integrator.step(u, v, p)
+    assert integrator.step_(state) is state
+    torch.testing.assert_close(state, torch.cat(expected, dim=1))
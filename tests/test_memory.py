@@ -0,0 +1,32 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ConvDO import MemoryTracer
+
+def _pattern():
+    # 4 KiB, then 4 KiB while the first is live, then 8 KiB after the first is released.
+    a = torch.ones(1024)
+    b = a*2
+    del a
+    c = torch.ones(2048)
+    return b.sum()+c.sum()
+
+def test_peak_of_a_known_allocation_pattern():
+    tracer = MemoryTracer(call_sites=False)
+    tracer.trace(_pattern, backward=False)
+    forward = tracer.summary()["phases"]["forward"]
+    assert forward["allocations"] == 6
+    assert forward["allocated"] == 4096+4096+8192+3*4
+    # b, c and the three scalars of the sum.
+    assert forward["peak"]-forward["baseline"] == 4096+8192+3*4
+
+def test_storages_held_only_by_aliases_are_released_early():
+    tracer = MemoryTracer(call_sites=False)
+    with tracer, tracer.phase("forward"):
+        alias = torch.ones(1024).detach()
+        torch.ones(1024)
+    forward = tracer.summary()["phases"]["forward"]
+    # the first storage is still referenced by the alias, but it is not counted at the peak.
+    assert alias.untyped_storage().nbytes() == 4096
+    assert forward["peak"]-forward["baseline"] == 4096
@@ -0,0 +1,67 @@
+import math
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ConvDO import *
+
+SIZE = 64
+DELTA = 1/1024
+
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
+def _domain(boundary):
+    if boundary == "periodic":
+        return Domain([PeriodicBoundary()]*4, delta_x=DELTA, delta_y=DELTA)
+    if boundary == "obstacle":
+        shape_field = generate_circle_2D(0.5, 0.5, 0.2, 1, 1, 1/SIZE, 1/SIZE).to(DEVICE)
+        return Domain([PeriodicBoundary()]*4, obstacles=[DirichletObstacle(shape_field, 0.0)], delta_x=DELTA, delta_y=DELTA)
+    # the boundary conditions of the field, so the derivatives stay in the range of float16.
+    return Domain([NeumannBoundary(0.0), NeumannBoundary(0.0), DirichletBoundary(0.0), DirichletBoundary(0.0)], delta_x=DELTA, delta_y=DELTA)
+
+def _field(dtype, size=SIZE, batch=1):
+    x = (torch.arange(size, dtype=torch.float64, device=DEVICE)+0.5)/size
+    value = torch.sin(2*math.pi*x)[:, None]*torch.cos(2*math.pi*x)[None, :]
+    return value[None, None].expand(batch, 1, size, size).to(dtype).contiguous()
+
+CASES = [(dtype, boundary) for dtype in [torch.bfloat16, torch.float16] for boundary in ["periodic", "boundaries", "obstacle"]
+         # the ghost cells of the obstacle make the second derivatives overflow in float16.
+         if not (dtype == torch.float16 and boundary == "obstacle")]
+
+@pytest.mark.parametrize("dtype, boundary", CASES)
+@pytest.mark.parametrize("planned", [True, False])
+@pytest.mark.parametrize("operator", ["grad_x", "grad_y", "grad2_x", "grad2_y"])
+def test_mixed_precision_matches_float64(monkeypatch, dtype, boundary, planned, operator):
+    monkeypatch.setattr(plan_cache, "enabled", planned)
+    direction = operator[-1]
+    build = ConvGrad if operator.startswith("grad_") else ConvGrad2
+    domain = _domain(boundary)
+    field = _field(dtype)
+    operated = build(order=2, direction=direction, device=DEVICE, dtype=torch.float32)*ScalarField(field, domain=domain)
+    # the reference of the same rounded field in float64.
+    reference = build(order=2, direction=direction, device=DEVICE, dtype=torch.float64)*ScalarField(field.to(torch.float64), domain=domain)
+    assert operated.value.dtype == dtype
+    assert torch.isfinite(operated.value).all()
+    error = torch.linalg.vector_norm(operated.value.double()-reference.value)/torch.linalg.vector_norm(reference.value)
+    assert error < 1e-2
+
+@pytest.mark.parametrize("boundary", ["periodic", "boundaries", "obstacle"])
+@pytest.mark.parametrize("planned", [True, False])
+def test_mixed_precision_halves_the_allocations(monkeypatch, boundary, planned):
+    monkeypatch.setattr(plan_cache, "enabled", planned)
+    monkeypatch.setattr(autotuner, "enabled", False)
+    operator = ConvGrad2(order=2, direction="x", device=DEVICE, dtype=torch.float32)
+    domain = _domain(boundary)
+    if boundary == "obstacle":
+        domain = Domain([PeriodicBoundary()]*4, obstacles=[DirichletObstacle(generate_circle_2D(0.5, 0.5, 0.2, 1, 1, 1/256, 1/256).to(DEVICE), 0.0)],
+                        delta_x=DELTA, delta_y=DELTA)
+    allocated = {}
+    for dtype in [torch.float32, torch.bfloat16]:
+        field = ScalarField(_field(dtype, size=256, batch=8), domain=domain)
+        # the first call builds the plan.
+        operator*field
+        tracer = MemoryTracer(call_sites=False)
+        with torch.no_grad():
+            tracer.trace(lambda: (operator*field).value, backward=False)
+        allocated[dtype] = tracer.summary()["phases"]["forward"]["allocated"]
+    assert allocated[torch.bfloat16] <= 0.6*allocated[torch.float32]
@@ -0,0 +1,38 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ConvDO import *
+
+@pytest.mark.parametrize("shape", [(32, 32), (31, 33)])
+def test_multigrid_solves_the_poisson_equation(shape):
+    domain = Domain([DirichletBoundary(0.0)]*4, delta_x=1/shape[0], delta_y=1/shape[1])
+    multigrid = Multigrid(domain, shape, order=2, tol=1e-6, max_iter=200, dtype=torch.float64)
+    rhs = torch.rand(1, 1, *shape, generator=torch.Generator().manual_seed(0), dtype=torch.float64)
+    p = multigrid.solve(rhs)
+    residual = (ConvLaplacian(order=2, dtype=torch.float64)*ScalarField(p, domain=domain)).value-rhs
+    assert torch.linalg.vector_norm(residual) <= 1e-4*torch.linalg.vector_norm(rhs)
+
+def test_multigrid_does_not_invert_a_large_coarsest_level():
+    # an odd shape is not coarsened, the dense inverse would have (H*W)^2 elements.
+    shape = (129, 129)
+    domain = Domain([DirichletBoundary(0.0)]*4, delta_x=1/129, delta_y=1/129)
+    multigrid = Multigrid(domain, shape, order=2)
+    assert len(multigrid.levels) == 1
+    assert multigrid.coarsest_inverse is None
+
+@pytest.mark.parametrize("size", [64, 256])
+@pytest.mark.parametrize("boundaries", [[DirichletBoundary(0.0)]*4, [DirichletBoundary(0.0)]*2+[NeumannBoundary(0.0)]*2], ids=["dirichlet", "mixed"])
+def test_multigrid_convergence_rate_does_not_depend_on_the_grid(size, boundaries):
+    domain = Domain(boundaries, delta_x=1/size, delta_y=1/size)
+    multigrid = Multigrid(domain, (size, size), order=2, dtype=torch.float64)
+    level = multigrid.levels[0]
+    rhs = torch.rand(1, 1, size, size, generator=torch.Generator().manual_seed(0), dtype=torch.float64)-level.bias
+    x = torch.zeros_like(rhs)
+    norms = [torch.linalg.vector_norm(rhs)]
+    for _ in range(8):
+        x = multigrid.v_cycle(rhs, x)
+        norms.append(torch.linalg.vector_norm(rhs-level.apply(x)))
+    # the asymptotic rate of the damped Jacobi V(2,2) cycle is about 0.17, the ghosts repeated at the walls gave 0.36 to 0.5 growing with the grid.
+    assert norms[-1]/norms[-2] < 0.25
+    assert (norms[-1]/norms[0])**(1/8) < 0.2
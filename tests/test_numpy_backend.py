@@ -0,0 +1,54 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+np = pytest.importorskip("numpy")
+
+from ConvDO import *
+
+SIZE = 16
+
+BOUNDARIES = {
+    "periodic": lambda: [PeriodicBoundary()]*4,
+    "dirichlet": lambda: [DirichletBoundary(1.0), DirichletBoundary(0.0), DirichletBoundary(0.5), DirichletBoundary(-1.0)],
+    "neumann": lambda: [NeumannBoundary(0.0), NeumannBoundary(1.0), NeumannBoundary(0.0), NeumannBoundary(-1.0)],
+    "unconstrained": lambda: [UnConstrainedBoundary()]*4,
+}
+
+OPERATORS = {
+    "grad_x": (lambda: ConvGrad(order=2, direction="x", dtype=torch.float64), lambda: NumpyConvGrad(order=2, direction="x")),
+    "grad_y": (lambda: ConvGrad(order=2, direction="y", dtype=torch.float64), lambda: NumpyConvGrad(order=2, direction="y")),
+    "grad2_x": (lambda: ConvGrad2(order=2, direction="x", dtype=torch.float64), lambda: NumpyConvGrad2(order=2, direction="x")),
+    "grad2_y": (lambda: ConvGrad2(order=2, direction="y", dtype=torch.float64), lambda: NumpyConvGrad2(order=2, direction="y")),
+    "laplacian": (lambda: ConvLaplacian(order=2, dtype=torch.float64), lambda: NumpyConvLaplacian(order=2)),
+}
+
+def _domains(boundary, obstacle):
+    delta = 1/SIZE
+    shape_field = generate_circle_2D(0.5, 0.5, 0.2, 1, 1, delta, delta)
+    if obstacle == "dirichlet":
+        obstacles = ([DirichletObstacle(shape_field, 1.0)], [NumpyDirichletObstacle(shape_field.numpy(), 1.0)])
+    elif obstacle == "neumann":
+        obstacles = ([NeumannObstacle(shape_field, 0.0)], [NumpyNeumannObstacle(shape_field.numpy(), 0.0)])
+    else:
+        obstacles = ([], [])
+    return [Domain(BOUNDARIES[boundary](), obstacles=obstacles[i], delta_x=delta, delta_y=delta) for i in range(2)]
+
+@pytest.mark.parametrize("boundary", list(BOUNDARIES))
+@pytest.mark.parametrize("obstacle", [None, "dirichlet", "neumann"])
+@pytest.mark.parametrize("operator", list(OPERATORS))
+def test_numpy_backend_matches_torch(boundary, obstacle, operator):
+    build_torch, build_numpy = OPERATORS[operator]
+    domain_torch, domain_numpy = _domains(boundary, obstacle)
+    value = np.random.default_rng(0).random((2, 1, SIZE, SIZE))
+    expected = (build_torch()*ScalarField(torch.from_numpy(value), domain=domain_torch)).value.numpy()
+    operated = (build_numpy()*NumpyScalarField(value, domain=domain_numpy)).value
+    np.testing.assert_allclose(operated, expected, rtol=1e-10, atol=1e-8)
+
+@pytest.mark.parametrize("direction", ["x", "y"])
+def test_numpy_backend_matches_torch_at_high_order(direction):
+    domain = Domain(BOUNDARIES["periodic"](), delta_x=1/SIZE, delta_y=1/SIZE)
+    value = np.random.default_rng(0).random((2, 1, SIZE, SIZE))
+    expected = (ConvGrad(order=6, direction=direction, dtype=torch.float64)*ScalarField(torch.from_numpy(value), domain=domain)).value.numpy()
+    operated = (NumpyConvGrad(order=6, direction=direction)*NumpyScalarField(value, domain=domain)).value
+    # the high order stencils of the PyTorch backend are rounded to float32.
+    np.testing.assert_allclose(operated, expected, rtol=1e-5, atol=1e-5)
@@ -0,0 +1,110 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ConvDO import *
+
+SIZE = 16
+
+BOUNDARIES = {
+    "periodic": lambda: [PeriodicBoundary()]*4,
+    "dirichlet": lambda: [DirichletBoundary(1.0), DirichletBoundary(0.0), DirichletBoundary(0.0), DirichletBoundary(0.0)],
+}
+
+def _domains(boundary):
+    return [Domain(BOUNDARIES[boundary](), delta_x=1/SIZE, delta_y=1/SIZE) for _ in range(3)]
+
+def _fields(number, shape=(2, 1, SIZE, SIZE)):
+    generator = torch.Generator().manual_seed(0)
+    return [torch.rand(*shape, generator=generator, dtype=torch.float64) for _ in range(number)]
+
+def _transient_ns(boundary, force):
+    domains = _domains(boundary)
+    if force:
+        force_x, force_y = _fields(2, (1, 1, SIZE, SIZE))
+        return TransientNSWithForce(*domains, force_x, force_y, *_domains("periodic")[:2], viscosity=0.01, dt=0.01, order=2, dtype=torch.float64)
+    return TransientNS(*domains, viscosity=0.01, dt=0.01, order=2, dtype=torch.float64)
+
+@pytest.mark.parametrize("boundary", list(BOUNDARIES))
+@pytest.mark.parametrize("force", [False, True])
+def test_trajectory_equals_the_residuals_of_every_pair(boundary, force):
+    operation = _transient_ns(boundary, force)
+    u, v, p = _fields(3, (2, 4, SIZE, SIZE))
+    trajectory = operation.trajectory(u, v, p)
+    pairs = torch.stack([operation(u[:, t:t+1], v[:, t:t+1], p[:, t:t+1], u[:, t+1:t+2], v[:, t+1:t+2], p[:, t+1:t+2])
+                         for t in range(u.shape[1]-1)], dim=1)
+    assert trajectory.shape == (2, 3, 3, SIZE, SIZE)
+    torch.testing.assert_close(trajectory, pairs)
+
+def _naive_reduction(residual, reduction, per_channel, mask):
+    values = residual.abs() if reduction == "l1" else residual.square()
+    weights = torch.ones_like(residual) if mask is None else mask.expand(residual.shape[0], 1, *residual.shape[2:]).expand_as(residual)
+    dims = (0, 2, 3) if per_channel else (0, 1, 2, 3)
+    total = (values*weights).sum(dim=dims)
+    return total if reduction == "sum" else total/weights.sum(dim=dims)
+
+@pytest.mark.parametrize("reduction", ["mse", "l1", "sum"])
+@pytest.mark.parametrize("per_channel", [False, True])
+@pytest.mark.parametrize("masked", [False, True])
+def test_fused_reduction_equals_the_naive_reduction(reduction, per_channel, masked):
+    operation = _transient_ns("dirichlet", force=False)
+    fields = _fields(6)
+    mask = (torch.rand(1, 1, SIZE, SIZE, generator=torch.Generator().manual_seed(1), dtype=torch.float64) > 0.3).to(torch.float64) if masked else None
+    expected = _naive_reduction(operation(*fields), reduction, per_channel, mask)
+    loss = operation(*fields, reduction=reduction, per_channel=per_channel, mask=mask)
+    torch.testing.assert_close(loss, expected)
+    poisson = PoissonDivergence(*_domains("periodic"), order=2, dtype=torch.float64)
+    expected = _naive_reduction(poisson(*fields[:3]), reduction, per_channel, mask)
+    torch.testing.assert_close(poisson(*fields[:3], reduction=reduction, per_channel=per_channel, mask=mask), expected)
+
+def _sample_domain(boundary, obstacle):
+    boundaries = {"neumann": lambda: [NeumannBoundary(0.0), NeumannBoundary(1.0), NeumannBoundary(0.0), NeumannBoundary(-1.0)],
+                  "unconstrained": lambda: [UnConstrainedBoundary()]*4}
+    obstacles = []
+    if obstacle:
+        shape_field = generate_circle_2D(0.5, 0.5, 0.2, 1, 1, 1/SIZE, 1/SIZE)
+        obstacles = [DirichletObstacle(shape_field, 1.0) if obstacle == "dirichlet" else NeumannObstacle(shape_field, 0.5)]
+    return Domain({**BOUNDARIES, **boundaries}[boundary](), obstacles=obstacles, delta_x=1/SIZE, delta_y=1/SIZE)
+
+# every cell, i.e., the boundary cells and the cells around and inside the obstacle as well.
+ALL_CELLS = (torch.arange(SIZE).repeat_interleave(SIZE), torch.arange(SIZE).repeat(SIZE))
+
+@pytest.mark.parametrize("boundary", ["periodic", "dirichlet", "neumann", "unconstrained"])
+@pytest.mark.parametrize("obstacle", [None, "dirichlet", "neumann"])
+def test_sample_equals_the_gathered_field(boundary, obstacle):
+    field = ScalarField(_fields(1)[0], domain=_sample_domain(boundary, obstacle))
+    operators = [ConvGrad(order=2, direction="x", dtype=torch.float64), ConvGrad(order=2, direction="y", dtype=torch.float64),
+                 ConvGrad2(order=2, direction="x", dtype=torch.float64), ConvGrad2(order=2, direction="y", dtype=torch.float64),
+                 ConvLaplacian(order=2, dtype=torch.float64)]
+    rows, cols = ALL_CELLS
+    for operator in operators:
+        torch.testing.assert_close(operator.sample(field, ALL_CELLS), (operator*field).value[..., rows, cols])
+
+@pytest.mark.parametrize("boundary", list(BOUNDARIES))
+def test_sampled_residuals_equal_the_gathered_residuals(boundary):
+    rows, cols = ALL_CELLS
+    fields = _fields(6)
+    operation = _transient_ns(boundary, force=True)
+    torch.testing.assert_close(operation(*fields, index=ALL_CELLS), operation(*fields)[..., rows, cols])
+    poisson = PoissonDivergence(*_domains(boundary), order=2, dtype=torch.float64)
+    torch.testing.assert_close(poisson(*fields[:3], index=ALL_CELLS), poisson(*fields[:3])[..., rows, cols])
+
+def test_concurrent_calls_on_one_instance():
+    from concurrent.futures import ThreadPoolExecutor
+    operation = _transient_ns("dirichlet", force=True)
+    inputs = [[field*(i+1) for field in _fields(6)] for i in range(8)]
+    expected = [operation(*fields) for fields in inputs]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda fields: operation(*fields), inputs*4))
+    for i, result in enumerate(results):
+        torch.testing.assert_close(result, expected[i % len(inputs)])
+
+def test_shared_operators_equal_per_instance_operators(monkeypatch):
+    fields = _fields(6)
+    shared = [_transient_ns("dirichlet", force=False), PoissonDivergence(*_domains("dirichlet"), order=2, dtype=torch.float64)]
+    assert shared[0].grad_x is shared[1].grad_x
+    monkeypatch.setattr(operator_registry, "enabled", False)
+    own = [_transient_ns("dirichlet", force=False), PoissonDivergence(*_domains("dirichlet"), order=2, dtype=torch.float64)]
+    assert own[0].grad_x is not own[1].grad_x
+    torch.testing.assert_close(shared[0](*fields), own[0](*fields))
+    torch.testing.assert_close(shared[1](*fields[:3]), own[1](*fields[:3]))
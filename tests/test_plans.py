@@ -0,0 +1,54 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ConvDO import *
+
+SIZE = 32
+
+def _domain(boundary):
+    delta = 1/SIZE
+    if boundary == "periodic":
+        return Domain([PeriodicBoundary()]*4, delta_x=delta, delta_y=delta)
+    if boundary == "dirichlet":
+        return Domain([DirichletBoundary(1.0), DirichletBoundary(0.0), DirichletBoundary(0.5), DirichletBoundary(0.0)], delta_x=delta, delta_y=delta)
+    if boundary == "neumann":
+        return Domain([NeumannBoundary(0.0), NeumannBoundary(1.0), NeumannBoundary(0.0), NeumannBoundary(-1.0)], delta_x=delta, delta_y=delta)
+    shape_field = generate_circle_2D(0.5, 0.5, 0.2, 1, 1, delta, delta)
+    return Domain([DirichletBoundary(0.0)]*4, obstacles=[DirichletObstacle(shape_field, 1.0)], delta_x=delta, delta_y=delta)
+
+def _field():
+    generator = torch.Generator().manual_seed(0)
+    return torch.rand(2, 1, SIZE, SIZE, generator=generator, dtype=torch.float64)
+
+@pytest.mark.parametrize("boundary", ["periodic", "dirichlet", "neumann", "obstacle"])
+@pytest.mark.parametrize("operator", ["grad_x", "grad_y", "grad2_x", "grad2_y"])
+def test_plan_matches_unplanned_path(monkeypatch, boundary, operator):
+    build = ConvGrad if operator.startswith("grad_") else ConvGrad2
+    operation = build(order=2, direction=operator[-1], dtype=torch.float64)
+    field = ScalarField(_field(), domain=_domain(boundary))
+    monkeypatch.setattr(plan_cache, "enabled", False)
+    expected = (operation*field).value
+    monkeypatch.setattr(plan_cache, "enabled", True)
+    plan_cache.clear()
+    # the second call executes the cached plan.
+    for _ in range(2):
+        torch.testing.assert_close((operation*field).value, expected)
+    assert plan_cache.hits == 1
+
+def test_plan_follows_in_place_updates():
+    plan_cache.clear()
+    domain = _domain("obstacle")
+    operation = ConvGrad(order=2, direction="x", dtype=torch.float64)
+    field = ScalarField(_field(), domain=domain)
+    operation*field
+    misses = plan_cache.misses
+    domain.obstacles[0].shape_field.value.fill_(0.0)
+    operation.kernel.mul_(2.0)
+    planned = (operation*field).value
+    assert plan_cache.misses > misses
+    plan_cache.enabled = False
+    try:
+        torch.testing.assert_close(planned, (operation*field).value)
+    finally:
+        plan_cache.enabled = True
@@ -0,0 +1,61 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ConvDO import *
+
+SIZE = 24
+
+def _domain(boundary):
+    delta = 1/SIZE
+    if boundary == "periodic":
+        return Domain([PeriodicBoundary()]*4, delta_x=delta, delta_y=delta)
+    if boundary == "dirichlet":
+        return Domain([DirichletBoundary(1.0), DirichletBoundary(0.0), DirichletBoundary(0.5), DirichletBoundary(-1.0)], delta_x=delta, delta_y=delta)
+    if boundary == "neumann":
+        return Domain([NeumannBoundary(0.0)]*4, delta_x=delta, delta_y=delta)
+    if boundary == "mixed":
+        return Domain([DirichletBoundary(1.0), NeumannBoundary(0.0), NeumannBoundary(0.0), DirichletBoundary(0.0)], delta_x=delta, delta_y=delta)
+    shape_field = generate_circle_2D(0.5, 0.5, 0.2, 1, 1, delta, delta)
+    return Domain([DirichletBoundary(0.0)]*4, obstacles=[DirichletObstacle(shape_field, 1.0)], delta_x=delta, delta_y=delta)
+
+def _rhs(boundary, batch=2):
+    generator = torch.Generator().manual_seed(0)
+    rhs = torch.rand(batch, 1, SIZE, SIZE, generator=generator, dtype=torch.float64)
+    if boundary in ["periodic", "neumann"]:
+        # the compatibility condition of the singular operators.
+        rhs = rhs-rhs.mean(dim=(-2, -1), keepdim=True)
+    return rhs
+
+@pytest.mark.parametrize("boundary", ["periodic", "dirichlet", "neumann", "mixed", "obstacle"])
+def test_solution_satisfies_the_discrete_equation(boundary):
+    domain = _domain(boundary)
+    solver = PoissonSolver(domain, (SIZE, SIZE), order=2, tol=1e-10, dtype=torch.float64)
+    assert solver.direct == (boundary != "obstacle")
+    rhs = _rhs(boundary)
+    p = solver.solve(rhs)
+    laplacian = (ConvLaplacian(order=2, dtype=torch.float64)*ScalarField(p, domain=domain)).value
+    outside = 1-solver.inside
+    torch.testing.assert_close(laplacian*outside, rhs*outside, rtol=0, atol=1e-6)
+
+def test_warm_start_of_a_batch():
+    domain = _domain("obstacle")
+    solver = PoissonSolver(domain, (SIZE, SIZE), order=2, tol=1e-10, dtype=torch.float64)
+    rhs = _rhs("obstacle", batch=3)
+    p = solver.solve(rhs)
+    iterations = solver.num_iterations
+    # every sample of the batch is solved independently.
+    torch.testing.assert_close(solver.solve(rhs[1:2]), p[1:2], rtol=0, atol=1e-6)
+    p_warm = solver.solve(rhs+1e-3, x0=p)
+    assert solver.num_iterations < iterations
+    torch.testing.assert_close(p_warm, solver.solve(rhs+1e-3), rtol=0, atol=1e-6)
+
+@pytest.mark.parametrize("solve", [bicgstab, gmres])
+def test_krylov_solvers_without_preconditioner(solve):
+    generator = torch.Generator().manual_seed(0)
+    basis = torch.randn(64, 64, generator=generator, dtype=torch.float64)
+    matrix = basis@basis.T/64+torch.eye(64, dtype=torch.float64)
+    rhs = torch.randn(2, 1, 8, 8, generator=generator, dtype=torch.float64)
+    matvec = lambda x: (x.reshape(-1, 64)@matrix.T).reshape(x.shape)
+    x, _ = solve(matvec, rhs, tol=1e-10)
+    torch.testing.assert_close(matvec(x), rhs, rtol=0, atol=1e-8)
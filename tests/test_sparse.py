@@ -0,0 +1,61 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ConvDO import *
+
+SIZE = 16
+
+BOUNDARIES = {
+    "periodic": lambda: [PeriodicBoundary()]*4,
+    "dirichlet": lambda: [DirichletBoundary(1.0), DirichletBoundary(0.0), DirichletBoundary(0.5), DirichletBoundary(-1.0)],
+    "neumann": lambda: [NeumannBoundary(0.0), NeumannBoundary(1.0), NeumannBoundary(0.0), NeumannBoundary(-1.0)],
+    "unconstrained": lambda: [UnConstrainedBoundary()]*4,
+}
+
+OPERATORS = {
+    "grad_x": lambda dtype: ConvGrad(order=2, direction="x", dtype=dtype),
+    "grad_y": lambda dtype: ConvGrad(order=2, direction="y", dtype=dtype),
+    "grad2_x": lambda dtype: ConvGrad2(order=2, direction="x", dtype=dtype),
+    "laplacian": lambda dtype: ConvLaplacian(order=2, dtype=dtype),
+}
+
+def _domain(boundary, obstacle):
+    obstacles = []
+    if obstacle:
+        shape_field = generate_circle_2D(0.5, 0.5, 0.2, 1, 1, 1/SIZE, 1/SIZE)
+        obstacles = [DirichletObstacle(shape_field, 1.0) if obstacle == "dirichlet" else NeumannObstacle(shape_field, 0.0)]
+    return Domain(BOUNDARIES[boundary](), obstacles=obstacles, delta_x=1/SIZE, delta_y=1/SIZE)
+
+def _field(batch=2):
+    generator = torch.Generator().manual_seed(0)
+    return torch.rand(batch, 1, SIZE, SIZE, generator=generator, dtype=torch.float64)
+
+@pytest.mark.parametrize("boundary", list(BOUNDARIES))
+@pytest.mark.parametrize("obstacle", [None, "dirichlet", "neumann"])
+@pytest.mark.parametrize("operator", list(OPERATORS))
+def test_assembled_matrix_matches_the_operator(boundary, obstacle, operator):
+    operation = OPERATORS[operator](torch.float64)
+    domain = _domain(boundary, obstacle)
+    u = _field()
+    assembled = assemble(operation, domain, (SIZE, SIZE), layout="coo")
+    expected = (operation*ScalarField(u, domain=domain)).value
+    operated = (assembled.to_dense()@u.reshape(2, -1).T).T+assembled.bias
+    torch.testing.assert_close(operated.reshape(u.shape), expected)
+    torch.testing.assert_close(assembled(u), expected)
+
+def test_laplacian_is_assembled_once():
+    nabla2 = ConvLaplacian(order=2, dtype=torch.float64)
+    domain = _domain("dirichlet", "dirichlet")
+    assert assemble(nabla2, domain, (SIZE, SIZE)) is assemble(nabla2, domain, (SIZE, SIZE))
+
+def test_kernel_is_cast_to_the_requested_dtype():
+    nabla2 = ConvLaplacian(order=2, dtype=torch.float32)
+    domain = _domain("dirichlet", "neumann")
+    assembled = assemble(nabla2, domain, (SIZE, SIZE), dtype=torch.float64)
+    assert assembled.matrix.dtype == torch.float64 and assembled.bias.dtype == torch.float64
+    u = _field()
+    expected = (ConvLaplacian(order=2, dtype=torch.float64)*ScalarField(u, domain=domain)).value
+    torch.testing.assert_close(assembled(u), expected)
+    diagonal = assemble_diagonal(nabla2, domain, (SIZE, SIZE), dtype=torch.float64)
+    torch.testing.assert_close(diagonal.reshape(-1), assembled.diagonal())
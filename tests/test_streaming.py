@@ -0,0 +1,22 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ConvDO import TrajectoryStream
+
+def test_stream_yields_every_window():
+    trajectory = torch.rand(7, 3, 8, 8)
+    stream = TrajectoryStream(trajectory, batch_size=4, stride=2)
+    windows = [window for window in stream]
+    assert stream.num_windows == 3
+    assert [window[0].shape[0] for window in windows] == [3]
+    torch.testing.assert_close(windows[0][3][1], trajectory[3, 0:1])
+
+@pytest.mark.parametrize("arguments", [{"stride": 0}, {"stride": -1}, {"batch_size": 0}])
+def test_stream_rejects_invalid_arguments(arguments):
+    with pytest.raises(ValueError):
+        TrajectoryStream(torch.rand(4, 3, 8, 8), **arguments)
+
+def test_stream_rejects_a_single_frame():
+    with pytest.raises(ValueError, match="single"):
+        TrajectoryStream(torch.rand(3, 8, 8))